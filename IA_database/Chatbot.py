@@ -1,218 +1,378 @@
 import os
 import json
-import numpy as np
 import time
 import argparse
-import chromadb
-
-from langchain_openai.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_community.chat_models import ChatOpenAI
-from langchain.chains import ConversationalRetrievalChain
-from dotenv import load_dotenv
-from supabase import create_client
-
-# 📌 Charger les variables d'environnement
-load_dotenv()
-
-SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-SUPABASE_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-# Vérification des clés essentielles
-if not SUPABASE_URL or not SUPABASE_KEY or not OPENAI_API_KEY:
-    raise ValueError("❌ Vérifiez que SUPABASE_URL, SUPABASE_KEY et OPENAI_API_KEY sont bien définis dans votre fichier .env")
-
-# 📌 Initialiser Supabase et Embeddings
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-embeddings_model = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-
-# 📌 Initialiser ChromaDB
+import asyncio
+import threading
+
+import metrics
+from answer_cache import QueryEmbeddingCache, bump_data_version, get_answer_cache, read_data_version
+from chat_dispatcher import ChatDispatcher
+from chat_memory import CHAT_MEMORY, ChatMemory
+from clients import get_chat_llm, get_chromadb_client, get_embeddings_model, get_supabase, require_env
+from query_analyzer import QueryAnalyzer
+from embedding_cache import get_default_cache
+from embedding_engine import BATCH_MAX_ITEMS, embed_texts
+from pipeline import embed_and_write
+from templates import result_with_driver_text
+from stream_writer import STREAM_RESPONSES, StreamingMessage
+
+# 📌 Imports différés : langchain, chromadb et pandas (`lexical_index`, `retrieval`, `vector_index`, `stats_engine`,
+# `summaries`) ne sont chargés que par les fonctions qui s'en servent ; importer ce module ou afficher `--help`
+# ne crée aucun client et ne charge aucune bibliothèque lourde (voir `benchmarks/bench_startup.py`).
+
+# 📌 ChromaDB
 CHROMA_DB_PATH = "./chromadb_f1"
-chromadb_client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
 
-# 📌 Gestion des arguments CLI
-parser = argparse.ArgumentParser(description="Chatbot F1 basé sur ChromaDB et Supabase")
-parser.add_argument("-reload", action="store_true", help="Recharger ChromaDB et régénérer les embeddings")
-args = parser.parse_args()
+# 📌 Magasin vectoriel utilisé pour répondre : `chroma` (collections ChromaDB) ou `numpy`
+# (index mmap des résumés `summaries.py`, embeddés localement par `-reload`, voir `vector_index.py`)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
 
+# 📌 Questions statistiques (victoires, podiums, points...) calculées localement, sans LLM (`STATS_ENGINE=0` pour désactiver)
+STATS_ENGINE = os.getenv("STATS_ENGINE", "1") != "0"
 
-# 🔄 **Supprimer et recréer les collections dans ChromaDB**
-def clear_chromadb():
-    """ Supprime et recrée les collections `results` et `drivers` dans ChromaDB. """
-    print("⚠️ Suppression des anciennes données ChromaDB...")
 
-    for collection_name in ["results", "drivers"]:
-        try:
-            # Supprime directement la collection si elle existe
-            chromadb_client.delete_collection(name=collection_name)
-            print(f"✅ Collection `{collection_name}` supprimée.")
+def store_path():
+    """ Répertoire du magasin vectoriel utilisé (index lexical et version des données y sont rangés). """
+    if VECTOR_BACKEND == "numpy":
+        from vector_index import VECTOR_INDEX_PATH
+        return VECTOR_INDEX_PATH
+    return CHROMA_DB_PATH
 
-            # Recrée une collection vide
-            chromadb_client.get_or_create_collection(name=collection_name)
-            print(f"✅ Collection `{collection_name}` recréée.")
 
-        except Exception as e:
-            print(f"❌ Erreur lors de la suppression de `{collection_name}` : {e}")
+def indexed(write, builder, collection):
+    """ Écrit un lot `(id, embedding, métadonnées, texte)` dans le magasin vectoriel et ajoute les mêmes textes à l'index lexical (même passe). """
+    def write_both(records):
+        write(records)
+        for doc_id, _, metadata, text in records:
+            builder.add(collection, doc_id, text, metadata)
+    return write_both
 
 
-def fetch_all_supabase_data(table_name, batch_size=1000):
-    """ Récupère toutes les données d'une table Supabase avec pagination. """
-    all_data = []
-    offset = 0
+def load_summaries():
+    """ Instantané relu depuis Supabase, puis résumés par saison de pilote, par course et par carrière. """
+    from stats_engine import StatsSnapshot
+    from summaries import build_summaries
 
-    while True:
-        print(f"🔄 Chargement des données depuis `{table_name}` (offset {offset})...")
-        response = supabase.table(table_name).select("*").range(offset, offset + batch_size - 1).execute()
-        
-        if not response.data:
-            print(f"✅ Fin de la récupération pour `{table_name}`. {len(all_data)} entrées chargées.")
-            break  # Plus de données à récupérer
+    snapshot = StatsSnapshot.get(get_supabase(), refresh=True)
+    summaries = build_summaries(snapshot)
+    total = sum(len(items) for items in summaries.values())
+    print(
+        f"📚 {total} résumés ({', '.join(f'{len(items)} {level}' for level, items in summaries.items())}) "
+        f"au lieu de {len(snapshot.results) + len(snapshot.tables['drivers'])} lignes brutes."
+    )
+    return summaries
 
-        all_data.extend(response.data)
-        offset += batch_size  # Passer au batch suivant
 
-    return all_data
+def pages_of(rows, size=BATCH_MAX_ITEMS):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
 
 
 # 🔄 **Générer les nouveaux embeddings et les stocker dans ChromaDB**
-def regenerate_chromadb_embeddings():
-    """ Génère les embeddings pour `results` et `drivers`, puis les stocke dans ChromaDB. """
-    print("🔄 Régénération des embeddings pour `results` et `drivers`...")
-
-    # ✅ **Embeddings pour `drivers`**
-    drivers = fetch_all_supabase_data("drivers")
-    collection_drivers = chromadb_client.get_or_create_collection(name="drivers")
-
-    for driver in drivers:
-        driver = {k: (v if v is not None else "") for k, v in driver.items()}  # ⚠️ Remplace les `None`
-        
-        embedding = embeddings_model.embed_query(
-            f"Pilote {driver['first_name']} {driver['last_name']} ({driver['nationality']}). "
-            f"Né le {driver['dob']}. Plus d'informations : {driver['url']}."
-        )
-        collection_drivers.add(
-            ids=[driver["driver_ref"]],
-            embeddings=[embedding],
-            metadatas=[driver]
-        )
-
-    print(f"✅ {len(drivers)} pilotes mis à jour dans ChromaDB.")
-
-    # ✅ **Embeddings pour `results`**
-    results = fetch_all_supabase_data("results")
-    collection_results = chromadb_client.get_or_create_collection(name="results")
-
-    for result in results:
-        result = {k: (v if v is not None else "") for k, v in result.items()}  # ⚠️ Remplace les `None`
-        
-        driver_info = supabase.table("drivers").select("first_name", "last_name").eq("driver_ref", result["driver_id"]).execute().data
-        driver_name = f"{driver_info[0]['first_name']} {driver_info[0]['last_name']}" if driver_info else result["driver_id"]
-
-        embedding = embeddings_model.embed_query(
-            f"Saison {result['season']} - Circuit {result['circuit_id']}: "
-            f"Pilote {driver_name}, Écurie {result['constructor_id']}, "
-            f"Position sur la grille: {result['grid']}, Position finale: {result['position']}, "
-            f"Points marqués: {result['points']}, Statut: {result['status']}."
-        )
-        collection_results.add(
-            ids=[f"{result['season']}_{result['circuit_id']}_{result['driver_id']}"],
-            embeddings=[embedding],
-            metadatas=[result]
-        )
-
-    print(f"✅ {len(results)} résultats mis à jour dans ChromaDB.")
+def regenerate_chromadb_embeddings(summaries=None, embeddings_model=None, path=CHROMA_DB_PATH):
+    """
+    Génère les embeddings des résumés (couche principale de la recherche) dans des collections fantômes
+    (`chroma_store.py`), écrites par lots de `CHROMA_WRITE_BATCH`, puis activées d'un coup une fois vérifiées :
+    le chatbot en cours continue de servir la version précédente pendant toute la reconstruction.
+    """
+    from chroma_store import ShadowCollections, rendered_pages
+    from lexical_index import LexicalIndexBuilder
+    from summaries import SUMMARY_TEMPLATES
+
+    print("🔄 Régénération des embeddings des résumés (collections fantômes)...")
+    summaries = summaries or load_summaries()
+    embeddings_model = embeddings_model or get_embeddings_model()
+    lexical = LexicalIndexBuilder()
+
+    def publish(version):
+        # 📌 Nouvelle version des données : le chatbot rouvre son magasin, le cache de réponses est invalidé
+        bump_data_version(path)
+
+    # 📌 Index lexical écrit avant l'activation : un chatbot qui (re)démarre ne lit jamais un BM25 plus ancien que les collections
+    with ShadowCollections(get_chromadb_client(path), path, ["summaries"],
+                           before_activate=lambda version: lexical.save(path), on_activate=publish) as shadow:
+        for level, items in summaries.items():
+            embed_and_write(
+                embeddings_model,
+                rendered_pages(pages_of(items), SUMMARY_TEMPLATES[level]),
+                template=SUMMARY_TEMPLATES[level],
+                render=lambda document: document["text"],
+                to_record=lambda document, embedding: (document["metadata"]["id"], embedding, document["metadata"], document["text"]),
+                write=indexed(shadow.writer("summaries"), lexical, "summaries"),
+                label=f"résumés `{level}`"
+            )
+
+    if get_default_cache():
+        get_default_cache().report()
     print("✅ Régénération des embeddings terminée !")
 
 
-# ✅ **Créer le chatbot LangChain**
+# 🔄 **Construire l'index NumPy des résumés**
+def rebuild_vector_index():
+    """ Embedde les résumés (les textes inchangés sont servis par le cache d'embeddings) et construit l'index mmap. """
+    from lexical_index import LexicalIndexBuilder
+    from summaries import SUMMARY_TEMPLATES
+    from vector_index import VECTOR_INDEX_PATH, build_index
+
+    print("🔄 Construction de l'index vectoriel NumPy des résumés...")
+    embeddings_model = get_embeddings_model()
+    lexical = LexicalIndexBuilder()
+
+    def embedded_pages(summaries, template):
+        for page in pages_of(summaries):
+            texts = [template(summary) for summary in page]
+            vectors = embed_texts(embeddings_model, texts, template=template, verbose=False)
+            for summary, text in zip(page, texts):
+                lexical.add("summaries", summary["id"], text, summary)
+            yield [{**summary, "embedding": vector} for summary, vector in zip(page, vectors)]
+
+    build_index([
+        ("summaries", embedded_pages(summaries, SUMMARY_TEMPLATES[level]), lambda summary: summary["id"])
+        for level, summaries in load_summaries().items()
+    ], before_activate=lambda: lexical.save(VECTOR_INDEX_PATH))
+    bump_data_version(VECTOR_INDEX_PATH)
+
+
+# ✅ **Créer le chatbot**
+SYSTEM_PROMPT = (
+    "Tu es un assistant spécialisé en Formule 1. Réponds à partir des résultats fournis ; "
+    "si l'information n'y figure pas, dis-le simplement."
+)
+
+
+class F1Chatbot:
+    """
+    Magasin vectoriel, retriever et LLM créés une seule fois au démarrage, puis partagés par tous les messages.
+    Deux niveaux de cache : embeddings des questions (LRU mémoire) et réponses (cache sémantique persistant).
+    Les saisons, pilotes, circuits et constructeurs cités dans la question restreignent la recherche vectorielle.
+    Les questions statistiques reconnues sont calculées directement sur l'instantané local (`stats_engine.py`).
+    La recherche porte sur les résumés (`summaries.py`) ; les lignes brutes d'une question précise sont ajoutées en détail.
+    Chaque conversation garde un résumé glissant et ses derniers échanges (`chat_memory.py`), dans un budget de tokens fixe.
+    """
+
+    def __init__(self):
+        from stats_engine import StatsEngine, StatsSnapshot
+        from summaries import budgeted_context, drilldown_rows
+
+        supabase = get_supabase()
+        self.drilldown_rows = drilldown_rows
+        self.budgeted_context = budgeted_context
+        self.query_embeddings = QueryEmbeddingCache(get_embeddings_model())
+        self.store_lock = threading.Lock()
+        self.open_store()
+
+        # 📊 Instantané local : statistiques, détail des résultats, et alias des entités (aucune lecture Supabase au redémarrage)
+        self.snapshot = StatsSnapshot.get(supabase)
+        self.analyzer = QueryAnalyzer.from_snapshot(self.snapshot)
+        self.stats = StatsEngine(self.snapshot) if STATS_ENGINE else None
+        self.llm = get_chat_llm()
+        self.memory = ChatMemory(supabase, self.llm) if CHAT_MEMORY else None
+
+    def open_store(self):
+        """ Ouvre le magasin vectoriel, l'index lexical et le cache de réponses de la version de données courante. """
+        from lexical_index import HYBRID_SEARCH, HybridRetriever, LexicalIndex
+        from summaries import summary_text
+
+        data_version = read_data_version(store_path())
+        if VECTOR_BACKEND == "numpy":
+            from vector_index import NumpyRetriever, VectorIndex
+            vector_retriever = NumpyRetriever(
+                index=VectorIndex(),
+                embeddings_model=self.query_embeddings,
+                renderers={"summaries": summary_text}
+            )
+        else:
+            from chroma_store import active_collections
+            from retrieval import VectorRetriever
+            vector_retriever = VectorRetriever(
+                get_chromadb_client(CHROMA_DB_PATH),
+                self.query_embeddings,
+                renderers={"summaries": summary_text},
+                collection_names=active_collections(CHROMA_DB_PATH)
+            )
+            if not vector_retriever.collections["summaries"].count():
+                print("⚠️ Aucun résumé dans ChromaDB : lancez `python chatbot.py -reload`.")
+
+        # 🔤 Recherche hybride : BM25 (identifiants exacts) fusionné avec la recherche vectorielle
+        lexical = LexicalIndex.load(store_path()) if HYBRID_SEARCH else None
+        if HYBRID_SEARCH and lexical is None:
+            print("⚠️ Index lexical absent : recherche vectorielle seule (lancez `python chatbot.py -reload`).")
+        self.retriever = HybridRetriever(vector_retriever=vector_retriever, lexical=lexical)
+        # 💾 Une seule connexion SQLite par processus : à la réouverture, le cache existant est purgé des anciennes réponses
+        if getattr(self, "answer_cache", None):
+            self.answer_cache.invalidate(data_version)
+        else:
+            self.answer_cache = get_answer_cache(data_version)
+        self.data_version = data_version
+
+    def refresh_store(self):
+        """
+        Un `-reload` (autre processus) a activé une nouvelle version : le magasin est rouvert entre deux questions.
+        Les questions en cours terminent sur l'ancienne version, gardée jusqu'à la reconstruction suivante.
+        """
+        if read_data_version(store_path()) == self.data_version:
+            return
+        with self.store_lock:
+            if read_data_version(store_path()) != self.data_version:
+                print("🔀 Nouvelle version des données détectée : réouverture du magasin vectoriel.")
+                self.open_store()
+
+    def render_result(self, result):
+        return result_with_driver_text(result, self.snapshot.driver_names.get(result["driver_id"], result["driver_id"]))
+
+    def answer(self, question, on_token=None, history=None):
+        """
+        Une recherche, puis une génération à partir des documents trouvés. Renvoie `(réponse, durées)`.
+        Avec `on_token`, la réponse du LLM est diffusée : `on_token(texte)` est appelé à chaque token reçu.
+        `history` (messages de `ChatMemory.prompt`) est placé avant la question ; la réponse dépendant alors
+        de la conversation, le cache de réponses n'est ni consulté ni alimenté.
+        """
+        start = time.perf_counter()
+        entities = self.analyzer.analyze(question)
+
+        # 📊 Question statistique : réponse calculée sur les agrégats, sans embedding ni LLM
+        stats_answer = self.stats.answer(question, entities) if self.stats else None
+        if stats_answer is not None:
+            return stats_answer, {"stats": time.perf_counter() - start}
+
+        # 🔀 Nouvelle version activée par un `-reload` : bascule avant la recherche (cache et magasin de la même version)
+        self.refresh_store()
+        retriever, answer_cache, data_version = self.retriever, self.answer_cache, self.data_version
+        vector = self.query_embeddings.embed_query(question)
+        filters = self.analyzer.filters(question, entities)
+        scope = json.dumps(filters, sort_keys=True) if filters else ""
+
+        # 💾 Question proche déjà traitée sur les mêmes données et les mêmes entités : réponse réutilisée
+        answer_cache = answer_cache if not history else None
+        cached = answer_cache.lookup(vector, scope) if answer_cache else None
+        if cached is not None:
+            return cached, {"cache": time.perf_counter() - start}
+
+        # 🔎 Recherche restreinte aux entités reconnues (sans correspondance : recherche sur tout le magasin)
+        with metrics.timer("search"):
+            retrieved_docs = [doc for _, doc in retriever.search(vector, filters=filters, question=question)]
+        details = [self.render_result(result) for result in self.drilldown_rows(self.snapshot.results, entities)]
+        retrieval_time = time.perf_counter() - start
+
+        # 📌 **Ajout du contexte : résumés trouvés, puis détail des résultats bruts pour une question précise (`CONTEXT_TOKENS` au plus)**
+        context = self.budgeted_context([doc.page_content for doc in retrieved_docs], details)
+        prompt = [
+            ("system", SYSTEM_PROMPT),
+            *(history or []),
+            ("human", f"Voici les résultats trouvés dans la base de données:\n\n{context}\n\nMaintenant, réponds à cette question : {question}")
+        ]
+        start = time.perf_counter()
+        timings = {"retrieval": retrieval_time}
+        if on_token is None:
+            content = self.llm.invoke(prompt).content
+        else:
+            # ✍️ Diffusion : chaque token est transmis dès sa réception
+            parts = []
+            for chunk in self.llm.stream(prompt):
+                if not chunk.content:
+                    continue
+                if not parts:
+                    timings["first_token"] = retrieval_time + time.perf_counter() - start
+                parts.append(chunk.content)
+                on_token(chunk.content)
+            content = "".join(parts)
+        timings["generation"] = time.perf_counter() - start
+
+        if answer_cache:
+            answer_cache.store(question, vector, content, scope, data_version=data_version)
+        return content, timings
+
+    def report(self):
+        self.query_embeddings.report()
+        if self.answer_cache:
+            self.answer_cache.report()
+        if self.memory:
+            self.memory.report()
+        metrics.report()
+
+
 def create_chatbot():
-    """ Initialise le chatbot après rechargement des embeddings. """
-    print("✅ Chatbot prêt à répondre !")
-    vector_store = Chroma(persist_directory=CHROMA_DB_PATH, embedding_function=embeddings_model)
-    return ConversationalRetrievalChain.from_llm(
-        llm=ChatOpenAI(temperature=0, model="gpt-4o-mini", openai_api_key=OPENAI_API_KEY),
-        retriever=vector_store.as_retriever()
-    )
+    """ Initialise le chatbot (une seule fois, au démarrage). """
+    start = time.perf_counter()
+    chatbot = F1Chatbot()
+    print(f"✅ Chatbot prêt à répondre (initialisé en {time.perf_counter() - start:.1f}s) !")
+    return chatbot
+
+
+# ✅ **Répondre à un message utilisateur**
+def answer_message(chatbot, message):
+    """ Génère la réponse à un message utilisateur et l'enregistre dans Supabase. Renvoie les durées par étape. """
+    chat_id = message["chat_id"]
+    user_message = message["content"]
+    print(f"📝 Message utilisateur reçu (chat {chat_id}) : {user_message}")
+
+    # 🧠 Résumé et derniers échanges de la conversation (rechargés depuis Supabase si elle n'est pas en mémoire)
+    history = chatbot.memory.prompt(message) if chatbot.memory else None
+
+    if STREAM_RESPONSES:
+        # ✍️ Ligne insérée dès le premier token, puis complétée par blocs (`stream_writer.py`)
+        stream = StreamingMessage(get_supabase(), chat_id)
+        try:
+            bot_response, timings = chatbot.answer(user_message, on_token=stream.write, history=history)
+        except Exception:
+            # Ligne déjà insérée : terminée avec un message d'erreur plutôt que laissée incomplète
+            stream.abort()
+            raise
+        stream.close(bot_response)
+        timings["first_write"] = stream.first_write
+        print(f"✍️ Réponse diffusée (chat {chat_id}) : affichée après {stream.first_write:.2f}s, {stream.tokens} tokens en {stream.writes} écritures.")
+    else:
+        bot_response, timings = chatbot.answer(user_message, history=history)
 
+    if "stats" in timings:
+        print(f"📊 Réponse statistique (chat {chat_id}) en {1000 * timings['stats']:.1f} ms : {bot_response}")
+    elif "cache" in timings:
+        print(f"💾 Réponse servie depuis le cache (chat {chat_id}) en {timings['cache']:.2f}s : {bot_response}")
+    else:
+        print(f"🤖 Réponse générée (chat {chat_id}) en {timings['retrieval']:.2f}s (recherche) + {timings['generation']:.2f}s (génération) : {bot_response}")
+    if not STREAM_RESPONSES:
+        get_supabase().table("message").insert({"chat_id": chat_id, "role": "assistant", "content": bot_response}).execute()
 
-# ✅ **Récupérer le dernier message utilisateur**
-def get_last_user_message():
-    response = supabase.table("message").select("*").eq("role", "user").order("created_at", desc=True).limit(1).execute()
-    return response.data[0] if response.data else None
+    if chatbot.memory:
+        summary_time = chatbot.memory.record(message, bot_response)
+        if summary_time:
+            timings["summary"] = summary_time
+    return timings
 
 
 # ✅ **Fonction principale du chatbot**
 def process_chat():
-    """ Boucle principale du chatbot pour répondre aux messages en continu. """
-    print("💬 Chatbot en attente de messages... (tape 'exit' pour quitter)")
-
+    """
+    Répond en continu à tous les messages utilisateurs non traités (curseur persistant),
+    en parallèle entre conversations et dans l'ordre au sein de chaque conversation.
+    """
     chatbot = create_chatbot()
-    last_processed_message_id = None
-
-    while True:
-        last_message = get_last_user_message()
-        if not last_message:
-            time.sleep(2)
-            continue
+    dispatcher = ChatDispatcher(get_supabase(), lambda message: answer_message(chatbot, message), on_report=chatbot.report)
+    asyncio.run(dispatcher.run())
 
-        chat_id = last_message["chat_id"]
-        user_message = last_message["content"]
-        message_id = last_message["id"]
 
-        if last_processed_message_id == message_id:
-            time.sleep(2)
-            continue
-
-        last_processed_message_id = message_id
-
-        if user_message.lower() in ["exit", "quit", "bye"]:
-            print("👋 Chatbot arrêté.")
-            break
-        test_chromadb_retrieval("Lewis Hamilton")
-        print(f"📝 Message utilisateur reçu : {user_message}")
-
-        # 🔍 **Récupération des résultats pertinents via ChromaDB**
-        retriever = chatbot.retriever
-        retrieved_docs = retriever.get_relevant_documents(user_message)
-
-        # 📌 **Ajout du contexte des résultats récupérés**
-        context = "\n\n".join([doc.page_content for doc in retrieved_docs])
-
-        response = chatbot.invoke({
-            "question": f"Voici les résultats trouvés dans la base de données:\n\n{context}\n\nMaintenant, réponds à cette question : {user_message}",
-            "chat_history": []
-        })
-        bot_response = response["answer"]
-
-        print(f"🤖 Réponse générée : {bot_response}")
-        supabase.table("message").insert({"chat_id": chat_id, "role": "assistant", "content": bot_response}).execute()
-
-        time.sleep(2)
-
-
-def test_chromadb_retrieval(driver_name):
-    """ Vérifie si les résultats d'un pilote sont bien récupérés dans ChromaDB. """
-    print(f"🔍 Test de récupération dans ChromaDB pour {driver_name}...")
-
-    retriever = Chroma(persist_directory=CHROMA_DB_PATH, embedding_function=embeddings_model).as_retriever()
-    retrieved_docs = retriever.get_relevant_documents(f"Résultats de {driver_name}")
-
-    if not retrieved_docs:
-        print(f"❌ Aucun résultat trouvé pour {driver_name} dans ChromaDB.")
-    else:
-        print(f"✅ {len(retrieved_docs)} résultats récupérés pour {driver_name}.")
-        for doc in retrieved_docs:
-            print(f"📜 {doc.page_content}")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Chatbot F1 basé sur ChromaDB et Supabase")
+    parser.add_argument("-reload", action="store_true", help="Recharger le magasin vectoriel (ChromaDB : régénérer les embeddings ; numpy : reconstruire l'index)")
+    return parser.parse_args(argv)
 
 
 # ✅ **Exécuter le chatbot**
-if __name__ == "__main__":
-    if args.reload:
-        print("🔄 Option `-reload` détectée : suppression et recréation de ChromaDB...")
-        clear_chromadb()
+def main(argv=None):
+    args = parse_args(argv)
+    require_env("NEXT_PUBLIC_SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_ANON_KEY", "OPENAI_API_KEY")
+    metrics.start_exporters()
+    if args.reload and VECTOR_BACKEND == "numpy":
+        rebuild_vector_index()
+    elif args.reload:
+        print("🔄 Option `-reload` détectée : reconstruction de ChromaDB (la version servie reste active jusqu'à la bascule)...")
         regenerate_chromadb_embeddings()
     else:
-        print("⚡ Démarrage rapide : utilisation des embeddings existants dans ChromaDB.")
+        print(f"⚡ Démarrage rapide : utilisation du magasin vectoriel existant ({VECTOR_BACKEND}).")
 
     process_chat()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,22 @@
 import os
 import json
-import requests
-from supabase import create_client
-from dotenv import load_dotenv
+import argparse
 
-# 📌 Charger les variables d'environnement
-load_dotenv()
+import ergast
+import metrics
+from clients import get_supabase, require_env
 
-SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-
-# 📌 Connexion à Supabase
-supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+# 📌 Connexion à Supabase : créée à la première insertion (`clients.py`)
 
 def fetch_all_drivers():
     """ Récupère tous les pilotes de 1950 à 2025 et les stocke dans un fichier JSON. """
     all_drivers = []
     seen_drivers = set()
 
-    for year in range(1950, 2025):
-        print(f"🔄 Récupération des pilotes pour {year}...")
-        url = f"http://ergast.com/api/f1/{year}/drivers.json"
-        response = requests.get(url)
-
-        if response.status_code == 200:
-            drivers_data = response.json().get("MRData", {}).get("DriverTable", {}).get("Drivers", [])
+    print("🔄 Récupération des pilotes de 1950 à 2024...")
+    for year, data in ergast.fetch_seasons(range(1950, 2025), "drivers"):
+        if data:
+            drivers_data = data.get("MRData", {}).get("DriverTable", {}).get("Drivers", [])
 
             for driver in drivers_data:
                 driver_ref = driver["driverId"]
@@ -62,10 +54,25 @@ def insert_drivers_from_file():
         return
 
     print(f"🔄 Insertion de {len(drivers)} pilotes dans Supabase...")
-    supabase.table("drivers").upsert(drivers, on_conflict="driver_ref").execute()
+    get_supabase().table("drivers").upsert(drivers, on_conflict="driver_ref").execute()
     print(f"✅ Pilotes insérés avec succès !")
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Récupération de tous les pilotes F1 et insertion dans Supabase")
+    parser.add_argument("-offline", "--offline", action="store_true", help="Servir les réponses Ergast uniquement depuis le cache disque (aucun accès réseau)")
+    args = parser.parse_args(argv)
+
+    require_env("NEXT_PUBLIC_SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_ANON_KEY")
+    metrics.start_exporters()
+    if args.offline:
+        ergast.set_offline()
+
     fetch_all_drivers()
     insert_drivers_from_file()
+    ergast.report_cache_stats()
+    metrics.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,42 @@
-import os
-import requests
-import json
 import argparse
-import numpy as np
-from supabase import create_client
-from dotenv import load_dotenv
-from langchain_openai.embeddings import OpenAIEmbeddings
 
-# 📌 Charger les variables d'environnement
-load_dotenv()
+import ergast
+import metrics
+from bulk_writer import BulkWriter
+from clients import get_embeddings_model, get_ingestion_state, get_reference_index, get_supabase, require_env
+from embedding_engine import embed_texts
+from templates import driver_detail_text, driver_season_text, race_result_text, race_text
+from ingestion_state import SEASON, content_hash, current_season
+from reference_index import fetch_all_rows
+from vector_codec import encode_vectors
 
-SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# 📌 Clients Supabase / OpenAI, index de référence et état d'ingestion : créés à la première utilisation (`clients.py`)
 
-# Vérification des clés essentielles
-if not SUPABASE_URL or not SUPABASE_ANON_KEY or not OPENAI_API_KEY:
-    raise ValueError("Vérifiez que SUPABASE_URL, SUPABASE_ANON_KEY et OPENAI_API_KEY sont bien définis.")
+FIRST_SEASON = 1950
 
-# 📌 Connexion à Supabase
-supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-embeddings_model = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-
-# 📌 Gestion des arguments CLI
-parser = argparse.ArgumentParser(description="Script de récupération et d'embeddings F1")
-parser.add_argument("-embeddings", action="store_true", help="Régénérer uniquement les embeddings")
-args = parser.parse_args()
-
-# ✅ Vérifier les années présentes en base
+# ✅ Vérifier les années présentes en base (paginé, utilisé uniquement pour initialiser l'état d'ingestion)
 def get_existing_years(table_name, column_name="season"):
-    response = supabase.table(table_name).select(column_name).execute()
-    return {row[column_name] for row in response.data if row[column_name] is not None} if response.data else set()
+    rows = fetch_all_rows(get_supabase(), table_name, column_name)
+    return {row[column_name] for row in rows if row[column_name] is not None}
 
-# ✅ Vérifier les courses et pilotes existants
+# ✅ Vérifier les courses et pilotes à charger (état d'ingestion, saisons passées complètes ignorées)
 def get_years_to_fetch():
-    existing_race_years = get_existing_years("races")
-    existing_driver_years = get_existing_years("drivers", column_name="season")
-    existing_result_years = get_existing_years("results", column_name="season")
+    for dataset in ("races", "drivers", "results"):
+        get_ingestion_state().bootstrap(dataset, lambda: get_existing_years(dataset))
+
+    missing_race_years = set(get_ingestion_state().seasons_to_fetch("races", FIRST_SEASON))
+    missing_driver_years = set(get_ingestion_state().seasons_to_fetch("drivers", FIRST_SEASON))
+    missing_result_years = set(get_ingestion_state().seasons_to_fetch("results", FIRST_SEASON))
 
     # 📌 Années où courses et pilotes sont absents
-    missing_race_driver_years = set(range(1950, 2025)) - (existing_race_years & existing_driver_years)
+    missing_race_driver_years = missing_race_years | missing_driver_years
 
     # 📌 Années où courses et pilotes existent mais pas les résultats
-    missing_result_years = (existing_race_years & existing_driver_years) - existing_result_years
-
-    # 📌 Années où les pilotes sont absents uniquement
-    missing_driver_years = set(range(1950, 2025)) - existing_driver_years
+    # (la saison en cours est toujours revérifiée)
+    missing_result_years = {
+        year for year in missing_result_years
+        if year not in missing_race_driver_years or year == current_season()
+    }
 
     print(f"🔍 Années détectées comme manquantes (courses et pilotes) : {sorted(missing_race_driver_years)}")
     print(f"🔍 Années détectées comme manquantes (pilotes seuls) : {sorted(missing_driver_years)}")
@@ -55,16 +46,25 @@ def get_years_to_fetch():
 
 
 
+# 🧮 Embeddings par lots (un appel API par lot, et non par ligne)
+def attach_embeddings(rows, template, texts=None):
+    texts = texts if texts is not None else [template(row) for row in rows]
+    for row, value in zip(rows, encode_vectors(embed_texts(get_embeddings_model(), texts, template=template))):
+        row["embedding"] = value
+    return rows
+
+
 # ✅ Ajouter les courses et pilotes
 def fetch_races_and_drivers(years):
-    for year in years:
-        print(f"🔄 Récupération des courses et pilotes pour {year}...")
+    # 📌 Téléchargement parallèle des calendriers et des pilotes de toutes les saisons
+    races_by_year = ergast.fetch_seasons(years)
+    drivers_by_year = ergast.fetch_seasons(years, "drivers")
+
+    for (year, races_data), (_, drivers_data) in zip(races_by_year, drivers_by_year):
+        print(f"🔄 Traitement des courses et pilotes pour {year}...")
 
         # 📌 Courses
-        races_url = f"http://ergast.com/api/f1/{year}.json"
-        races_response = requests.get(races_url)
-        if races_response.status_code == 200:
-            races_data = races_response.json()
+        if races_data:
             races = [
                 {
                     "season": year,
@@ -73,20 +73,21 @@ def fetch_races_and_drivers(years):
                     "name": race['raceName'],
                     "date": race['date'],
                     "time": race.get('time', None),
-                    "url": race['url'],
-                    "embedding": json.dumps(embeddings_model.embed_query(
-                        f"Grand Prix {race['raceName']} - Saison {year}, Manche {race['round']} sur le circuit {race['Circuit']['circuitId']}."
-                    ))
+                    "url": race['url']
                 }
                 for race in races_data['MRData']['RaceTable']['Races']
             ]
-            supabase.table("races").insert(races).execute()
+            # 📌 N'insérer que les manches absentes (la saison en cours est revérifiée à chaque exécution)
+            digest = content_hash(races)
+            races = [race for race in races if not get_reference_index().race(year, race["round"])]
+            if races:
+                attach_embeddings(races, race_text)
+                inserted = get_supabase().table("races").insert(races).execute()
+                get_reference_index().add_races(inserted.data or [])
+            get_ingestion_state().mark("races", year, digest=digest)
 
         # 📌 Pilotes
-        drivers_url = f"http://ergast.com/api/f1/{year}/drivers.json"
-        drivers_response = requests.get(drivers_url)
-        if drivers_response.status_code == 200:
-            drivers_data = drivers_response.json()
+        if drivers_data:
             drivers = [
                 {
                     "driver_ref": driver['driverId'],
@@ -95,38 +96,34 @@ def fetch_races_and_drivers(years):
                     "last_name": driver['familyName'],
                     "dob": driver['dateOfBirth'],
                     "nationality": driver['nationality'],
-                    "url": driver['url'],
-                    "embedding": json.dumps(embeddings_model.embed_query(
-                        f"Pilote {driver['givenName']} {driver['familyName']} ({driver['nationality']}), saison {year}."
-                    ))
+                    "url": driver['url']
                 }
                 for driver in drivers_data['MRData']['DriverTable']['Drivers']
             ]
-            supabase.table("drivers").upsert(drivers, on_conflict=["driver_ref", "season"]).execute()
+            digest = content_hash(drivers_data['MRData']['DriverTable']['Drivers'])
+            if not get_ingestion_state().is_unchanged("drivers", year, SEASON, digest):
+                attach_embeddings(drivers, driver_season_text)
+                get_supabase().table("drivers").upsert(drivers, on_conflict=["driver_ref", "season"]).execute()
+                get_reference_index().add_drivers(drivers)
+                get_ingestion_state().mark("drivers", year, digest=digest)
 
 
 def fetch_drivers(years):
     """Récupérer et insérer les pilotes uniquement pour les années manquantes."""
-    for year in years:
-        print(f"🔄 Récupération des pilotes pour l'année {year}...")
-
-        # 📌 Vérifier quels pilotes existent déjà dans Supabase
-        existing_drivers_response = supabase.table("drivers").select("driver_ref").eq("season", year).execute()
-        existing_drivers = {d["driver_ref"] for d in existing_drivers_response.data}
+    drivers_by_year = ergast.fetch_seasons(years, "drivers")
 
-        # 🔹 Récupérer les pilotes depuis l'API Ergast
-        drivers_url = f"http://ergast.com/api/f1/{year}/drivers.json"
-        drivers_response = requests.get(drivers_url)
+    for year, drivers_data in drivers_by_year:
+        print(f"🔄 Traitement des pilotes pour l'année {year}...")
 
-        if drivers_response.status_code == 200:
-            drivers_data = drivers_response.json()
+        if drivers_data:
             print(f"✅ Pilotes récupérés pour {year} !")
 
             new_drivers = []
             for driver in drivers_data['MRData']['DriverTable']['Drivers']:
                 driver_ref = driver['driverId']
 
-                if driver_ref not in existing_drivers:
+                # 📌 Vérifier si le pilote existe déjà pour cette saison (index mémoire)
+                if (driver_ref, year) not in get_reference_index().driver_seasons:
                     new_driver = {
                         "driver_ref": driver_ref,
                         "season": year,
@@ -136,59 +133,57 @@ def fetch_drivers(years):
                         "last_name": driver['familyName'],
                         "dob": driver['dateOfBirth'],
                         "nationality": driver['nationality'],
-                        "url": driver['url'],
-                        "embedding": json.dumps(embeddings_model.embed_query(
-                            f"Pilote {driver['givenName']} {driver['familyName']} ({driver['nationality']}), "
-                            f"né le {driver['dateOfBirth']}. "
-                            f"Numéro: {driver.get('permanentNumber', 'N/A')}, Code: {driver.get('code', 'N/A')}. "
-                            f"Saison {year}. En savoir plus : {driver['url']}"
-                        ))
+                        "url": driver['url']
                     }
                     new_drivers.append(new_driver)
 
             if new_drivers:
-                supabase.table("drivers").upsert(new_drivers, on_conflict=["driver_ref", "season"]).execute()
+                attach_embeddings(new_drivers, driver_detail_text)
+                get_supabase().table("drivers").upsert(new_drivers, on_conflict=["driver_ref", "season"]).execute()
+                get_reference_index().add_drivers(new_drivers)
                 print(f"✅ {len(new_drivers)} nouveaux pilotes ajoutés ou mis à jour pour l'année {year}.")
             else:
                 print(f"✅ Tous les pilotes de {year} sont déjà en base.")
+            get_ingestion_state().mark("drivers", year, digest=content_hash(drivers_data['MRData']['DriverTable']['Drivers']))
 
         else:
-            print(f"❌ Erreur récupération des pilotes pour {year} : {drivers_response.status_code}")
+            print(f"❌ Erreur récupération des pilotes pour {year}.")
 
 
 
 
-# ✅ Ajouter les résultats
-def fetch_results(years):
-    existing_races_response = supabase.table("races").select("id", "season", "name").execute()
-    existing_races = {r["id"]: {"season": r["season"], "name": r["name"]} for r in existing_races_response.data}
-
-
-    existing_drivers_response = supabase.table("drivers").select("driver_ref").execute()
-    existing_drivers = {d["driver_ref"] for d in existing_drivers_response.data}
-
-    for year in years:
-        results_url = f"http://ergast.com/api/f1/{year}/results.json"
-        results_response = requests.get(results_url)
-        if results_response.status_code == 200:
-            results_data = results_response.json()
+# ✅ Ajouter les résultats (par défaut, seules les manches absentes de l'état d'ingestion sont insérées)
+def fetch_results(years, skip_loaded=True):
+    for year, results_data in ergast.fetch_seasons(years, "results"):
+        if results_data:
             results = []
+            texts = []
+            loaded_rounds = []
+            scheduled_rounds = set()
+            incomplete_rounds = set()
+            race_rounds = {}
             for race in results_data['MRData']['RaceTable']['Races']:
                 season = int(race['season'])
                 round_number = int(race['round'])
-                race_info = next((r for r in existing_races if existing_races[r]["season"] == season), None)
-                race_id = race_info if race_info else None
-                race_name = existing_races[race_info]["name"] if race_info else "Course inconnue"
+                scheduled_rounds.add(round_number)
+                if skip_loaded and get_ingestion_state().has("results", season, round_number):
+                    continue
+                race_info = get_reference_index().race(season, round_number)
+                race_id = race_info["id"] if race_info else None
+                race_name = race_info["name"] if race_info else "Course inconnue"
 
 
                 if not race_id:
                     print(f"⚠️ Aucune course trouvée pour Saison {season}, Manche {round_number}. Skipping...")
                     continue
+                loaded_rounds.append((season, round_number, content_hash(race['Results'])))
+                race_rounds[race_id] = round_number
 
                 for result in race['Results']:
                     driver_id = result['Driver']['driverId']
-                    if driver_id not in existing_drivers:
+                    if not get_reference_index().has_driver(driver_id):
                         print(f"⚠️ Skipping result for {driver_id} (driver not in database)")
+                        incomplete_rounds.add(round_number)
                         continue
 
                     results.append({
@@ -199,37 +194,66 @@ def fetch_results(years):
                         "grid": int(result['grid']),
                         "position": result.get('position', 'DNF'),
                         "points": float(result['points']),
-                        "status": result['status'],
-                        "embedding": json.dumps(embeddings_model.embed_query(
-                            f"Résultats F1 - Saison {season}. "
-                            f"Grand Prix {round_number}, ID de la course: {race_id}. "
-                            f"Pilote: {driver_id}, écurie: {result['Constructor']['name']}. "
-                            f"Départ: {result['grid']}, Position finale: {result.get('position', 'DNF')}, "
-                            f"Points marqués: {result['points']}, Statut: {result['status']}."
-                        ))
+                        "status": result['status']
                     })
+                    texts.append(race_result_text({**results[-1], "round": round_number}))
 
             if results:
-                supabase.table("results").insert(results).execute()
+                attach_embeddings(results, race_result_text, texts)
+                with BulkWriter(get_supabase(), "results", mode="insert") as writer:
+                    writer.write(results)
                 print(f"✅ Résultats insérés pour {year} !")
+                # Lignes rejetées : leur manche est à recharger ; lot en échec : lignes inconnues, aucune manche validée
+                if writer.failed:
+                    incomplete_rounds.update(race_rounds.values())
+                incomplete_rounds.update(race_rounds[row["race_id"]] for row, _ in writer.rejected)
+
+            # 📍 Manches entièrement écrites, puis saison complète si elle est terminée et que toutes ses manches sont chargées
+            written_rounds = [unit for unit in loaded_rounds if unit[1] not in incomplete_rounds]
+            if len(written_rounds) < len(loaded_rounds):
+                print(f"⚠️ {year} : {len(loaded_rounds) - len(written_rounds)} manches incomplètes, rechargées au prochain passage.")
+            get_ingestion_state().mark_many("results", written_rounds)
+            if year < current_season() and scheduled_rounds <= get_ingestion_state().loaded_rounds("results", year):
+                get_ingestion_state().mark("results", year)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Script de récupération et d'embeddings F1")
+    parser.add_argument("-embeddings", action="store_true", help="Régénérer uniquement les embeddings")
+    parser.add_argument("-offline", "--offline", action="store_true", help="Servir les réponses Ergast uniquement depuis le cache disque (aucun accès réseau)")
+    return parser.parse_args(argv)
+
 
 # ✅ Lancer avec option `-embeddings` ou récupération complète
-if args.embeddings:
-    print("🔄 Régénération des embeddings sans retéléchargement des données...")
-    fetch_results(get_existing_years("results"))
-    print("✅ Embeddings régénérés avec succès !")
-    exit()
+def main(argv=None):
+    args = parse_args(argv)
+    require_env("NEXT_PUBLIC_SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_ANON_KEY", "OPENAI_API_KEY")
+    metrics.start_exporters()
+    if args.offline:
+        ergast.set_offline()
+
+    if args.embeddings:
+        print("🔄 Régénération des embeddings sans retéléchargement des données...")
+        fetch_results(sorted(get_existing_years("results")), skip_loaded=False)
+        print("✅ Embeddings régénérés avec succès !")
+        ergast.report_cache_stats()
+        metrics.report()
+        return
+
+    missing_race_driver_years, missing_driver_years, missing_result_years = get_years_to_fetch()
 
-missing_race_driver_years, missing_driver_years, missing_result_years = get_years_to_fetch()
+    if missing_race_driver_years:
+        fetch_races_and_drivers(missing_race_driver_years)
 
-if missing_race_driver_years:
-    fetch_races_and_drivers(missing_race_driver_years)
+    if missing_driver_years:
+        fetch_drivers(missing_driver_years)
 
-if missing_driver_years:
-    fetch_drivers(missing_driver_years)
+    if missing_result_years:
+        fetch_results(missing_result_years)
 
-if missing_result_years:
-    fetch_results(missing_result_years) 
+    ergast.report_cache_stats()
+    metrics.report()
+    print("🚀 Script terminé avec succès sur Supabase API !")
 
 
-print("🚀 Script terminé avec succès sur Supabase API !")
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,30 @@
 import os
-import requests
-import json
 import argparse
-import numpy as np
-from supabase import create_client
-from dotenv import load_dotenv
-from langchain_openai.embeddings import OpenAIEmbeddings
-import uuid
 import time
-
-
-# 📌 Charger les variables d'environnement
-load_dotenv()
-
-SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-# Vérification des clés essentielles
-if not SUPABASE_URL or not SUPABASE_ANON_KEY or not OPENAI_API_KEY:
-    raise ValueError("Vérifiez que SUPABASE_URL, SUPABASE_ANON_KEY et OPENAI_API_KEY sont bien définis.")
-
-# 📌 Connexion à Supabase
-supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-embeddings_model = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-
-# 📌 Gestion des arguments CLI
-parser = argparse.ArgumentParser(description="Script de récupération et d'embeddings F1")
-parser.add_argument("-embeddings", action="store_true", help="Régénérer uniquement les embeddings")
-parser.add_argument("-force-update", action="store_true", help="Forcer la mise à jour de toutes les données (résultats, pilotes, constructeurs)")
-args = parser.parse_args()
-
-# ✅ Vérifier les circuits existants en base
-def get_existing_circuits():
-    response = supabase.table("circuits").select("circuit_id").execute()
-    return {row["circuit_id"] for row in response.data} if response.data else set()
-
-# ✅ Vérifier les années présentes en base
+from datetime import date
+from functools import partial
+
+import ergast
+import metrics
+from bulk_writer import BulkWriter
+from clients import get_embeddings_model, get_ingestion_state, get_reference_index, get_supabase, require_env
+from embedding_cache import get_default_cache
+from pipeline import embed_and_write
+from templates import driver_profile_text, result_text
+from ingestion_state import SEASON, content_hash, current_season
+from reference_index import fetch_all_rows, iter_pages
+from vector_codec import encode_vector
+
+# 📌 Clients Supabase / OpenAI, index de référence et état d'ingestion : créés à la première utilisation (`clients.py`)
+
+# 📌 Première saison chargée par dataset (les résultats ne sont suivis qu'à partir de 1991)
+FIRST_SEASON = 1950
+RESULTS_FIRST_SEASON = int(os.getenv("RESULTS_FIRST_SEASON", "1991"))
+
+# ✅ Vérifier les années présentes en base (paginé, utilisé uniquement pour initialiser l'état d'ingestion)
 def get_existing_years(table_name, column_name="season"):
-    response = supabase.table(table_name).select(column_name).execute()
-    return {row[column_name] for row in response.data if row[column_name] is not None} if response.data else set()
-
-# ✅ Vérifier les données manquantes
-def get_years_to_fetch():
-    existing_driver_years = get_existing_years("drivers", column_name="season")
-    existing_result_years = get_existing_years("results", column_name="season")
-    existing_constructor_years = get_existing_years("constructors", column_name="season")
-
-    missing_driver_years = set(range(1950, 2025)) - existing_driver_years
-    missing_result_years = existing_driver_years - existing_result_years
-    missing_constructor_years = set(range(1950, 2025)) - existing_constructor_years
-
-    return sorted(missing_driver_years), sorted(missing_result_years), sorted(missing_constructor_years)
+    rows = fetch_all_rows(get_supabase(), table_name, column_name)
+    return {row[column_name] for row in rows if row[column_name] is not None}
 
 
 
@@ -67,17 +40,15 @@ def create_placeholder_driver(driver_id, season):
         "url": "https://en.wikipedia.org/wiki/Formula_1"  # Lien générique
     }
     print(f"🚨 Création d'un pilote fictif : {placeholder_driver}")
-    supabase.table("drivers").insert(placeholder_driver).execute()
+    get_supabase().table("drivers").insert(placeholder_driver).execute()
+    get_reference_index().add_drivers([placeholder_driver])
 
 
 # ✅ Récupérer et insérer les constructeurs
-def fetch_constructors(years):
-    for year in years:
-        print(f"🔄 Récupération des constructeurs pour {year}...")
-        constructors_url = f"http://ergast.com/api/f1/{year}/constructors.json"
-        response = requests.get(constructors_url)
-        if response.status_code == 200:
-            constructors_data = response.json()
+def fetch_constructors(years, force_update=False):
+    print(f"🔄 Récupération des constructeurs pour {len(years)} saisons...")
+    for year, constructors_data in ergast.fetch_seasons(years, "constructors"):
+        if constructors_data:
             constructors = [
                 {
                     "constructor_ref": constructor['constructorId'],
@@ -88,21 +59,20 @@ def fetch_constructors(years):
                 }
                 for constructor in constructors_data['MRData']['ConstructorTable']['Constructors']
             ]
-            supabase.table("constructors").upsert(constructors, on_conflict=["constructor_ref", "season"]).execute()
 
-def get_existing_drivers():
-    """ Vérifie tous les pilotes déjà en base. """
-    response = supabase.table("drivers").select("driver_ref").execute()
-    return {row["driver_ref"] for row in response.data} if response.data else set()
+            digest = content_hash(constructors)
+            if not force_update and get_ingestion_state().is_unchanged("constructors", year, SEASON, digest):
+                print(f"⏭️ Constructeurs {year} inchangés.")
+                continue
 
-def fetch_drivers(years):
-    for year in years:
-        print(f"🔄 Récupération des pilotes pour {year}...")
+            get_supabase().table("constructors").upsert(constructors, on_conflict=["constructor_ref", "season"]).execute()
+            get_reference_index().add_constructors(constructors)
+            get_ingestion_state().mark("constructors", year, SEASON, digest)
 
-        drivers_url = f"http://ergast.com/api/f1/{year}/drivers.json"
-        response = requests.get(drivers_url)
-        if response.status_code == 200:
-            drivers_data = response.json()
+def fetch_drivers(years, force_update=False):
+    print(f"🔄 Récupération des pilotes pour {len(years)} saisons...")
+    for year, drivers_data in ergast.fetch_seasons(years, "drivers"):
+        if drivers_data:
             drivers = [
                 {
                     "driver_ref": driver['driverId'],
@@ -118,27 +88,24 @@ def fetch_drivers(years):
 
             print(f"🌟 {len(drivers)} pilotes récupérés pour {year}. Exemple : {drivers[:3]}")
 
-            if drivers:
-                supabase.table("drivers").upsert(drivers, on_conflict=["driver_ref", "season"]).execute()
+            digest = content_hash(drivers)
+            if drivers and not force_update and get_ingestion_state().is_unchanged("drivers", year, SEASON, digest):
+                print(f"⏭️ Pilotes {year} inchangés.")
+            elif drivers:
+                get_supabase().table("drivers").upsert(drivers, on_conflict=["driver_ref", "season"]).execute()
+                get_reference_index().add_drivers(drivers)
+                get_ingestion_state().mark("drivers", year, SEASON, digest)
                 print(f"✅ Pilotes insérés/mis à jour pour {year}.")
             else:
                 print(f"⚠️ Aucun pilote récupéré pour {year}.")
 
-            # 🔍 Vérifier si les pilotes sont bien en base
-            existing_drivers = get_existing_drivers()
-            missing_after_insert = [driver['driver_ref'] for driver in drivers if driver['driver_ref'] not in existing_drivers]
-
-            if missing_after_insert:
-                print(f"❌ Pilotes toujours absents après insertion : {missing_after_insert}")
-
 
 
 # ✅ Récupérer et insérer les résultats
 
 def ensure_circuits_exist(circuit_ids):
     """ Vérifie que tous les circuits existent dans la table circuits, sinon les ajoute avec des valeurs par défaut. """
-    existing_circuits = get_existing_circuits()
-    missing_circuits = circuit_ids - existing_circuits
+    missing_circuits = circuit_ids - get_reference_index().circuits.keys()
 
     if missing_circuits:
         print(f"🔍 {len(missing_circuits)} circuits manquants détectés. Ajout en cours...")
@@ -156,7 +123,8 @@ def ensure_circuits_exist(circuit_ids):
             for circuit_id in missing_circuits
         ]
 
-        supabase.table("circuits").upsert(circuits_data, on_conflict=["circuit_id"]).execute()
+        get_supabase().table("circuits").upsert(circuits_data, on_conflict=["circuit_id"]).execute()
+        get_reference_index().add_circuits(circuits_data)
         print(f"✅ {len(circuits_data)} circuits ajoutés en base avec des valeurs par défaut.")
 
 
@@ -164,11 +132,9 @@ def ensure_circuits_exist(circuit_ids):
 # Ajout dans fetch_results
 def fetch_circuits():
     print("🔄 Récupération de tous les circuits...")
-    circuits_url = "http://ergast.com/api/f1/circuits.json"
-    response = requests.get(circuits_url)
-    
-    if response.status_code == 200:
-        circuits_data = response.json()
+    circuits_data = ergast.get_all_json("circuits.json")
+
+    if circuits_data:
         circuits = [
             {
                 "circuit_id": circuit['circuitId'],
@@ -181,70 +147,116 @@ def fetch_circuits():
             }
             for circuit in circuits_data['MRData']['CircuitTable']['Circuits']
         ]
-        supabase.table("circuits").upsert(circuits, on_conflict=["circuit_id"]).execute()
+        get_supabase().table("circuits").upsert(circuits, on_conflict=["circuit_id"]).execute()
+        get_reference_index().add_circuits(circuits)
         print(f"✅ {len(circuits)} circuits ajoutés ou mis à jour !")
     else:
-        print(f"❌ Erreur lors de la récupération des circuits : {response.status_code}")
+        print("❌ Erreur lors de la récupération des circuits.")
+
+
+def download_season_results(year):
+    """ Télécharge toutes les pages de résultats d'une saison (pages restantes en parallèle, exécuté dans un worker). """
+    start = time.perf_counter()
+    pages = ergast.get_pages(f"{year}/results.json")
+
+    if not pages:
+        print(f"❌ Erreur lors de la récupération des résultats pour {year}")
+        return []
+
+    print(f"📄 Résultats {year} : {len(pages)} pages en {time.perf_counter() - start:.1f}s")
+    return [race for page in pages for race in page['MRData']['RaceTable']['Races']]
 
 
-def fetch_results(years):
-    for year in years:
-        print(f"🔄 Récupération des résultats pour {year}...")
+def merge_races_by_round(races):
+    """ Regroupe les résultats d'une même manche (une course peut être coupée entre deux pages). """
+    merged = {}
+    for race in races:
+        round_number = int(race['round'])
+        if round_number in merged:
+            merged[round_number]['Results'].extend(race['Results'])
+        else:
+            merged[round_number] = {**race, 'Results': list(race['Results'])}
+    return [merged[round_number] for round_number in sorted(merged)]
+
+
+def download_results_units(year, force_update=False):
+    """
+    Télécharge les manches à (re)charger pour une saison :
+    - aucune manche connue ou `force_update` : la saison entière (pages de résultats) ;
+    - sinon : uniquement les manches courues absentes de l'état, plus la dernière manche
+      chargée de la saison en cours (corrections après course).
+    Renvoie `(courses, manches au calendrier)`.
+    """
+    loaded = get_ingestion_state().loaded_rounds("results", year)
+    if force_update or not loaded:
+        races = merge_races_by_round(download_season_results(year))
+        return races, {int(race['round']) for race in races} if year < current_season() else None
+
+    schedule = ergast.get_json(ergast.season_path(year))
+    if not schedule:
+        return [], None
+
+    today = date.today().isoformat()
+    scheduled = [race for race in schedule['MRData']['RaceTable']['Races'] if race['date'] <= today]
+    pending = [int(race['round']) for race in scheduled if int(race['round']) not in loaded]
+    if year >= current_season() and loaded:
+        pending.append(max(loaded))
+
+    races = []
+    for round_number in sorted(set(pending)):
+        round_data = ergast.get_all_json(f"{year}/{round_number}/results.json")
+        if round_data:
+            races.extend(round_data['MRData']['RaceTable']['Races'])
+
+    return merge_races_by_round(races), {int(race['round']) for race in scheduled}
+
+
+def fetch_results(years, force_update=False):
+    print(f"🔄 Récupération des résultats pour {len(years)} saisons...")
+    downloaded = ergast.map_parallel(partial(download_results_units, force_update=force_update), years)
+
+    for year, (races, scheduled_rounds) in zip(years, downloaded):
+        print(f"🔄 Traitement des résultats pour {year} ({len(races)} manches)...")
 
         results = []
         circuit_ids = set()
         missing_drivers = set()
-
-        offset = 0
-        limit = 30
-
-        while True:
-            results_url = f"http://ergast.com/api/f1/{year}/results.json?limit={limit}&offset={offset}"
-            response = requests.get(results_url)
-
-            if response.status_code == 200:
-                results_data = response.json()
-                races = results_data['MRData']['RaceTable']['Races']
-
-                if not races:
-                    break
-
-                for race in races:
-                    circuit_id = race['Circuit']['circuitId']
-                    circuit_ids.add(circuit_id)
-
-                    for result in race['Results']:
-                        driver_id = result['Driver']['driverId']
-
-                        # ✅ Vérifier si le pilote existe en base
-                        existing_drivers = get_existing_drivers()
-                        if driver_id not in existing_drivers:
-                            missing_drivers.add(driver_id)
-
-                        # ✅ Vérification et remplacement des NULL
-                        constructor = result['Constructor']['constructorId'] if 'Constructor' in result and 'constructorId' in result['Constructor'] else "Unknown"
-                        grid = int(result['grid']) if result['grid'] else "N/A"
-                        position = result.get('position', 'DNF')
-                        points = float(result['points']) if 'points' in result else 0
-                        status = result['status'] if 'status' in result else "Unknown"
-
-                        # 🏁 Ajouter à la liste des résultats
-                        results.append({
-                            "season": year,
-                            "circuit_id": circuit_id,
-                            "driver_id": driver_id,
-                            "constructor_id": constructor,
-                            "grid": grid,
-                            "position": position,
-                            "points": points,
-                            "status": status
-                        })
-
-                offset += limit
-
-            else:
-                print(f"❌ Erreur lors de la récupération des résultats pour {year} : {response.status_code}")
-                break
+        loaded_rounds = []
+
+        for race in races:
+            round_number = int(race['round'])
+            digest = content_hash(race['Results'])
+            if not force_update and get_ingestion_state().is_unchanged("results", year, round_number, digest):
+                continue
+            circuit_id = race['Circuit']['circuitId']
+            circuit_ids.add(circuit_id)
+            loaded_rounds.append(((year, round_number, digest), circuit_id))
+
+            for result in race['Results']:
+                driver_id = result['Driver']['driverId']
+
+                # ✅ Vérifier si le pilote existe en base (index mémoire, O(1))
+                if not get_reference_index().has_driver(driver_id):
+                    missing_drivers.add(driver_id)
+
+                # ✅ Vérification et remplacement des NULL
+                constructor = result['Constructor']['constructorId'] if 'Constructor' in result and 'constructorId' in result['Constructor'] else "Unknown"
+                grid = int(result['grid']) if result['grid'] else "N/A"
+                position = result.get('position', 'DNF')
+                points = float(result['points']) if 'points' in result else 0
+                status = result['status'] if 'status' in result else "Unknown"
+
+                # 🏁 Ajouter à la liste des résultats
+                results.append({
+                    "season": year,
+                    "circuit_id": circuit_id,
+                    "driver_id": driver_id,
+                    "constructor_id": constructor,
+                    "grid": grid,
+                    "position": position,
+                    "points": points,
+                    "status": status
+                })
 
         # 🏎 Vérifier et ajouter les circuits manquants AVANT l'insertion des résultats
         ensure_circuits_exist(circuit_ids)
@@ -252,11 +264,10 @@ def fetch_results(years):
         # 🏎 Ajouter les pilotes manquants
         if missing_drivers:
             print(f"⚠️ {len(missing_drivers)} pilotes manquants détectés. Ajout en cours...")
-            fetch_drivers([year])
+            fetch_drivers([year], force_update)
 
             # 🔄 Vérification finale des pilotes après mise à jour
-            existing_drivers = get_existing_drivers()
-            still_missing = [driver for driver in missing_drivers if driver not in existing_drivers]
+            still_missing = [driver for driver in missing_drivers if not get_reference_index().has_driver(driver)]
 
             if still_missing:
                 print(f"❌ Pilotes toujours absents après mise à jour : {still_missing}")
@@ -265,95 +276,114 @@ def fetch_results(years):
         results = list({(r["season"], r["circuit_id"], r["driver_id"]): r for r in results}.values())
 
         # 🏁 Insérer tous les résultats avec vérification des pilotes
-        batch_upsert("results", results, "season, circuit_id, driver_id")
+        incomplete_circuits = set()
+        if results:
+            writer = batch_upsert("results", results, "season, circuit_id, driver_id")
+            # Lignes rejetées : manche de leur circuit à recharger ; lot en échec : lignes inconnues, aucune manche validée
+            incomplete_circuits = set(circuit_ids) if writer.failed else {row["circuit_id"] for row, _ in writer.rejected}
+
+        # 📍 Enregistrer les manches entièrement écrites, puis la saison si elle est terminée et complète
+        written_rounds = [entry for entry, circuit_id in loaded_rounds if circuit_id not in incomplete_circuits]
+        if len(written_rounds) < len(loaded_rounds):
+            print(f"⚠️ {year} : {len(loaded_rounds) - len(written_rounds)} manches incomplètes, rechargées au prochain passage.")
+        get_ingestion_state().mark_many("results", written_rounds)
+        if scheduled_rounds and year < current_season() and scheduled_rounds <= get_ingestion_state().loaded_rounds("results", year):
+            get_ingestion_state().mark("results", year)
 
 def batch_upsert(table, data, conflict_columns):
-    """ Gère les upserts en batch pour éviter les doublons sur ON CONFLICT DO UPDATE """
-    BATCH_SIZE = 1000
-    for i in range(0, len(data), BATCH_SIZE):
-        batch = data[i:i + BATCH_SIZE]
-        try:
-            print(f"🔄 Insertion batch {i+1}/{len(data)} ({len(batch)} entrées) dans {table}...")
-            supabase.table(table).upsert(batch, on_conflict=conflict_columns).execute()
-            print(f"✅ Batch {i+1}/{len(data)} inséré avec succès !")
-        except Exception as e:
-            print(f"❌ Erreur lors de l'update de {table} (Batch {i+1}/{len(data)}) : {e}")
+    """ Upsert en masse : lots dimensionnés en octets, envois parallèles, lignes rejetées isolées au lieu de perdre le lot.
+    Renvoie l'écrivain (`failed`, `rejected`) pour ne valider que ce qui a été écrit. """
+    with BulkWriter(get_supabase(), table, on_conflict=conflict_columns) as writer:
+        writer.write(data)
+    return writer
 
 
 def regenerate_embeddings():
+    """ Régénère les embeddings en flux : lecture paginée, embeddings par lots, upsert par lots. """
     print("🔄 Régénération des embeddings pour pilotes et résultats...")
 
-    # 🚀 Embeddings pour Pilotes
-    drivers = supabase.table("drivers").select("driver_ref", "first_name", "last_name", "dob", "nationality", "url").execute().data
-    updated_drivers = [
-        {
-            "driver_ref": driver["driver_ref"],
-            "embedding": json.dumps(embeddings_model.embed_query(
-                f"Pilote {driver['first_name']} {driver['last_name']} ({driver['nationality']}). "
-                f"Né le {driver['dob']}. "
-                f"Plus d'informations : {driver['url']}."
-            ))
-        }
-        for driver in drivers
-    ]
-    batch_upsert("drivers", updated_drivers, "driver_ref")
+    # 🚀 Embeddings pour Pilotes (une ligne par pilote et par saison : clé `driver_ref, season`)
+    with BulkWriter(get_supabase(), "drivers", on_conflict="driver_ref, season") as writer:
+        embed_and_write(
+            get_embeddings_model(),
+            iter_pages(get_supabase(), "drivers", "driver_ref, season, first_name, last_name, dob, nationality, url", order_by=("driver_ref", "season")),
+            template=driver_profile_text,
+            to_record=lambda driver, vector: {"driver_ref": driver["driver_ref"], "season": driver["season"], "embedding": encode_vector(vector)},
+            write=writer.write,
+            label="pilotes"
+        )
 
     # 🏎️ Embeddings pour Résultats (Vérification `constructor_id`)
-    results = supabase.table("results").select("season", "circuit_id", "driver_id", "constructor_id", "grid", "position", "points", "status").execute().data
-    updated_results = []
-
-    for result in results:
-        constructor = result["constructor_id"] if result["constructor_id"] is not None else "Unknown"
-
-        updated_results.append({
-            "season": result["season"],
-            "circuit_id": result["circuit_id"],
-            "driver_id": result["driver_id"],
-            "embedding": json.dumps(embeddings_model.embed_query(
-                f"Résultat de la saison {result['season']}. "
-                f"Circuit: {result['circuit_id']}. "
-                f"Pilote: {result['driver_id']}. "
-                f"Écurie: {constructor}. "
-                f"Position sur la grille: {result.get('grid', 'N/A')}. "
-                f"Position finale: {result.get('position', 'N/A')}. "
-                f"Points marqués: {result.get('points', 0)}. "
-                f"Statut de la course: {result.get('status', 'N/A')}."
-            ))
-        })
-
-    batch_upsert("results", updated_results, "season, circuit_id, driver_id")
-
+    with BulkWriter(get_supabase(), "results", on_conflict="season, circuit_id, driver_id") as writer:
+        embed_and_write(
+            get_embeddings_model(),
+            iter_pages(get_supabase(), "results", "season, circuit_id, driver_id, constructor_id, grid, position, points, status", order_by=("season", "circuit_id", "driver_id")),
+            template=result_text,
+            to_record=lambda result, vector: {
+                "season": result["season"],
+                "circuit_id": result["circuit_id"],
+                "driver_id": result["driver_id"],
+                "embedding": encode_vector(vector)
+            },
+            write=writer.write,
+            label="résultats"
+        )
+
+    if get_default_cache():
+        get_default_cache().report()
     print("✅ Régénération des embeddings terminée !")
 
 def get_years_to_fetch(force_update=False):
+    """ Saisons à charger d'après l'état d'ingestion (les saisons passées complètes sont ignorées). """
+    last_season = current_season()
     if force_update:
-        return list(range(1950, 2025)), list(range(1950, 2025)), list(range(1950, 2025))
+        all_years = list(range(FIRST_SEASON, last_season + 1))
+        return all_years, list(range(RESULTS_FIRST_SEASON, last_season + 1)), all_years
+
+    for dataset in ("drivers", "results", "constructors"):
+        get_ingestion_state().bootstrap(dataset, lambda: get_existing_years(dataset))
+
+    missing_driver_years = get_ingestion_state().seasons_to_fetch("drivers", FIRST_SEASON)
+    missing_result_years = get_ingestion_state().seasons_to_fetch("results", RESULTS_FIRST_SEASON)
+    missing_constructor_years = get_ingestion_state().seasons_to_fetch("constructors", FIRST_SEASON)
+
+    print(f"🔍 Saisons à vérifier : pilotes {missing_driver_years}, résultats {missing_result_years}, constructeurs {missing_constructor_years}")
+    return missing_driver_years, missing_result_years, missing_constructor_years
+
 
-    existing_driver_years = get_existing_years("drivers", column_name="season")
-    existing_result_years = get_existing_years("results", column_name="season")
-    existing_constructor_years = get_existing_years("constructors", column_name="season")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Script de récupération et d'embeddings F1")
+    parser.add_argument("-embeddings", action="store_true", help="Régénérer uniquement les embeddings")
+    parser.add_argument("-offline", "--offline", action="store_true", help="Servir les réponses Ergast uniquement depuis le cache disque (aucun accès réseau)")
+    parser.add_argument("-force-update", action="store_true", help="Forcer la mise à jour de toutes les données (résultats, pilotes, constructeurs)")
+    return parser.parse_args(argv)
 
-    missing_driver_years = set(range(1950, 2025)) - existing_driver_years
-    #missing_result_years = existing_driver_years - existing_result_years
-    missing_result_years = set(range(1991, 2025))
-    missing_constructor_years = set(range(1950, 2025)) - existing_constructor_years
 
-    return sorted(missing_driver_years), sorted(missing_result_years), sorted(missing_constructor_years)
+def main(argv=None):
+    args = parse_args(argv)
+    require_env("NEXT_PUBLIC_SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_ANON_KEY", "OPENAI_API_KEY")
+    metrics.start_exporters()
+    if args.offline:
+        ergast.set_offline()
 
+    if args.embeddings:
+        regenerate_embeddings()
+        return
 
-# ✅ Vérifier les données à télécharger
-missing_driver_years, missing_result_years, missing_constructor_years = get_years_to_fetch(args.force_update)
+    # ✅ Vérifier les données à télécharger
+    missing_driver_years, missing_result_years, missing_constructor_years = get_years_to_fetch(args.force_update)
 
-if args.embeddings:
-    regenerate_embeddings()
-    exit()
+    fetch_circuits()
+    fetch_constructors(missing_constructor_years, args.force_update)
+    fetch_drivers(missing_driver_years, args.force_update)
+    if missing_result_years:
+        fetch_results(missing_result_years, args.force_update)
 
-fetch_circuits()
-fetch_constructors(missing_constructor_years)
-fetch_drivers(missing_driver_years)
-if missing_result_years:
-    fetch_results(missing_result_years)
+    ergast.report_cache_stats()
 
+    metrics.report()
+    print("🚀 Script terminé avec succès sur Supabase API !")
 
 
-print("🚀 Script terminé avec succès sur Supabase API !")
+if __name__ == "__main__":
+    main()
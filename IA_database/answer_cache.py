@@ -0,0 +1,196 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+import metrics
+
+# 📌 Caches du chatbot (surchargeables via `.env`)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".answer_cache.sqlite"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+DATA_VERSION_FILE = "data_version.txt"
+
+
+def normalize_question(text):
+    """ Casse et espaces ignorés : « Qui a gagné ? » et « qui  a gagné ? » partagent la même entrée. """
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+def read_data_version(store_path):
+    """ Version des données du magasin vectoriel (changée à chaque `-reload`). """
+    try:
+        with open(os.path.join(store_path, DATA_VERSION_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or "0"
+    except OSError:
+        return "0"
+
+
+def bump_data_version(store_path):
+    version = uuid.uuid4().hex
+    os.makedirs(store_path, exist_ok=True)
+    with open(os.path.join(store_path, DATA_VERSION_FILE), "w", encoding="utf-8") as f:
+        f.write(version)
+    return version
+
+
+def hit_rate(hits, misses):
+    total = hits + misses
+    return 100 * hits / total if total else 0
+
+
+class QueryEmbeddingCache:
+    """ LRU en mémoire `question -> embedding`, même interface `embed_query` que le modèle qu'il enveloppe. """
+
+    def __init__(self, embeddings_model, maxsize=QUERY_CACHE_SIZE):
+        self.embeddings_model = embeddings_model
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_query(self, text):
+        key = normalize_question(text)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        with metrics.timer("embedding.query", items=1):
+            vector = self.embeddings_model.embed_query(text)
+        with self.lock:
+            self.entries[key] = vector
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return vector
+
+    def report(self):
+        print(f"🧠 Cache embeddings de questions : {self.hits} hits, {self.misses} misses, taux de hit {hit_rate(self.hits, self.misses):.0f}%")
+
+
+class SemanticAnswerCache:
+    """
+    Cache persistant des réponses (SQLite) : une question dont l'embedding est à une similarité cosinus
+    d'au moins `threshold` d'une question déjà traitée, pour la même version des données, reçoit la réponse stockée.
+
+    Les vecteurs de la version courante sont gardés en mémoire (matrice normalisée) : une recherche
+    est un produit matriciel. Au-delà de `max_entries`, les entrées les moins récemment servies sont évincées.
+
+    `scope` (entités reconnues dans la question, voir `QueryAnalyzer`) : une réponse n'est réutilisée que pour
+    les mêmes entités, « Hamilton en 2019 » et « Hamilton en 2020 » ayant des embeddings très proches.
+    """
+
+    def __init__(self, data_version, path=ANSWER_CACHE_PATH, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_SIZE):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.data_version = data_version
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, question TEXT NOT NULL, vector BLOB NOT NULL,"
+            " answer TEXT NOT NULL, data_version TEXT NOT NULL, last_used REAL NOT NULL, scope TEXT NOT NULL DEFAULT '')"
+        )
+        # Cache créé par une version précédente : ajout de la colonne `scope`
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(answers)")}
+        if "scope" not in columns:
+            self.connection.execute("ALTER TABLE answers ADD COLUMN scope TEXT NOT NULL DEFAULT ''")
+        self.connection.commit()
+        self.invalidate(data_version)
+
+    def invalidate(self, data_version):
+        """ Supprime les réponses calculées sur une autre version des données et recharge l'index mémoire. """
+        with self.lock:
+            self.data_version = data_version
+            deleted = self.connection.execute("DELETE FROM answers WHERE data_version != ?", (data_version,)).rowcount
+            self.connection.commit()
+            rows = self.connection.execute("SELECT id, vector, answer, scope FROM answers ORDER BY id").fetchall()
+            self.ids = [row[0] for row in rows]
+            self.answers = [row[2] for row in rows]
+            self.scopes = [row[3] for row in rows]
+            self.vectors = np.array([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else None
+        if deleted:
+            print(f"🧹 Cache de réponses : {deleted} réponses obsolètes supprimées (nouvelles données).")
+
+    def lookup(self, vector, scope=""):
+        """ Réponse stockée pour une question proche portant sur les mêmes entités, ou `None`. """
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        with self.lock:
+            if self.vectors is None:
+                self.misses += 1
+                return None
+            scores = self.vectors @ query
+            scores[[i for i, entry_scope in enumerate(self.scopes) if entry_scope != scope]] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.connection.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), self.ids[best]))
+            self.connection.commit()
+            return self.answers[best]
+
+    def store(self, question, vector, answer, scope="", data_version=None):
+        """ `data_version` : version sur laquelle la réponse a été calculée (ignorée si le cache est passé à une autre). """
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self.lock:
+            if data_version is not None and data_version != self.data_version:
+                return
+            cursor = self.connection.execute(
+                "INSERT INTO answers (question, vector, answer, data_version, last_used, scope) VALUES (?, ?, ?, ?, ?, ?)",
+                (question, vector.tobytes(), answer, self.data_version, time.time(), scope)
+            )
+            self.ids.append(cursor.lastrowid)
+            self.answers.append(answer)
+            self.scopes.append(scope)
+            self.vectors = vector[None, :] if self.vectors is None else np.vstack([self.vectors, vector])
+
+            overflow = len(self.ids) - self.max_entries
+            if overflow > 0:
+                evicted = {row[0] for row in self.connection.execute(
+                    "SELECT id FROM answers ORDER BY last_used LIMIT ?", (overflow,)
+                ).fetchall()}
+                self.connection.execute(f"DELETE FROM answers WHERE id IN ({','.join('?' * len(evicted))})", list(evicted))
+                keep = [i for i, answer_id in enumerate(self.ids) if answer_id not in evicted]
+                self.ids = [self.ids[i] for i in keep]
+                self.answers = [self.answers[i] for i in keep]
+                self.scopes = [self.scopes[i] for i in keep]
+                self.vectors = self.vectors[keep] if keep else None
+            self.connection.commit()
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM answers")
+            self.connection.commit()
+            self.ids, self.answers, self.scopes, self.vectors = [], [], [], None
+
+    def report(self):
+        print(
+            f"💾 Cache de réponses : {self.hits} hits, {self.misses} misses, taux de hit {hit_rate(self.hits, self.misses):.0f}% "
+            f"({len(self.ids)}/{self.max_entries} réponses, seuil {self.threshold})"
+        )
+
+
+def get_answer_cache(data_version):
+    """ Cache de réponses du processus (désactivable avec `ANSWER_CACHE=0`). """
+    if os.getenv("ANSWER_CACHE", "1") == "0":
+        return None
+    return SemanticAnswerCache(data_version)
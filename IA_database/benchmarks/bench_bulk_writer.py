@@ -0,0 +1,83 @@
+"""
+Benchmark : upsert par lots fixes de 1000 lignes envoyés l'un après l'autre vs `BulkWriter`.
+
+Utilise le stand-in mémoire `FakeSupabase` (latence par requête, erreurs transitoires, lignes invalides),
+aucune base n'est nécessaire :
+
+    python benchmarks/bench_bulk_writer.py --rows 20000 --latency 0.05 --failure-rate 0.05 --bad-every 1000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bulk_writer import BulkWriter
+from fake_supabase import FakeSupabase
+
+CONFLICT = "season, circuit_id, driver_id"
+
+
+def sample_rows(count, bad_every, dimensions):
+    vector = json.dumps([0.0123456] * dimensions)
+    return [
+        {
+            "season": 1950 + i // 500,
+            "circuit_id": f"circuit_{i % 40}",
+            "driver_id": None if bad_every and i % bad_every == bad_every - 1 else f"driver_{i}",
+            "embedding": vector
+        }
+        for i in range(count)
+    ]
+
+
+def make_client(args):
+    return FakeSupabase(
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        validators={"results": lambda row: None if row.get("driver_id") else "null value in column \"driver_id\""}
+    )
+
+
+def fixed_batches(supabase, rows):
+    """ Ancien `batch_upsert` : lots de 1000, séquentiels, lot entier perdu au moindre échec. """
+    for i in range(0, len(rows), 1000):
+        try:
+            supabase.table("results").upsert(rows[i:i + 1000], on_conflict=CONFLICT).execute()
+        except Exception:
+            pass
+
+
+def bulk_writer(supabase, rows):
+    with BulkWriter(supabase, "results", on_conflict=CONFLICT, verbose=False) as writer:
+        writer.write(rows)
+
+
+def run(name, func, args, rows):
+    supabase = make_client(args)
+    start = time.perf_counter()
+    func(supabase, rows)
+    elapsed = time.perf_counter() - start
+    written = len(supabase.rows("results"))
+    print(f"{name:<14} {written:>7}/{len(rows)} lignes écrites  {elapsed:7.2f}s  {written / elapsed:9.0f} lignes/s  {supabase.requests:>5} requêtes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'écrivain en masse")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence simulée par requête (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Proportion de requêtes en erreur 503")
+    parser.add_argument("--bad-every", type=int, default=1000, help="Une ligne invalide toutes les N lignes (0 = aucune)")
+    parser.add_argument("--dimensions", type=int, default=256, help="Taille du vecteur d'embedding de chaque ligne")
+    args = parser.parse_args()
+
+    rows = sample_rows(args.rows, args.bad_every, args.dimensions)
+    run("lots fixes", fixed_batches, args, rows)
+    run("BulkWriter", bulk_writer, args, rows)
+
+
+if __name__ == "__main__":
+    main()
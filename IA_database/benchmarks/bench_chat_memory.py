@@ -0,0 +1,103 @@
+"""
+Benchmark : taille du prompt au fil d'une longue conversation, historique complet vs `ChatMemory`
+(derniers échanges dans un budget de tokens + résumé glissant).
+
+Les messages passent par `FakeSupabase` ; un LLM local (`TruncatingLLM`) tient lieu de résumeur en gardant
+les derniers mots du texte à résumer, dans la limite de `max_tokens`. Avec `--chats`, plusieurs conversations
+se partagent un LRU plus petit qu'elles : chaque retour d'une conversation évincée la recharge depuis la table :
+
+    python benchmarks/bench_chat_memory.py --turns 200 --chats 4 --cache 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_dispatcher import percentile
+from chat_memory import ChatMemory
+from embedding_engine import estimate_tokens
+from fake_supabase import FakeSupabase
+
+
+class Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class TruncatingLLM:
+    """ Même interface que `ChatOpenAI` (`bind`, `invoke`) : « résume » en gardant les derniers mots. """
+
+    def __init__(self, max_tokens=None):
+        self.max_tokens = max_tokens
+        self.calls = 0
+
+    def bind(self, max_tokens=None):
+        llm = TruncatingLLM(max_tokens)
+        llm.parent = self
+        return llm
+
+    def invoke(self, messages):
+        self.parent.calls += 1
+        words = messages[-1][1].split()
+        return Response(" ".join(words[-int(0.7 * (self.max_tokens or 100)):]))
+
+
+def turn_texts(turn):
+    question = f"Question {turn} : combien de victoires pour le pilote_{turn % 20} en {2000 + turn % 24} ?"
+    answer = f"Réponse {turn} : " + " ".join(f"détail{i}" for i in range(40 + turn % 30))
+    return question, answer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la mémoire des conversations")
+    parser.add_argument("--turns", type=int, default=200, help="échanges par conversation")
+    parser.add_argument("--chats", type=int, default=4)
+    parser.add_argument("--cache", type=int, default=2, help="conversations gardées en mémoire (LRU)")
+    parser.add_argument("--budget", type=int, default=1000, help="tokens des derniers échanges")
+    parser.add_argument("--summary", type=int, default=250, help="tokens du résumé")
+    args = parser.parse_args()
+
+    supabase = FakeSupabase(latency=0.005)
+    llm = TruncatingLLM()
+    workdir = tempfile.mkdtemp(prefix="bench_chat_memory_")
+    memory = ChatMemory(supabase, llm, path=os.path.join(workdir, "memory.sqlite"), max_chats=args.cache,
+                        max_tokens=args.budget, summary_tokens=args.summary)
+
+    full, bounded, handle_times = {}, {}, []
+    checkpoints = sorted({1, 10, 50, args.turns // 2, args.turns})
+    clock = 0
+    for turn in range(1, args.turns + 1):
+        for chat_id in range(args.chats):
+            question, answer = turn_texts(turn)
+            clock += 1
+            message = supabase.table("message").insert({
+                "chat_id": chat_id, "role": "user", "content": question, "created_at": f"{clock:012d}"
+            }).execute().data[0]
+
+            start = time.perf_counter()
+            history = memory.prompt(message)
+            handle_times.append(time.perf_counter() - start)
+            clock += 1
+            supabase.table("message").insert({"chat_id": chat_id, "role": "assistant", "content": answer, "created_at": f"{clock:012d}"}).execute()
+            memory.record(message, answer)
+
+            if chat_id == 0 and turn in checkpoints:
+                rows = [row for row in supabase.rows("message") if row["chat_id"] == 0 and row["created_at"] < message["created_at"]]
+                full[turn] = sum(estimate_tokens(str(row["content"])) for row in rows)
+                bounded[turn] = sum(estimate_tokens(content) for _, content in history)
+
+    print(f"{'tour':>6} {'historique complet':>20} {'mémoire (budget + résumé)':>27}")
+    for turn in checkpoints:
+        print(f"{turn:>6} {full[turn]:>13} tokens {bounded[turn]:>20} tokens")
+    print(
+        f"Mémoire : {memory.loads} chargements depuis la table, {memory.hits} hits LRU, {llm.calls} résumés "
+        f"({llm.calls / (args.turns * args.chats):.2f} par échange) ; préparation du prompt p50 "
+        f"{1000 * percentile(handle_times, 0.5):.2f} ms / p95 {1000 * percentile(handle_times, 0.95):.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
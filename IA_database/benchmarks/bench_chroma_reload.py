@@ -0,0 +1,194 @@
+"""
+Benchmark de `python chatbot.py -reload` sur ChromaDB : ancienne reconstruction (collections supprimées puis
+réécrites page par page) vs reconstruction dans des collections fantômes (`chroma_store.py`) écrites par gros lots
+puis activées d'un coup.
+
+- corpus : résumés du corpus synthétique (`fixture_corpus.py`), comme pour `-reload` ;
+- embedder local `HashingEmbeddings` avec latence simulée par appel (`--embed-latency-ms`), cache d'embeddings
+  vide à chaque reconstruction (aucune clé API) ;
+- pendant chaque reconstruction, un lecteur interroge le magasin en continu comme le chatbot en service
+  (réouverture à chaque nouvelle version des données) : recherches vides ou en erreur comptées.
+
+Une première construction remplit le magasin, la seconde (mesurée) le remplace pendant que le lecteur tourne :
+
+    python benchmarks/bench_chroma_reload.py
+    python benchmarks/bench_chroma_reload.py --embed-latency-ms 50 --render-workers 0 4
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKDIR = tempfile.mkdtemp(prefix="bench_chroma_reload_")
+# Cache d'embeddings du benchmark (lu à l'import de `embedding_cache`), jamais celui du chatbot
+os.environ["EMBED_CACHE_PATH"] = os.path.join(WORKDIR, "embedding_cache.sqlite")
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import chroma_store
+import metrics
+from answer_cache import bump_data_version, read_data_version
+from Chatbot import pages_of, regenerate_chromadb_embeddings
+from chat_dispatcher import percentile
+from clients import get_chromadb_client
+from fixture_corpus import HashingEmbeddings, fixture_snapshot
+from pipeline import embed_and_write
+from retrieval import VectorRetriever
+from summaries import SUMMARY_TEMPLATES, build_summaries, summary_text
+
+
+class SlowEmbeddings(HashingEmbeddings):
+    """ `HashingEmbeddings` avec latence réseau simulée ; `model` distinct à chaque reconstruction (cache froid). """
+
+    def __init__(self, dimensions, latency, model):
+        super().__init__(dimensions)
+        self.latency = latency
+        self.model = model
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+
+def legacy_reload(path, summaries, embeddings_model):
+    """ Chemin d'avant `chroma_store.py` : collections supprimées, puis un `upsert` par page dans la collection servie. """
+    client = get_chromadb_client(path)
+    for name in chroma_store.collection_names(client):
+        client.delete_collection(name=name)
+    collection = client.get_or_create_collection(name="summaries")
+
+    def write(records):
+        with metrics.timer("chroma.write", items=len(records), collection=collection.name):
+            collection.upsert(
+                ids=[record[0] for record in records],
+                embeddings=[record[1] for record in records],
+                metadatas=[record[2] for record in records]
+            )
+
+    for level, items in summaries.items():
+        embed_and_write(
+            embeddings_model,
+            ([chroma_store.clean_metadata(summary) for summary in page] for page in pages_of(items)),
+            template=SUMMARY_TEMPLATES[level],
+            to_record=lambda summary, embedding: (summary["id"], embedding, summary),
+            write=write,
+            label=f"résumés `{level}`"
+        )
+    bump_data_version(path)
+
+
+def shadow_reload(path, summaries, embeddings_model):
+    regenerate_chromadb_embeddings(summaries, embeddings_model, path)
+
+
+class Reader(threading.Thread):
+    """ Lecteur continu : rouvre ses collections à chaque nouvelle version des données, comme `F1Chatbot.refresh_store`. """
+
+    def __init__(self, path, embeddings_model, k=4):
+        super().__init__(daemon=True)
+        self.path = path
+        self.k = k
+        self.vectors = [embeddings_model._vector(f"Saison {season} de max_verstappen") for season in range(2000, 2024)]
+        self.stop_event = threading.Event()
+        self.queries = 0
+        self.empty = 0
+        self.errors = 0
+        self.reopens = 0
+        self.latencies = []
+        self.open()
+
+    def open(self):
+        self.data_version = read_data_version(self.path)
+        self.retriever = VectorRetriever(get_chromadb_client(self.path), None, renderers={"summaries": summary_text}, k=self.k,
+                                         collection_names=chroma_store.active_collections(self.path))
+
+    def run(self):
+        rng = random.Random(0)
+        while not self.stop_event.is_set():
+            if read_data_version(self.path) != self.data_version:
+                self.open()
+                self.reopens += 1
+            start = time.perf_counter()
+            try:
+                if not self.retriever.search(rng.choice(self.vectors)):
+                    self.empty += 1
+            except Exception:
+                self.errors += 1
+                # l'ancien chatbot gardait sa collection supprimée ; ici, meilleur cas : réouverture immédiate
+                self.open()
+            self.latencies.append(time.perf_counter() - start)
+            self.queries += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+def stage_totals():
+    """ `{étape: (appels, secondes)}` cumulés depuis le démarrage (toutes étiquettes confondues). """
+    totals = {}
+    for stage in metrics.get_default_metrics().snapshot()["stages"]:
+        count, seconds = totals.get(stage["stage"], (0, 0.0))
+        totals[stage["stage"]] = (count + stage["count"], seconds + stage["seconds"])
+    return totals
+
+
+def run(name, reload, summaries, args, render_workers=0):
+    path = os.path.join(WORKDIR, name)
+    chroma_store.RENDER_WORKERS = render_workers
+    reload(path, summaries, SlowEmbeddings(args.dimensions, args.embed_latency_ms / 1000, f"{name}-initial"))
+
+    before = stage_totals()
+    reader = Reader(path, HashingEmbeddings(args.dimensions))
+    reader.start()
+    time.sleep(0.2)
+    start = time.perf_counter()
+    reload(path, summaries, SlowEmbeddings(args.dimensions, args.embed_latency_ms / 1000, f"{name}-mesure"))
+    elapsed = time.perf_counter() - start
+    time.sleep(0.2)
+    reader.stop()
+
+    after = stage_totals()
+    (embed_count, embed_seconds), (write_count, write_seconds) = [
+        [now - then for now, then in zip(after.get(stage, (0, 0.0)), before.get(stage, (0, 0.0)))]
+        for stage in ("embedding.batch", "chroma.write")
+    ]
+    collections = sorted(chroma_store.collection_names(get_chromadb_client(path)))
+    return {
+        "name": name, "seconds": elapsed, "embed_seconds": embed_seconds, "write_seconds": write_seconds,
+        "upserts": write_count, "queries": reader.queries, "empty": reader.empty, "errors": reader.errors,
+        "reopens": reader.reopens, "p99_ms": 1000 * percentile(reader.latencies, 0.99) if reader.latencies else 0.0,
+        "collections": collections
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la reconstruction ChromaDB (-reload)")
+    parser.add_argument("--drivers", type=int, default=60, help="pilotes du corpus synthétique")
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0, help="latence simulée par lot d'embeddings")
+    parser.add_argument("--render-workers", type=int, nargs="+", default=[0], help="tailles du pool de rendu essayées (0 : sans pool)")
+    args = parser.parse_args()
+
+    try:
+        summaries = build_summaries(fixture_snapshot(driver_pool=args.drivers))
+        print(f"📌 {sum(len(items) for items in summaries.values())} résumés, latence d'embedding {args.embed_latency_ms:.0f} ms/lot")
+        rows = [run("ancien", legacy_reload, summaries, args)]
+        rows += [run(f"fantome-r{workers}", shadow_reload, summaries, args, render_workers=workers) for workers in args.render_workers]
+
+        print(f"\n{'reconstruction':<16}{'durée':>8}{'embed':>8}{'écriture':>10}{'upserts':>9}{'lectures':>10}{'vides':>7}{'erreurs':>9}{'p99 lect.':>11}")
+        for row in rows:
+            print(f"{row['name']:<16}{row['seconds']:>7.2f}s{row['embed_seconds']:>7.2f}s{row['write_seconds']:>9.2f}s{row['upserts']:>9}"
+                  f"{row['queries']:>10}{row['empty']:>7}{row['errors']:>9}{row['p99_ms']:>9.1f}ms")
+        for row in rows:
+            print(f"   {row['name']} : collections restantes {', '.join(row['collections'])} ({row['reopens']} réouverture(s) du lecteur)")
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
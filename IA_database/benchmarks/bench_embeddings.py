@@ -0,0 +1,54 @@
+"""
+Benchmark : embeddings ligne par ligne (`embed_query`) vs moteur par lots (`embed_texts`).
+
+Utilise l'embedder local déterministe `FakeEmbeddings` avec une latence simulée par appel,
+aucune clé API n'est nécessaire :
+
+    python benchmarks/bench_embeddings.py --texts 2000 --latency 0.05
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_engine import FakeEmbeddings, TokenBudget, embed_texts
+
+
+def sample_texts(count):
+    return [
+        f"Résultat de la saison {1950 + i % 75}. Circuit: circuit_{i % 40}. Pilote: driver_{i % 800}. "
+        f"Position finale: {i % 20 + 1}. Points marqués: {i % 26}."
+        for i in range(count)
+    ]
+
+
+def run(name, func, model, texts):
+    start = time.perf_counter()
+    vectors = func(model, texts)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {len(texts):>6} textes  {elapsed:8.2f}s  {len(texts) / elapsed:9.0f} textes/s  {model.calls:>6} appels API")
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du moteur d'embeddings par lots")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence simulée par appel API (s)")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    args = parser.parse_args()
+
+    texts = sample_texts(args.texts)
+
+    per_row = run("embed_query", lambda model, items: [model.embed_query(text) for text in items],
+                  FakeEmbeddings(args.dimensions, args.latency), texts)
+    batched = run("embed_texts", lambda model, items: embed_texts(model, items, cache=False, budget=TokenBudget(0)),
+                  FakeEmbeddings(args.dimensions, args.latency), texts)
+
+    assert per_row == batched, "Les vecteurs doivent être identiques et dans le même ordre"
+    print("✅ Vecteurs identiques dans les deux modes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark : recherche vectorielle seule vs BM25 seul vs hybride (fusion par rang réciproque).
+
+Indexe les résumés du corpus synthétique (`fixture_corpus.py`) dans un index NumPy et un index lexical
+construits dans la même passe, puis pose des questions contenant des identifiants exacts
+(« Saison 2019 de max_verstappen », « Qui a gagné au red_bull_ring en 2015 ? »). L'embedder local
+`HashingEmbeddings` en petite dimension (collisions nombreuses) tient lieu de modèle d'embeddings
+« flou » sur les identifiants rares ; aucune clé API n'est nécessaire :
+
+    python benchmarks/bench_hybrid.py --queries 500 --k 4 --dimensions 64
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_dispatcher import percentile
+from fixture_corpus import HashingEmbeddings, fixture_snapshot
+from lexical_index import HybridRetriever, LexicalIndex, LexicalIndexBuilder
+from summaries import SUMMARY_TEMPLATES, build_summaries, summary_text
+from vector_index import NumpyRetriever, VectorIndex, build_index
+
+QUESTIONS = {
+    "driver_season": ["Saison {season} de {driver_id}", "Bilan de {driver_id} en {season} ?"],
+    "race": ["Qui a gagné au {circuit_id} en {season} ?", "Podium {circuit_id} {season}"],
+    "career": ["Carrière de {driver_id}", "Combien de saisons a disputé {driver_id} ?"],
+}
+
+
+def build(path, summaries, embeddings_model):
+    lexical = LexicalIndexBuilder()
+
+    def pages(items, template):
+        for start in range(0, len(items), 1000):
+            page = items[start:start + 1000]
+            texts = [template(summary) for summary in page]
+            for summary, text in zip(page, texts):
+                lexical.add("summaries", summary["id"], text, summary)
+            yield [{**summary, "embedding": vector} for summary, vector in zip(page, embeddings_model.embed_documents(texts))]
+
+    build_index([("summaries", pages(items, SUMMARY_TEMPLATES[level]), lambda summary: summary["id"]) for level, items in summaries.items()], path=path, ivf_lists=0)
+    lexical.save(path)
+
+
+def run(name, search, questions, k):
+    hits, latencies = 0, []
+    for question, expected in questions:
+        start = time.perf_counter()
+        ids = search(question, k)
+        latencies.append(time.perf_counter() - start)
+        hits += expected in ids
+    print(f"{name:<10} rappel@{k} {100 * hits / len(questions):5.1f}%  latence p50 {1000 * percentile(latencies, 0.5):6.2f} ms / p95 {1000 * percentile(latencies, 0.95):6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la recherche hybride BM25 + vecteurs")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--dimensions", type=int, default=64)
+    args = parser.parse_args()
+
+    summaries = build_summaries(fixture_snapshot())
+    embeddings_model = HashingEmbeddings(args.dimensions)
+    workdir = tempfile.mkdtemp(prefix="bench_hybrid_")
+    try:
+        path = os.path.join(workdir, "vector_index")
+        build(path, summaries, embeddings_model)
+        vector = NumpyRetriever(index=VectorIndex(path), embeddings_model=embeddings_model, renderers={"summaries": summary_text})
+        lexical = LexicalIndex.load(path)
+        hybrid = HybridRetriever(vector_retriever=vector, lexical=lexical)
+
+        rng = random.Random(0)
+        questions = []
+        for _ in range(args.queries):
+            level = rng.choice(list(QUESTIONS))
+            summary = rng.choice(summaries[level])
+            questions.append((rng.choice(QUESTIONS[level]).format(**summary), summary["id"]))
+
+        run("vecteurs", lambda question, k: [document.metadata["id"] for document in vector.retrieve(question, k)], questions, args.k)
+        run("bm25", lambda question, k: [doc_id for _, _, doc_id in lexical.search(question, k)], questions, args.k)
+        run("hybride", lambda question, k: [document.metadata["id"] for document in hybrid.retrieve(question, k)], questions, args.k)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Benchmark hors-ligne de l'ingestion : `Insert.py`, `Request.py`, `Request02.py` puis `prepare_data.py`,
+exécutés tels quels contre trois stand-ins locaux :
+
+- `FixtureErgast` : serveur HTTP local qui imite l'API Ergast (pagination comprise) ;
+- `FakeSupabase` : stockage mémoire avec la surface `supabase.table(...).select/upsert/insert` ;
+- `FakeEmbeddings` : embedder déterministe avec latence simulée.
+
+Chaque script tourne dans un processus séparé (mesure du pic de RSS), d'abord sur une base vide (`full`),
+puis une seconde fois sur la base obtenue (`incremental`). Les mesures sont comparées à la référence
+enregistrée dans `benchmarks/baselines/ingestion.json` :
+
+    python benchmarks/bench_ingestion.py                  # exécution + comparaison à la référence
+    python benchmarks/bench_ingestion.py --save-baseline  # enregistrer une nouvelle référence
+"""
+import argparse
+import json
+import os
+import resource
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+IA_DIR = os.path.dirname(BENCH_DIR)
+ROOT_DIR = os.path.dirname(IA_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines", "ingestion.json")
+
+sys.path.insert(0, IA_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+# (nom, script, arguments, base utilisée, base vide au départ)
+SCENARIOS = [
+    ("insert", os.path.join(IA_DIR, "Insert.py"), [], "insert", True),
+    ("request_full", os.path.join(IA_DIR, "Request.py"), [], "request", True),
+    ("request_incremental", os.path.join(IA_DIR, "Request.py"), [], "request", False),
+    ("request02_full", os.path.join(IA_DIR, "Request02.py"), [], "request02", True),
+    ("request02_incremental", os.path.join(IA_DIR, "Request02.py"), [], "request02", False),
+    ("prepare_data", os.path.join(ROOT_DIR, "prepare_data.py"), [], "request", False),
+]
+
+# Métriques comparées à la référence : (clé, tolérance relative avant alerte)
+TRACKED = [
+    ("seconds", 0.25),
+    ("ergast_requests", 0.10),
+    ("supabase_requests", 0.10),
+    ("embed_calls", 0.10),
+    ("peak_rss_mb", 0.25),
+]
+
+
+# 🧪 Processus enfant : exécute un script avec les stand-ins à la place des clients réels
+def run_child(args):
+    from embedding_engine import FakeEmbeddings
+    from fake_supabase import FakeSupabase
+
+    store = FakeSupabase(latency=args.db_latency).load(args.store)
+    embedder = FakeEmbeddings(args.dimensions, args.embed_latency)
+
+    import supabase as supabase_module
+    import langchain_openai.embeddings as openai_embeddings
+    supabase_module.create_client = lambda url, key: store
+    openai_embeddings.OpenAIEmbeddings = lambda **kwargs: embedder
+
+    sys.argv = [args.script] + args.script_args
+    sys.path.insert(0, os.path.dirname(args.script))
+    start = time.perf_counter()
+    try:
+        runpy.run_path(args.script, run_name="__main__")
+    except SystemExit:
+        pass
+    elapsed = time.perf_counter() - start
+
+    store.dump(args.store)
+    with open(args.metrics, "w", encoding="utf-8") as f:
+        json.dump({
+            "seconds": round(elapsed, 2),
+            "supabase_requests": store.requests,
+            "rows_written": store.rows_written,
+            "embed_calls": embedder.calls,
+            "embed_texts": embedder.texts,
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        }, f)
+
+
+# 🏁 Processus parent
+def run_scenario(args, server, workdir, name, script, script_args, store_name, fresh):
+    store_dir = os.path.join(workdir, store_name)
+    if fresh:
+        shutil.rmtree(store_dir, ignore_errors=True)
+    os.makedirs(store_dir, exist_ok=True)
+
+    metrics_path = os.path.join(workdir, f"{name}.metrics.json")
+    log_path = os.path.join(workdir, f"{name}.log")
+    env = {
+        **os.environ,
+        "NEXT_PUBLIC_SUPABASE_URL": "http://supabase.local",
+        "NEXT_PUBLIC_SUPABASE_ANON_KEY": "bench",
+        "OPENAI_API_KEY": "bench",
+        "ERGAST_BASE_URL": args.ergast_url,
+        "ERGAST_CACHE_DIR": os.path.join(store_dir, "ergast_cache"),
+        "ERGAST_RPS": str(args.rps),
+        "EMBED_CACHE_PATH": os.path.join(store_dir, "embeddings.sqlite"),
+        "PYTHONIOENCODING": "utf-8",
+    }
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child",
+        "--script", script, "--store", os.path.join(store_dir, "store.json"), "--metrics", metrics_path,
+        "--dimensions", str(args.dimensions), "--embed-latency", str(args.embed_latency), "--db-latency", str(args.db_latency),
+        "--",
+    ] + script_args
+
+    server.reset_requests()
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        code = subprocess.call(command, cwd=store_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    wall = time.perf_counter() - start
+
+    if code != 0 or not os.path.exists(metrics_path):
+        with open(log_path, "r", encoding="utf-8") as log:
+            print(log.read()[-3000:])
+        raise RuntimeError(f"Le scénario `{name}` a échoué (code {code}), journal : {log_path}")
+
+    with open(metrics_path, "r", encoding="utf-8") as f:
+        metrics = json.load(f)
+    metrics["wall_seconds"] = round(wall, 2)
+    metrics["ergast_requests"] = server.reset_requests()
+    metrics["rows_per_second"] = round(metrics["rows_written"] / metrics["seconds"], 1) if metrics["seconds"] else 0.0
+    return metrics
+
+
+def compare(results, baseline):
+    """ Affiche les écarts à la référence ; renvoie la liste des régressions. """
+    regressions = []
+    for name, metrics in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for key, tolerance in TRACKED:
+            before, after = reference.get(key), metrics.get(key)
+            if before is None or after is None:
+                continue
+            # Les compteurs nuls ou très petits ne sont comparés qu'en absolu
+            if after > before * (1 + tolerance) and after - before > (1 if key != "seconds" else 0.5):
+                regressions.append(f"{name}.{key} : {before} -> {after}")
+    return regressions
+
+
+def print_results(results, baseline):
+    header = f"{'scénario':<22} {'temps':>8} {'ergast':>7} {'supabase':>9} {'lignes':>8} {'lignes/s':>9} {'embed':>6} {'RSS Mo':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, m in results.items():
+        print(f"{name:<22} {m['seconds']:>7.2f}s {m['ergast_requests']:>7} {m['supabase_requests']:>9} {m['rows_written']:>8} "
+              f"{m['rows_per_second']:>9.0f} {m['embed_calls']:>6} {m['peak_rss_mb']:>7.1f}")
+        reference = baseline.get(name)
+        if reference:
+            deltas = []
+            for key, _ in TRACKED:
+                if reference.get(key):
+                    deltas.append(f"{key} {100 * (m[key] - reference[key]) / reference[key]:+.0f}%")
+            print(f"{'':<22} vs référence : {', '.join(deltas)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hors-ligne de l'ingestion (Ergast, Supabase et embeddings locaux)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--script", help=argparse.SUPPRESS)
+    parser.add_argument("--store", help=argparse.SUPPRESS)
+    parser.add_argument("--metrics", help=argparse.SUPPRESS)
+    parser.add_argument("--scenarios", nargs="*", help="Scénarios à exécuter (par défaut : tous)")
+    parser.add_argument("--rounds", type=int, default=20, help="Manches par saison")
+    parser.add_argument("--drivers", type=int, default=20, help="Pilotes par course")
+    parser.add_argument("--ergast-latency", type=float, default=0.02, help="Latence simulée par requête Ergast (s)")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="Latence simulée par requête Supabase (s)")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Latence simulée par appel d'embeddings (s)")
+    parser.add_argument("--dimensions", type=int, default=64, help="Dimension des vecteurs factices")
+    parser.add_argument("--rps", type=float, default=50, help="Limite de requêtes Ergast par seconde")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer les mesures comme nouvelle référence")
+    parser.add_argument("--keep", action="store_true", help="Conserver le répertoire de travail (journaux, bases)")
+    parser.add_argument("script_args", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    from fixture_ergast import FixtureErgast
+
+    server = FixtureErgast(rounds=args.rounds, drivers_per_race=args.drivers, latency=args.ergast_latency)
+    args.ergast_url = server.start()
+    workdir = tempfile.mkdtemp(prefix="bench_ingestion_")
+    config = {key: getattr(args, key) for key in ("rounds", "drivers", "ergast_latency", "db_latency", "embed_latency", "dimensions", "rps")}
+
+    results = {}
+    try:
+        for name, script, script_args, store_name, fresh in SCENARIOS:
+            if args.scenarios and name not in args.scenarios:
+                continue
+            print(f"⏱️ {name}...")
+            results[name] = run_scenario(args, server, workdir, name, script, script_args, store_name, fresh)
+    finally:
+        server.stop()
+        if args.keep:
+            print(f"📂 Journaux et bases conservés dans {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("config") == config:
+            baseline = saved["scenarios"]
+        else:
+            print("⚠️ Référence enregistrée avec une autre configuration : pas de comparaison.")
+
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        merged = {**baseline, **results}
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "scenarios": merged}, f, indent=2, ensure_ascii=False)
+        print(f"💾 Référence enregistrée dans {BASELINE_PATH}")
+        return
+
+    regressions = compare(results, baseline)
+    if regressions:
+        print("❌ Régressions par rapport à la référence :")
+        for regression in regressions:
+            print(f"   - {regression}")
+        sys.exit(1)
+    if baseline:
+        print("✅ Aucune régression par rapport à la référence.")
+
+
+if __name__ == "__main__":
+    main()
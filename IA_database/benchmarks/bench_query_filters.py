@@ -0,0 +1,115 @@
+"""
+Benchmark : recherche vectorielle filtrée par les entités de la question (`QueryAnalyzer`) vs non filtrée.
+
+Construit un index NumPy temporaire sur un corpus synthétique de résultats (`fixture_corpus.py`),
+pose des questions du type « Résultat de Lewis Hamilton à Silverstone en 2019 » et mesure
+le rappel@k du bon résultat et la latence par requête, aucune clé API n'est nécessaire :
+
+    python benchmarks/bench_query_filters.py --queries 500 --k 4
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_dispatcher import percentile
+from fixture_corpus import CIRCUITS, HashingEmbeddings, load_drivers, result_id, results_corpus
+from query_analyzer import QueryAnalyzer
+from templates import result_with_driver_text
+from vector_index import NumpyRetriever, VectorIndex, build_index
+
+QUESTIONS = [
+    "Résultat de {name} à {circuit} en {season}",
+    "Quelle position a obtenu {name} au {circuit} {season} ?",
+    "Combien de points {last_name} a marqués à {circuit} en {season} ?",
+]
+
+
+def build_corpus(path, embeddings_model, batch_size=1000):
+    drivers = load_drivers(60)
+    rows = results_corpus()
+
+    def pages():
+        for start in range(0, len(rows), batch_size):
+            page = [dict(row) for row in rows[start:start + batch_size]]
+            texts = [result_with_driver_text(row, driver_name(drivers, row["driver_id"])) for row in page]
+            for row, vector in zip(page, embeddings_model.embed_documents(texts)):
+                row["embedding"] = vector
+            yield page
+
+    build_index([("results", pages(), result_id)], path=path, ivf_lists=0)
+    return rows, drivers
+
+
+def driver_name(drivers, driver_ref):
+    driver = drivers[driver_ref]
+    return f"{driver['first_name']} {driver['last_name']}"
+
+
+def sample_questions(rows, drivers, count, seed=0):
+    circuit_names = dict(CIRCUITS)
+    rng = random.Random(seed)
+    questions = []
+    for row in rng.sample(rows, count):
+        driver = drivers[row["driver_id"]]
+        template = rng.choice(QUESTIONS)
+        question = template.format(
+            name=driver_name(drivers, row["driver_id"]),
+            last_name=driver["last_name"],
+            circuit=circuit_names[row["circuit_id"]],
+            season=row["season"]
+        )
+        questions.append((question, result_id(row)))
+    return questions
+
+
+def run(name, retriever, questions, k, analyzer=None):
+    hits, latencies, candidates = 0, [], []
+    for question, expected in questions:
+        vector = retriever.embed_query(question)
+        start = time.perf_counter()
+        filters = analyzer.filters(question) if analyzer else None
+        documents = [document for _, document in retriever.search(vector, k, filters=filters)]
+        latencies.append(time.perf_counter() - start)
+        selected = retriever.index.candidates(filters)
+        candidates.append(len(retriever.index) if selected is None else len(selected))
+        hits += any(document.metadata["id"] == expected for document in documents)
+    print(
+        f"{name:<12} rappel@{k} {100 * hits / len(questions):5.1f}%  "
+        f"latence p50 {1000 * percentile(latencies, 0.5):6.2f} ms / p95 {1000 * percentile(latencies, 0.95):6.2f} ms  "
+        f"{sum(candidates) / len(candidates):8.0f} vecteurs parcourus en moyenne"
+    )
+    return hits / len(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la recherche filtrée par entités")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--dimensions", type=int, default=512)
+    args = parser.parse_args()
+
+    embeddings_model = HashingEmbeddings(args.dimensions)
+    workdir = tempfile.mkdtemp(prefix="bench_query_filters_")
+    try:
+        path = os.path.join(workdir, "vector_index")
+        rows, drivers = build_corpus(path, embeddings_model)
+        index = VectorIndex(path)
+        retriever = NumpyRetriever(index=index, embeddings_model=embeddings_model, renderers={"results": lambda row: ""}, k=args.k)
+        analyzer = QueryAnalyzer(drivers=drivers, circuits={circuit_id: {"circuit_name": name} for circuit_id, name in CIRCUITS})
+
+        questions = sample_questions(rows, drivers, args.queries)
+        unfiltered = run("sans filtre", retriever, questions, args.k)
+        filtered = run("filtré", retriever, questions, args.k, analyzer)
+        print(f"✅ Rappel@{args.k} : {100 * unfiltered:.1f}% -> {100 * filtered:.1f}% avec les filtres d'entités.")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Benchmark de la recherche du chatbot : qualité (rappel@k, MRR) et coût (latence, construction, taille de l'index)
+pour chaque magasin vectoriel et chaque configuration, sur un jeu de questions étiquetées.
+
+- corpus : instantané synthétique de `fixture_corpus.py` (pilotes de `pilotes.json`, résultats générés),
+  résumés construits par `summaries.py` comme avec `python chatbot.py -reload` ;
+- embedder local déterministe (`HashingEmbeddings`), aucune clé API ;
+- questions : `retrieval_questions.json` (question, ids des résumés attendus, type), régénéré par `--write-questions` ;
+- chaque question suit le chemin du chatbot : entités (`QueryAnalyzer`), embedding, filtres, `search`.
+
+La latence mesurée est celle de la recherche complète (analyse + embedding + recherche) pour `max(--k)` documents.
+Les résultats sont comparés à `benchmarks/baselines/retrieval.json` (même configuration) :
+
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --backends numpy chroma --modes hybride --k 1 4 10
+    python benchmarks/bench_retrieval.py --save-baseline
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from chat_dispatcher import percentile
+from fixture_corpus import HashingEmbeddings, fixture_snapshot
+from lexical_index import HybridRetriever, LexicalIndex, LexicalIndexBuilder
+from query_analyzer import QueryAnalyzer
+from summaries import SUMMARY_TEMPLATES, build_summaries, summary_text
+
+QUESTIONS_PATH = os.path.join(BENCH_DIR, "retrieval_questions.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines", "retrieval.json")
+
+# Magasins comparés : (backend, paramètres de construction de l'index NumPy)
+BACKENDS = {
+    "numpy": {"ivf_lists": 0, "encoding": "float32"},
+    "numpy-int8": {"ivf_lists": 0, "encoding": "int8"},
+    "numpy-ivf": {"ivf_lists": 16, "encoding": "float32", "nprobe": 4},
+    "chroma": None,
+}
+MODES = ["vecteurs", "hybride", "sans-filtres"]   # sans-filtres : vecteurs seuls, sans les filtres d'entités
+
+# (métrique, écart toléré) : au-delà, régression
+TRACKED = [("recall@4", -0.02), ("mrr", -0.02), ("latency_p50_ms", 0.5), ("latency_p99_ms", 0.5), ("build_seconds", 0.5), ("index_mb", 0.1)]
+
+# Formulations des questions étiquetées, par type de résumé attendu
+QUESTION_TEMPLATES = {
+    "driver_season": [
+        "Comment s'est passée la saison {season} de {name} ?",
+        "Combien de points {last_name} a marqués en {season} ?",
+        "Saison {season} de {driver_id}",
+    ],
+    "race": [
+        "Qui a gagné à {circuit_name} en {season} ?",
+        "Podium du Grand Prix {circuit_id} {season}",
+        "Résultats de la course de {circuit_name} {season}",
+    ],
+    "career": [
+        "Résume la carrière de {name}",
+        "Combien de victoires {name} a remportées en carrière ?",
+    ],
+    "comparison": [
+        "Compare les saisons {season} de {name} et {other_name}",
+    ],
+}
+
+
+# 📝 Questions étiquetées
+def write_questions(summaries, snapshot, count, seed=0):
+    """ Questions tirées des résumés du corpus (réponse attendue connue), enregistrées dans `retrieval_questions.json`. """
+    rng = random.Random(seed)
+    profiles = snapshot.driver_profiles
+    by_season = {}
+    for summary in summaries["driver_season"]:
+        by_season.setdefault(summary["season"], []).append(summary)
+
+    def driver_fields(driver_id):
+        profile = profiles.get(driver_id, {})
+        return {"driver_id": driver_id, "name": f"{profile.get('first_name', '')} {profile.get('last_name', '')}".strip() or driver_id,
+                "last_name": profile.get("last_name") or driver_id}
+
+    questions = []
+    for _ in range(count):
+        kind = rng.choice(list(QUESTION_TEMPLATES))
+        template = rng.choice(QUESTION_TEMPLATES[kind])
+        if kind == "comparison":
+            first, second = rng.sample(by_season[rng.choice(sorted(by_season))], 2)
+            other = driver_fields(second["driver_id"])
+            fields = {**first, **driver_fields(first["driver_id"]), "other_name": other["name"]}
+            expected = [first["id"], second["id"]]
+        else:
+            summary = rng.choice(summaries[kind])
+            fields = {**summary, **(driver_fields(summary["driver_id"]) if "driver_id" in summary else {})}
+            expected = [summary["id"]]
+        questions.append({"question": template.format(**fields), "expected": expected, "kind": kind})
+
+    with open(QUESTIONS_PATH, "w", encoding="utf-8") as f:
+        json.dump(questions, f, indent=1, ensure_ascii=False)
+    print(f"📝 {len(questions)} questions étiquetées enregistrées dans {QUESTIONS_PATH}")
+    return questions
+
+
+def load_questions():
+    with open(QUESTIONS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# 🏗️ Construction des magasins (même passe que `-reload` : embeddings + index lexical)
+def embedded_pages(summaries, embeddings_model, lexical, size=500):
+    for level, items in summaries.items():
+        template = SUMMARY_TEMPLATES[level]
+        for start in range(0, len(items), size):
+            page = items[start:start + size]
+            texts = [template(summary) for summary in page]
+            for summary, text in zip(page, texts):
+                lexical.add("summaries", summary["id"], text, summary)
+            yield page, embeddings_model.embed_documents(texts)
+
+
+def build_store(backend, path, summaries, embeddings_model):
+    """ Construit le magasin `backend` dans `path` ; renvoie le retriever vectoriel. """
+    lexical = LexicalIndexBuilder()
+    if backend == "chroma":
+        from chroma_store import ShadowCollections, active_collections, clean_metadata
+        from clients import get_chromadb_client
+        from retrieval import VectorRetriever
+
+        with ShadowCollections(get_chromadb_client(path), path, ["summaries"]) as shadow:
+            write = shadow.writer("summaries")
+            for page, vectors in embedded_pages(summaries, embeddings_model, lexical):
+                write([(summary["id"], vector, clean_metadata(summary)) for summary, vector in zip(page, vectors)])
+        lexical.save(path)
+        return VectorRetriever(get_chromadb_client(path), embeddings_model, renderers={"summaries": summary_text},
+                               collection_names=active_collections(path))
+
+    from vector_index import NumpyRetriever, VectorIndex, build_index
+
+    options = BACKENDS[backend]
+    pages = ([{**summary, "embedding": vector} for summary, vector in zip(page, vectors)]
+             for page, vectors in embedded_pages(summaries, embeddings_model, lexical))
+    build_index([("summaries", pages, lambda summary: summary["id"])], path=path,
+                ivf_lists=options["ivf_lists"], encoding=options["encoding"], pca_dimensions=0)
+    lexical.save(path)
+    return NumpyRetriever(index=VectorIndex(path, nprobe=options.get("nprobe", 8)), embeddings_model=embeddings_model,
+                          renderers={"summaries": summary_text})
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+# 🔎 Évaluation
+def evaluate(retriever, analyzer, questions, ks, use_filters=True):
+    """ Rappel@k (part des résumés attendus dans les k premiers), MRR et latence de la recherche complète. """
+    depth = max(ks)
+    retriever.search(retriever.embed_query(questions[0]["question"]), depth)  # premier appel (caches, mmap) hors mesure
+    recalls = {k: 0.0 for k in ks}
+    reciprocal_ranks, latencies = [], []
+    for item in questions:
+        question, expected = item["question"], set(item["expected"])
+        start = time.perf_counter()
+        entities = analyzer.analyze(question)
+        vector = retriever.embed_query(question)
+        filters = analyzer.filters(question, entities) if use_filters else None
+        hits = retriever.search(vector, depth, filters=filters, question=question)
+        latencies.append(time.perf_counter() - start)
+
+        ids = [str(document.metadata["id"]) for _, document in hits]
+        for k in ks:
+            recalls[k] += len(expected.intersection(ids[:k])) / len(expected)
+        reciprocal_ranks.append(next((1 / rank for rank, doc_id in enumerate(ids, 1) if doc_id in expected), 0.0))
+
+    return {
+        **{f"recall@{k}": round(recalls[k] / len(questions), 4) for k in ks},
+        "mrr": round(sum(reciprocal_ranks) / len(questions), 4),
+        "latency_p50_ms": round(1000 * percentile(latencies, 0.5), 3),
+        "latency_p99_ms": round(1000 * percentile(latencies, 0.99), 3),
+    }
+
+
+def compare(results, baseline):
+    """ Régressions : rappel / MRR en baisse, latence, construction ou taille en hausse au-delà de la tolérance. """
+    regressions = []
+    for name, metrics in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for key, tolerance in TRACKED:
+            before, after = reference.get(key), metrics.get(key)
+            if before is None or after is None:
+                continue
+            if tolerance < 0 and after < before + tolerance:
+                regressions.append(f"{name}.{key} : {before} -> {after}")
+            # Les durées très courtes ne sont comparées qu'au-delà d'un écart absolu (bruit de mesure)
+            elif tolerance > 0 and after > before * (1 + tolerance) and after - before > (1.0 if key.endswith("ms") else 0.2):
+                regressions.append(f"{name}.{key} : {before} -> {after}")
+    return regressions
+
+
+def print_results(results, baseline, ks):
+    header = (f"{'configuration':<24} " + " ".join(f"{f'R@{k}':>7}" for k in ks) +
+              f" {'MRR':>6} {'p50 ms':>8} {'p99 ms':>8} {'constr.':>8} {'taille':>8}")
+    print(header)
+    print("-" * len(header))
+    for name, m in results.items():
+        print(f"{name:<24} " + " ".join(f"{100 * m[f'recall@{k}']:>6.1f}%" for k in ks) +
+              f" {m['mrr']:>6.3f} {m['latency_p50_ms']:>8.2f} {m['latency_p99_ms']:>8.2f} {m['build_seconds']:>7.2f}s {m['index_mb']:>6.2f}Mo")
+        reference = baseline.get(name)
+        if reference:
+            deltas = [
+                f"{key} {m[key] - reference[key]:+.3f}" if tolerance < 0 else f"{key} {100 * (m[key] - reference[key]) / reference[key]:+.0f}%"
+                for key, tolerance in TRACKED if reference.get(key) and key in m
+            ]
+            print(f"{'':<24} vs référence : {', '.join(deltas)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la recherche : rappel@k, MRR, latence, construction et taille par magasin")
+    parser.add_argument("--backends", nargs="*", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--modes", nargs="*", default=MODES, choices=MODES)
+    parser.add_argument("--k", nargs="*", type=int, default=[1, 4, 10], help="rappel@k mesuré pour chaque k")
+    parser.add_argument("--dimensions", type=int, default=256, help="dimension de l'embedder local")
+    parser.add_argument("--write-questions", type=int, metavar="N", help="régénérer N questions étiquetées puis quitter")
+    parser.add_argument("--output", help="fichier JSON où écrire les résultats (même format que la référence)")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer les mesures comme nouvelle référence")
+    args = parser.parse_args()
+
+    snapshot = fixture_snapshot()
+    summaries = build_summaries(snapshot)
+    if args.write_questions:
+        write_questions(summaries, snapshot, args.write_questions)
+        return
+
+    questions = load_questions()
+    analyzer = QueryAnalyzer.from_snapshot(snapshot)
+    embeddings_model = HashingEmbeddings(args.dimensions)
+    total = sum(len(items) for items in summaries.values())
+    print(f"📚 {total} résumés indexés, {len(questions)} questions étiquetées, embedder local {args.dimensions} dimensions.")
+    config = {"dimensions": args.dimensions, "k": sorted(args.k), "documents": total, "questions": len(questions)}
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="bench_retrieval_")
+    try:
+        for backend in args.backends:
+            path = os.path.join(workdir, backend)
+            start = time.perf_counter()
+            vector_retriever = build_store(backend, path, summaries, embeddings_model)
+            build_seconds = time.perf_counter() - start
+            store = {"build_seconds": round(build_seconds, 3), "index_mb": round(directory_size(path) / 1e6, 3)}
+
+            for mode in args.modes:
+                lexical = LexicalIndex.load(path) if mode == "hybride" else None
+                retriever = HybridRetriever(vector_retriever=vector_retriever, lexical=lexical)
+                print(f"⏱️ {backend} / {mode}...")
+                results[f"{backend}/{mode}"] = {**evaluate(retriever, analyzer, questions, sorted(args.k), mode != "sans-filtres"), **store}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("config") == config:
+            baseline = saved["runs"]
+        else:
+            print("⚠️ Référence enregistrée avec une autre configuration : pas de comparaison.")
+
+    print_results(results, baseline, sorted(args.k))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "runs": results}, f, indent=2, ensure_ascii=False)
+        print(f"💾 Résultats enregistrés dans {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "runs": {**baseline, **results}}, f, indent=2, ensure_ascii=False)
+        print(f"💾 Référence enregistrée dans {BASELINE_PATH}")
+        return
+
+    regressions = compare(results, baseline)
+    if regressions:
+        print("❌ Régressions par rapport à la référence :")
+        for regression in regressions:
+            print(f"   - {regression}")
+        sys.exit(1)
+    if baseline:
+        print("✅ Aucune régression par rapport à la référence.")
+
+
+if __name__ == "__main__":
+    main()
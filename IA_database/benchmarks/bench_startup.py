@@ -0,0 +1,151 @@
+"""
+Benchmark du démarrage à froid de chaque commande, chaque mesure dans un processus neuf :
+
+- `import` : chargement du script sans l'exécuter (aucun client ne doit être créé, aucune tâche lancée) ;
+- `--help` : analyse des arguments seule ;
+- `prêt` (chatbot) : import puis `create_chatbot()` contre `FakeSupabase` (tables de `fixture_corpus.py`),
+  au premier démarrage (instantané statistique lu depuis la base) puis au redémarrage (instantané local).
+
+Pour chaque mesure : durée dans le processus, durée totale (interpréteur compris) et bibliothèques lourdes chargées.
+Aucune clé API n'est nécessaire, aucun appel réseau n'est fait :
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --commands chatbot --repeat 3
+"""
+import argparse
+import json
+import os
+import runpy
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+IA_DIR = os.path.dirname(BENCH_DIR)
+ROOT_DIR = os.path.dirname(IA_DIR)
+
+COMMANDS = {
+    "chatbot": os.path.join(IA_DIR, "Chatbot.py"),
+    "request": os.path.join(IA_DIR, "Request.py"),
+    "request02": os.path.join(IA_DIR, "Request02.py"),
+    "insert": os.path.join(IA_DIR, "Insert.py"),
+    "prepare_data": os.path.join(ROOT_DIR, "prepare_data.py"),
+}
+HEAVY_MODULES = ("langchain_openai", "langchain_core", "chromadb", "supabase", "pandas", "numpy", "tiktoken")
+
+
+# 🧪 Processus enfant
+def run_child(args):
+    start = time.perf_counter()
+    sys.path.insert(0, os.path.dirname(args.script))
+    sys.path.insert(0, BENCH_DIR)
+    if args.mode == "ready":
+        from fake_supabase import FakeSupabase
+        import supabase as supabase_module
+        store = FakeSupabase().load(args.store)
+        supabase_module.create_client = lambda url, key: store
+
+    sys.argv = [args.script] + (["--help"] if args.mode == "help" else [])
+    try:
+        module = runpy.run_path(args.script, run_name="__main__" if args.mode == "help" else "bench_startup")
+        if args.mode == "ready":
+            module["create_chatbot"]()
+    except SystemExit:
+        pass
+    elapsed = time.perf_counter() - start
+
+    with open(args.metrics, "w", encoding="utf-8") as f:
+        json.dump({"seconds": elapsed, "heavy": [name for name in HEAVY_MODULES if name in sys.modules]}, f)
+
+
+# 🏁 Processus parent
+def seed_store(path):
+    from fake_supabase import FakeSupabase
+    from fixture_corpus import CIRCUITS, CONSTRUCTORS, load_drivers, results_corpus
+
+    store = FakeSupabase()
+    drivers = load_drivers(60)
+    store.table("drivers").insert([{**driver, "season": season} for season in (2022, 2023) for driver in drivers.values()]).execute()
+    store.table("circuits").insert([{"circuit_id": circuit_id, "circuit_name": name} for circuit_id, name in CIRCUITS]).execute()
+    store.table("constructors").insert([{"constructor_ref": ref, "name": ref.replace("_", " ").title()} for ref in CONSTRUCTORS]).execute()
+    store.table("results").insert(results_corpus()).execute()
+    store.dump(path)
+
+
+def measure(args, workdir, script, mode):
+    metrics_path = os.path.join(workdir, "metrics.json")
+    env = {
+        **os.environ,
+        "NEXT_PUBLIC_SUPABASE_URL": "http://supabase.local",
+        "NEXT_PUBLIC_SUPABASE_ANON_KEY": "bench",
+        "OPENAI_API_KEY": "bench",
+        "STATS_SNAPSHOT_PATH": os.path.join(workdir, "stats_snapshot.pkl"),
+        "ANSWER_CACHE_PATH": os.path.join(workdir, "answer_cache.sqlite"),
+        "CHAT_MEMORY_PATH": os.path.join(workdir, "chat_memory.sqlite"),
+        "EMBED_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite"),
+        "PYTHONIOENCODING": "utf-8",
+    }
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", "--mode", mode, "--script", script,
+        "--store", os.path.join(workdir, "store.json"), "--metrics", metrics_path,
+    ]
+    start = time.perf_counter()
+    with open(os.path.join(workdir, "child.log"), "w", encoding="utf-8") as log:
+        code = subprocess.call(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    wall = time.perf_counter() - start
+    if code != 0 or not os.path.exists(metrics_path):
+        with open(os.path.join(workdir, "child.log"), "r", encoding="utf-8") as log:
+            print(log.read()[-2000:])
+        raise RuntimeError(f"`{os.path.basename(script)}` ({mode}) a échoué (code {code})")
+    with open(metrics_path, "r", encoding="utf-8") as f:
+        metrics = json.load(f)
+    os.remove(metrics_path)
+    metrics["wall"] = wall
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage à froid des scripts")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    parser.add_argument("--script", help=argparse.SUPPRESS)
+    parser.add_argument("--store", help=argparse.SUPPRESS)
+    parser.add_argument("--metrics", help=argparse.SUPPRESS)
+    parser.add_argument("--commands", nargs="*", default=list(COMMANDS), choices=list(COMMANDS))
+    parser.add_argument("--repeat", type=int, default=3, help="mesures par commande (médiane affichée)")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    sys.path.insert(0, IA_DIR)
+    sys.path.insert(0, BENCH_DIR)
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        seed_store(os.path.join(workdir, "store.json"))
+        print(f"{'commande':<14} {'mesure':<18} {'processus':>10} {'total':>8}  bibliothèques chargées")
+        for name in args.commands:
+            modes = [("import", "import"), ("--help", "help")]
+            if name == "chatbot":
+                modes += [("prêt (1er)", "ready"), ("prêt (redémarrage)", "ready")]
+            for label, mode in modes:
+                if label == "prêt (1er)":
+                    for path in ("stats_snapshot.pkl", "chromadb_f1"):
+                        shutil.rmtree(os.path.join(workdir, path), ignore_errors=True)
+                        if os.path.exists(os.path.join(workdir, path)):
+                            os.remove(os.path.join(workdir, path))
+                repeat = 1 if label == "prêt (1er)" else args.repeat
+                runs = [measure(args, workdir, COMMANDS[name], mode) for _ in range(repeat)]
+                seconds = statistics.median(run["seconds"] for run in runs)
+                wall = statistics.median(run["wall"] for run in runs)
+                print(f"{name:<14} {label:<18} {seconds:>9.2f}s {wall:>7.2f}s  {', '.join(runs[-1]['heavy']) or '-'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
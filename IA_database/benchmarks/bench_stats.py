@@ -0,0 +1,80 @@
+"""
+Benchmark du moteur statistique (`stats_engine.py`) : routage des questions et latence.
+
+Sur l'instantané du corpus synthétique (`fixture_corpus.py`), chaque question étiquetée doit soit recevoir
+la réponse statistique attendue (valeur par pilote / écurie, ou classement, pour le bon indicateur), soit
+être laissée au chemin RAG (`None`) : une question causale, un championnat ou un décompte sans pilote reconnu
+ne doit jamais recevoir de classement. Toute erreur de routage est signalée (code de sortie 1) :
+
+    python benchmarks/bench_stats.py
+    python benchmarks/bench_stats.py --repeat 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_dispatcher import percentile
+from fixture_corpus import fixture_snapshot
+from query_analyzer import QueryAnalyzer
+from stats_engine import StatsEngine
+
+# (question, début de réponse attendu ; `None` : question laissée au RAG)
+CASES = [
+    ("Combien de victoires pour Romain Grosjean en 2012 ?", "📊 Victoires en 2012"),
+    ("Combien de points Kamui Kobayashi a-t-il gagnés en 2012 ?", "📊 Points en 2012"),
+    ("Combien de points a remporté Romain Grosjean en 2013 ?", "📊 Points en 2013"),
+    ("Combien de podiums pour Grosjean à Monza ?", "📊 Podiums à Autodromo Nazionale di Monza"),
+    ("Quelle écurie a le plus d'abandons en 2021 ?", "🏆 Écuries avec le plus d'abandons en 2021"),
+    ("Qui a gagné le plus de courses en 2015 ?", "🏆 Pilotes avec le plus de victoires en 2015"),
+    ("Classement des pilotes aux points en 2019", "🏆 Pilotes avec le plus de points en 2019"),
+    ("Qui a le plus de pole positions ?", "🏆 Pilotes avec le plus de pole positions sur toutes les saisons"),
+    # Régressions : ces questions recevaient un classement des victoires ou des abandons
+    ("Combien de points Lewis Hamilton a-t-il gagnés en 2019 ?", None),     # pilote absent du corpus
+    ("Qui a gagné le championnat 2021 ?", None),
+    ("Qui a remporté le titre en 2008 ?", None),
+    ("Pourquoi Romain Grosjean a-t-il abandonné à Monza en 2013 ?", None),
+    ("Combien de points rapporte une victoire ?", None),
+    ("Qui a gagné à Monza en 2019 ?", None),
+    ("Victoires de Grosjean", None),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du routage et de la latence du moteur statistique")
+    parser.add_argument("--repeat", type=int, default=50, help="passes sur les questions pour la latence")
+    args = parser.parse_args()
+
+    snapshot = fixture_snapshot()
+    analyzer = QueryAnalyzer.from_snapshot(snapshot)
+    engine = StatsEngine(snapshot)
+
+    failures = []
+    for question, expected in CASES:
+        answer = engine.answer(question, analyzer.analyze(question))
+        ok = answer is None if expected is None else answer is not None and answer.startswith(expected)
+        first_line = answer.splitlines()[0] if answer else "RAG"
+        print(f"{'✅' if ok else '❌'} {question:<62} -> {first_line}")
+        if not ok:
+            failures.append((question, expected, first_line))
+
+    latencies = []
+    for _ in range(args.repeat):
+        for question, _ in CASES:
+            start = time.perf_counter()
+            engine.answer(question, analyzer.analyze(question))
+            latencies.append(time.perf_counter() - start)
+    print(f"\n⏱️ {len(latencies)} réponses : p50 {1000 * percentile(latencies, 0.5):.2f} ms / p99 {1000 * percentile(latencies, 0.99):.2f} ms")
+
+    if failures:
+        print(f"❌ {len(failures)} erreur(s) de routage :")
+        for question, expected, got in failures:
+            print(f"   - {question} : attendu {expected or 'RAG'}, obtenu {got}")
+        sys.exit(1)
+    print(f"✅ {len(CASES)} questions correctement routées.")
+
+
+if __name__ == "__main__":
+    main()
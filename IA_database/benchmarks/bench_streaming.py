@@ -0,0 +1,72 @@
+"""
+Benchmark : réponse insérée en fin de génération vs réponse diffusée (`stream_writer.py`).
+
+Un LLM simulé émet les tokens à débit fixe après un délai de premier token ; les écritures passent par
+`FakeSupabase` avec une latence par requête. Pour chaque réglage (tokens par bloc, délai minimum entre
+deux écritures), on mesure le délai avant que la réponse soit visible dans la table `message`,
+la durée totale et le nombre d'écritures :
+
+    python benchmarks/bench_streaming.py --tokens 300 --rate 60 --first-token 0.4 --latency 0.05
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_supabase import FakeSupabase
+from stream_writer import StreamingMessage
+
+SETTINGS = [(1, 0.0), (8, 0.25), (16, 0.5), (32, 1.0)]
+
+
+def simulated_tokens(count, rate, first_token):
+    """ Tokens disponibles à `first_token + i / rate` secondes (flux tamponné : un lecteur lent ne ralentit pas le LLM). """
+    start = time.perf_counter()
+    for i in range(count):
+        delay = start + first_token + i / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield f" mot{i}"
+
+
+def run_blocking(args):
+    supabase = FakeSupabase(latency=args.latency)
+    start = time.perf_counter()
+    content = "".join(simulated_tokens(args.tokens, args.rate, args.first_token))
+    supabase.table("message").insert({"chat_id": 1, "role": "assistant", "content": content}).execute()
+    elapsed = time.perf_counter() - start
+    return {"visible": elapsed, "total": elapsed, "writes": supabase.requests}
+
+
+def run_streaming(args, chunk_tokens, write_interval):
+    supabase = FakeSupabase(latency=args.latency)
+    stream = StreamingMessage(supabase, 1, chunk_tokens=chunk_tokens, write_interval=write_interval)
+    for token in simulated_tokens(args.tokens, args.rate, args.first_token):
+        stream.write(token)
+    stream.close()
+    total = time.perf_counter() - stream.start
+    row = supabase.rows("message")[0]
+    assert row["complete"] and row["content"] == stream.content
+    return {"visible": stream.first_write, "total": total, "writes": stream.writes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des réponses diffusées")
+    parser.add_argument("--tokens", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=60, help="tokens par seconde")
+    parser.add_argument("--first-token", type=float, default=0.4, help="délai du premier token (s)")
+    parser.add_argument("--latency", type=float, default=0.05, help="latence d'une écriture Supabase (s)")
+    args = parser.parse_args()
+
+    print(f"{args.tokens} tokens à {args.rate:.0f} tokens/s, premier token après {args.first_token:.2f}s, écriture {1000 * args.latency:.0f} ms")
+    print(f"{'mode':<24} {'affichage':>10} {'total':>8} {'écritures':>10} {'écritures/s':>12}")
+    rows = [("fin de génération", run_blocking(args))]
+    rows += [(f"diffusion {tokens} tok / {interval:.2f}s", run_streaming(args, tokens, interval)) for tokens, interval in SETTINGS]
+    for name, row in rows:
+        print(f"{name:<24} {row['visible']:>9.2f}s {row['total']:>7.2f}s {row['writes']:>10} {row['writes'] / row['total']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark : corpus de recherche en lignes brutes (un résultat, un pilote-saison) vs résumés
+(saison d'un pilote, course, carrière — `summaries.py`).
+
+Construit les deux index NumPy sur le corpus synthétique de `fixture_corpus.py` avec l'embedder local
+`HashingEmbeddings`, puis compare le nombre de vecteurs, le temps de construction, la taille sur disque
+et, par question, le contexte envoyé au LLM : k documents bruts, k résumés plus les lignes de détail, puis le même
+contexte borné à quelques budgets dont `CONTEXT_TOKENS` (`budgeted_context`, comme dans le chatbot).
+Pour chacun : taille (tokens estimés), documents trouvés conservés, part des questions dont le résumé visé (course
+ou saison du pilote) est conservé, et part des questions dont la réponse figure dans le contexte (ligne exacte du
+résultat, ou résumé de la course citant le pilote) :
+
+    python benchmarks/bench_summaries.py --k 4
+    python benchmarks/bench_summaries.py --budgets 120 300 600
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_query_filters import QUESTIONS, driver_name
+from fixture_corpus import CIRCUITS, CONSTRUCTORS, HashingEmbeddings, load_drivers, result_id, results_corpus
+from embedding_engine import estimate_tokens
+from query_analyzer import QueryAnalyzer
+from stats_engine import StatsSnapshot
+from summaries import CONTEXT_TOKENS, SUMMARY_TEMPLATES, budgeted_context, build_summaries, drilldown_rows, summary_text
+from templates import driver_season_text, result_with_driver_text
+from vector_index import NumpyRetriever, VectorIndex, build_index
+
+
+def embedded(rows, render, embeddings_model, batch_size=1000):
+    for start in range(0, len(rows), batch_size):
+        page = rows[start:start + batch_size]
+        yield [{**row, "embedding": vector} for row, vector in zip(page, embeddings_model.embed_documents([render(row) for row in page]))]
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def build(name, path, sources, renderers, embeddings_model):
+    start = time.perf_counter()
+    count = build_index(sources, path=path, ivf_lists=0)
+    elapsed = time.perf_counter() - start
+    retriever = NumpyRetriever(index=VectorIndex(path), embeddings_model=embeddings_model, renderers=renderers)
+    return {"name": name, "vectors": count, "seconds": elapsed, "bytes": directory_size(path), "retriever": retriever}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des documents de résumé")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[120, 300], help="budgets de contexte comparés à CONTEXT_TOKENS")
+    args = parser.parse_args()
+
+    drivers = load_drivers(60)
+    results = results_corpus()
+    driver_rows = [{**driver, "season": season} for season in range(2000, 2024) for driver in drivers.values()]
+    snapshot = StatsSnapshot({
+        "results": pd.DataFrame(results),
+        "drivers": pd.DataFrame(driver_rows),
+        "circuits": pd.DataFrame([{"circuit_id": circuit_id, "circuit_name": name} for circuit_id, name in CIRCUITS]),
+        "constructors": pd.DataFrame([{"constructor_ref": ref, "name": ref.replace("_", " ").title()} for ref in CONSTRUCTORS]),
+    })
+    embeddings_model = HashingEmbeddings(args.dimensions)
+
+    def render_result(result):
+        return result_with_driver_text(result, driver_name(drivers, result["driver_id"]))
+
+    workdir = tempfile.mkdtemp(prefix="bench_summaries_")
+    try:
+        raw = build("brut", os.path.join(workdir, "raw"), [
+            ("results", embedded(results, render_result, embeddings_model), result_id),
+            ("drivers", embedded(driver_rows, driver_season_text, embeddings_model), lambda driver: f"{driver['driver_ref']}_{driver['season']}"),
+        ], {"results": render_result, "drivers": driver_season_text}, embeddings_model)
+
+        start = time.perf_counter()
+        summaries = build_summaries(snapshot)
+        aggregation = time.perf_counter() - start
+        summarized = build("résumés", os.path.join(workdir, "summaries"), [
+            ("summaries", embedded(items, SUMMARY_TEMPLATES[level], embeddings_model), lambda summary: summary["id"])
+            for level, items in summaries.items()
+        ], {"summaries": summary_text}, embeddings_model)
+        summarized["seconds"] += aggregation
+
+        circuit_names = dict(CIRCUITS)
+        rng = random.Random(0)
+        targets = {
+            rng.choice(QUESTIONS).format(
+                name=driver_name(drivers, row["driver_id"]), last_name=drivers[row["driver_id"]]["last_name"],
+                circuit=circuit_names[row["circuit_id"]], season=row["season"]
+            ): row
+            for row in rng.sample(results, args.queries)
+        }
+        questions = list(targets)
+        summary_texts = {summary["id"]: summary_text(summary) for items in summaries.values() for summary in items}
+
+        def relevant_summaries(question, context):
+            """ Résumé de la course ou de la saison du pilote visés par la question, présent dans le contexte. """
+            row = targets[question]
+            ids = [f"race_{row['season']}_{row['circuit_id']}", f"driver_season_{row['season']}_{row['driver_id']}"]
+            return any(summary_texts.get(summary_id, "\0") in context for summary_id in ids)
+
+        def answered(question, context):
+            """ La réponse est dans le contexte : ligne exacte du résultat, ou résumé de la course qui cite le pilote. """
+            row = targets[question]
+            race = summary_texts.get(f"race_{row['season']}_{row['circuit_id']}", "\0")
+            return render_result(row) in context or (race in context and driver_name(drivers, row["driver_id"]) in race)
+
+        analyzer = QueryAnalyzer.from_snapshot(snapshot)
+        details = {
+            question: [render_result(row) for row in drilldown_rows(snapshot.results, analyzer.analyze(question))]
+            for question in questions
+        }
+        raw_documents = {question: [doc.page_content for doc in raw["retriever"].retrieve(question, args.k)] for question in questions}
+        documents = {question: [doc.page_content for doc in summarized["retriever"].retrieve(question, args.k)] for question in questions}
+        contexts = [("brut", raw, raw_documents, lambda question: "\n\n".join(raw_documents[question]))]
+        contexts.append(("résumés", summarized, documents, lambda question: budgeted_context(documents[question], details[question], budget=float("inf"))))
+        for budget in sorted(set(args.budgets) | {CONTEXT_TOKENS}):
+            label = f"budget {budget}{' (défaut)' if budget == CONTEXT_TOKENS else ''}"
+            contexts.append((label, summarized, documents,
+                             lambda question, budget=budget: budgeted_context(documents[question], details[question], budget=budget)))
+
+        print(f"{'corpus':<22} {'vecteurs':>9} {'construction':>13} {'taille':>10} {'contexte / question':>24} {'docs gardés':>12} {'résumé visé':>12} {'réponse présente':>17}")
+        for name, corpus, found, build_context in contexts:
+            texts = {question: build_context(question) for question in questions}
+            characters = sum(len(text) for text in texts.values()) / len(texts)
+            tokens = sum(estimate_tokens(text) for text in texts.values()) / len(texts)
+            kept = sum(sum(doc in texts[question] for doc in found[question]) for question in questions) / len(questions)
+            coverage = sum(answered(question, texts[question]) for question in questions) / len(questions)
+            targeted = sum(relevant_summaries(question, texts[question]) for question in questions) / len(questions)
+            print(
+                f"{name:<22} {corpus['vectors']:>9} {corpus['seconds']:>12.1f}s {corpus['bytes'] / 1e6:>8.1f} Mo "
+                f"{characters:>10.0f} car. (~{tokens:>3.0f} tokens) {kept:>7.1f}/{args.k} {100 * targeted:>11.1f}% {100 * coverage:>16.1f}%"
+            )
+        print(f"📌 Budget de contexte : CONTEXT_TOKENS={CONTEXT_TOKENS}.")
+        print(f"✅ {raw['vectors'] / summarized['vectors']:.1f}x moins de vecteurs avec les résumés.")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark : formats de stockage des embeddings (`vector_codec.py`) — taille, vitesse d'encodage / décodage
+des colonnes texte et rappel@k par rapport aux vecteurs float32 complets, avec ou sans PCA.
+
+Par défaut sur des vecteurs synthétiques groupés (aucune clé API) ; `--index` évalue les vecteurs
+d'un index NumPy float32 existant (`python chatbot.py -reload` avec `VECTOR_BACKEND=numpy`) :
+
+    python benchmarks/bench_vector_codec.py --vectors 20000 --dimensions 1536 --pca 256 512
+    python benchmarks/bench_vector_codec.py --index vector_index
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_codec import ENCODINGS, bytes_per_vector, decode_vectors, encode_vectors, recall_report
+
+
+def synthetic_vectors(count, dimensions, clusters=200, seed=0):
+    """ Vecteurs groupés autour de `clusters` centres, à la manière d'embeddings de textes proches. """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    return centers[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dimensions)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des formats de stockage des embeddings")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--pca", type=int, nargs="*", default=[256, 512])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index", help="Répertoire d'un index NumPy float32 à évaluer")
+    args = parser.parse_args()
+
+    if args.index:
+        vectors = np.load(os.path.join(args.index, "vectors.npy"), mmap_mode="r")
+        vectors = np.asarray(vectors[:args.vectors], dtype=np.float32)
+    else:
+        vectors = synthetic_vectors(args.vectors, args.dimensions)
+    dimensions = vectors.shape[1]
+
+    # 🗄️ Colonnes texte : taille et débit sur 1000 vecteurs
+    sample = vectors[:1000]
+    print(f"Colonne texte ({len(sample)} vecteurs de {dimensions} dimensions) :")
+    for encoding in ENCODINGS:
+        start = time.perf_counter()
+        values = encode_vectors(sample, encoding)
+        encoded = time.perf_counter() - start
+        start = time.perf_counter()
+        decode_vectors(values)
+        decoded = time.perf_counter() - start
+        size = sum(len(value) for value in values) / len(values)
+        print(f"   {encoding:<8} {size:>8.0f} octets/vecteur  encodage {1000 * encoded:7.1f} ms  décodage {1000 * decoded:7.1f} ms")
+
+    # 🎯 Index local : rappel@k de chaque réglage
+    settings = [(encoding, 0) for encoding in ("float32", "float16", "int8")]
+    settings += [(encoding, size) for size in args.pca if size < dimensions for encoding in ("float32", "int8")]
+    print(f"Index local ({len(vectors)} vecteurs, rappel@{args.k} par rapport au float32 complet) :")
+    for row in recall_report(vectors, k=args.k, settings=settings):
+        ratio = bytes_per_vector("float32", dimensions) / row["bytes"]
+        print(
+            f"   {row['encoding']:<8} {row['dimensions']:>5} dim  {row['bytes']:>6} octets/vecteur ({ratio:4.1f}x plus petit)  "
+            f"rappel@{args.k} {100 * row['recall']:5.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
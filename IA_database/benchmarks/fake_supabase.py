@@ -0,0 +1,247 @@
+"""
+Stand-in mémoire compatible avec le sous-ensemble de l'API PostgREST / supabase-py utilisé par les scripts
+(`table().select().order().range().eq()/gt()/gte()/lt()/lte().limit()`, `insert`, `upsert(on_conflict=...)`, `update().eq()`, `execute()`).
+
+Permet de tester les écritures sans base : latence simulée par requête, erreurs transitoires
+aléatoires (HTTP 503) et lignes rejetées par des validateurs (codes SQLSTATE comme PostgreSQL) :
+
+    supabase = FakeSupabase(latency=0.01, failure_rate=0.05,
+                            validators={"results": lambda row: None if row.get("driver_id") else "driver_id manquant"})
+"""
+import json
+import operator
+import os
+import random
+import threading
+import time
+
+
+class FakeAPIError(Exception):
+    """ Même forme que `postgrest.exceptions.APIError` : un `code` et un message. """
+
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+
+
+OPERATORS = {"eq": operator.eq, "gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+
+
+def matches(row, column, op, value):
+    current = row.get(column)
+    if current is None:
+        return False
+    return OPERATORS[op](current, value)
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.payload = None
+        self.on_conflict = None
+        self.columns = None
+        self.filters = []
+        self.ordering = []
+        self.start = 0
+        self.end = None
+
+    # 🔎 Lecture
+    def select(self, columns="*", count=None):
+        self.action = "select"
+        self.columns = None if columns.strip() == "*" else [column.strip() for column in columns.split(",")]
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, "eq", value))
+        return self
+
+    def gt(self, column, value):
+        self.filters.append((column, "gt", value))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append((column, "gte", value))
+        return self
+
+    def lt(self, column, value):
+        self.filters.append((column, "lt", value))
+        return self
+
+    def lte(self, column, value):
+        self.filters.append((column, "lte", value))
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def limit(self, count):
+        self.end = self.start + count - 1
+        return self
+
+    # ✍️ Écriture
+    def insert(self, rows):
+        self.action, self.payload = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.action, self.payload = "upsert", rows if isinstance(rows, list) else [rows]
+        self.on_conflict = on_conflict
+        return self
+
+    def update(self, values):
+        self.action, self.payload = "update", values
+        return self
+
+    def execute(self):
+        return self.client.execute(self)
+
+
+class FakeSupabase:
+    """
+    Tables en mémoire : `rowid -> ligne`, plus un index unique par jeu de colonnes `on_conflict`
+    (construit à la première utilisation), comme les contraintes d'unicité de PostgreSQL.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, validators=None, primary_keys=None, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.validators = validators or {}
+        self.primary_keys = primary_keys or {}
+        self.random = random.Random(seed)
+        self.tables = {}
+        self.indexes = {}
+        self.next_ids = {}
+        self.requests = 0
+        self.rows_written = 0
+        self.lock = threading.Lock()
+
+    # 💾 Persistance entre deux processus (exécution complète puis incrémentale)
+    def dump(self, path):
+        with self.lock:
+            data = {name: list(table.values()) for name, table in self.tables.items()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"tables": data, "next_ids": self.next_ids}, f)
+
+    def load(self, path):
+        """ Recharge un état sauvegardé par `dump` (sans effet si le fichier n'existe pas). """
+        if not os.path.exists(path):
+            return self
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        self.next_ids.update(saved["next_ids"])
+        self.tables = {name: dict(enumerate(rows)) for name, rows in saved["tables"].items()}
+        self.indexes = {}
+        return self
+
+    def key_columns(self, name, on_conflict=None):
+        columns = on_conflict or self.primary_keys.get(name, "id")
+        if isinstance(columns, str):
+            columns = columns.split(",")
+        return tuple(column.strip() for column in columns)
+
+    def index(self, name, columns):
+        if (name, columns) not in self.indexes:
+            self.indexes[(name, columns)] = {
+                tuple(row.get(column) for column in columns): rowid
+                for rowid, row in self.tables.get(name, {}).items()
+            }
+        return self.indexes[(name, columns)]
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rows(self, name):
+        with self.lock:
+            return list(self.tables.get(name, {}).values())
+
+    def execute(self, query):
+        with self.lock:
+            self.requests += 1
+            failure = self.random.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failure:
+            raise FakeAPIError("503", "Service Unavailable")
+        if query.action == "select":
+            return self._select(query)
+        if query.action == "update":
+            return self._update(query)
+        return self._write(query)
+
+    def _select(self, query):
+        rows = self.rows(query.table)
+        rows = [row for row in rows if all(matches(row, column, op, value) for column, op, value in query.filters)]
+        for column, desc in reversed(query.ordering):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        rows = rows[query.start:None if query.end is None else query.end + 1]
+        if query.columns:
+            rows = [{column: row.get(column) for column in query.columns} for row in rows]
+        return FakeResponse([dict(row) for row in rows])
+
+    def _update(self, query):
+        with self.lock:
+            updated = []
+            for row in self.tables.get(query.table, {}).values():
+                if all(matches(row, column, op, value) for column, op, value in query.filters):
+                    row.update(query.payload)
+                    updated.append(dict(row))
+            self.rows_written += len(updated)
+        return FakeResponse(updated)
+
+    def _write(self, query):
+        validator = self.validators.get(query.table)
+        # Comme PostgreSQL, un lot est atomique : une ligne invalide fait échouer toute la requête
+        for row in query.payload:
+            error = validator(row) if validator else None
+            if error:
+                raise FakeAPIError("23502", error)
+
+        columns = self.key_columns(query.table, query.on_conflict)
+        with self.lock:
+            table = self.tables.setdefault(query.table, {})
+            index = self.index(query.table, columns)
+
+            staged = {}
+            for row in query.payload:
+                if columns == ("id",) and "id" not in row:
+                    # Colonne `id` auto-incrémentée, comme une clé `bigserial`
+                    self.next_ids[query.table] = self.next_ids.get(query.table, 0) + 1
+                    row = {**row, "id": self.next_ids[query.table]}
+                key = tuple(row.get(column) for column in columns)
+                if key in staged:
+                    raise FakeAPIError("21000", "ON CONFLICT DO UPDATE command cannot affect row a second time")
+                if query.action == "insert" and key in index:
+                    raise FakeAPIError("23505", f"duplicate key value violates unique constraint {key}")
+                staged[key] = row
+
+            written = []
+            for key, row in staged.items():
+                rowid = index.get(key)
+                if rowid is None:
+                    rowid = len(table)
+                    while rowid in table:
+                        rowid += 1
+                    merged = dict(row)
+                else:
+                    merged = {**table[rowid], **row}
+                table[rowid] = merged
+                for (name, index_columns), other in self.indexes.items():
+                    if name == query.table:
+                        other[tuple(merged.get(column) for column in index_columns)] = rowid
+                written.append(dict(merged))
+            self.rows_written += len(written)
+        return FakeResponse(written)
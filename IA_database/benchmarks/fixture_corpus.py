@@ -0,0 +1,115 @@
+"""
+Corpus de recherche synthétique et déterministe pour les benchmarks de recherche (sans Supabase ni clé API) :
+résultats de course générés à partir de `pilotes.json` et de vrais noms de circuits, plus un embedder
+« sac de mots » local dont les similarités reflètent les mots partagés (contrairement à `FakeEmbeddings`).
+"""
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_analyzer import normalize
+
+PILOTES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pilotes.json")
+
+CIRCUITS = [
+    ("silverstone", "Silverstone Circuit"),
+    ("monza", "Autodromo Nazionale di Monza"),
+    ("monaco", "Circuit de Monaco"),
+    ("spa", "Circuit de Spa-Francorchamps"),
+    ("suzuka", "Suzuka Circuit"),
+    ("interlagos", "Autódromo José Carlos Pace"),
+    ("hungaroring", "Hungaroring"),
+    ("catalunya", "Circuit de Barcelona-Catalunya"),
+    ("villeneuve", "Circuit Gilles Villeneuve"),
+    ("albert_park", "Albert Park Grand Prix Circuit"),
+    ("bahrain", "Bahrain International Circuit"),
+    ("red_bull_ring", "Red Bull Ring"),
+    ("marina_bay", "Marina Bay Street Circuit"),
+    ("yas_marina", "Yas Marina Circuit"),
+    ("americas", "Circuit of the Americas"),
+    ("rodriguez", "Autódromo Hermanos Rodríguez"),
+    ("zandvoort", "Circuit Park Zandvoort"),
+    ("imola", "Autodromo Enzo e Dino Ferrari"),
+    ("baku", "Baku City Circuit"),
+    ("shanghai", "Shanghai International Circuit"),
+]
+CONSTRUCTORS = ["ferrari", "mclaren", "williams", "red_bull", "mercedes", "renault", "sauber", "alpine", "haas", "alphatauri"]
+STATUSES = ["Finished", "Finished", "Finished", "+1 Lap", "Engine", "Collision", "Gearbox", "Accident"]
+
+
+class HashingEmbeddings:
+    """
+    Embedder local déterministe par hachage des mots (« sac de mots » signé) : deux textes proches
+    partagent des mots, donc des composantes. Même interface que les modèles LangChain.
+    """
+
+    def __init__(self, dimensions=512):
+        self.dimensions = dimensions
+        self.calls = 0
+
+    def _vector(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in normalize(text).split():
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self._vector(text)
+
+
+def load_drivers(count):
+    with open(PILOTES_PATH, "r", encoding="utf-8") as f:
+        pilotes = json.load(f)
+    return {pilote["driver_ref"]: pilote for pilote in pilotes[-count:]}
+
+
+def results_corpus(first_season=2000, last_season=2023, drivers_per_race=20, driver_pool=60):
+    """ Lignes `results` déterministes : chaque saison, chaque circuit, `drivers_per_race` pilotes. """
+    drivers = list(load_drivers(driver_pool))
+    rows = []
+    for season in range(first_season, last_season + 1):
+        for circuit_index, (circuit_id, _) in enumerate(CIRCUITS):
+            for slot in range(drivers_per_race):
+                seed = season * 1000 + circuit_index * 37 + slot
+                position = (slot + season + circuit_index) % drivers_per_race + 1
+                rows.append({
+                    "season": season,
+                    "circuit_id": circuit_id,
+                    "driver_id": drivers[(season * 7 + circuit_index * 3 + slot) % len(drivers)],
+                    "constructor_id": CONSTRUCTORS[(slot + season) % len(CONSTRUCTORS)],
+                    "grid": (seed * 13) % drivers_per_race + 1,
+                    "position": position,
+                    "points": max(0, 26 - position * 2) if position <= 10 else 0,
+                    "status": STATUSES[seed % len(STATUSES)],
+                })
+    return rows
+
+
+def fixture_snapshot(driver_pool=60):
+    """ Instantané statistique (`StatsSnapshot`) du corpus : résultats, pilotes, circuits et constructeurs. """
+    import pandas as pd
+    from stats_engine import StatsSnapshot
+
+    return StatsSnapshot({
+        "results": pd.DataFrame(results_corpus(driver_pool=driver_pool)),
+        "drivers": pd.DataFrame([{**driver, "season": 2000} for driver in load_drivers(driver_pool).values()]),
+        "circuits": pd.DataFrame([{"circuit_id": circuit_id, "circuit_name": name} for circuit_id, name in CIRCUITS]),
+        "constructors": pd.DataFrame([{"constructor_ref": ref, "name": ref.replace("_", " ").title()} for ref in CONSTRUCTORS]),
+    })
+
+
+def result_id(result):
+    return f"{result['season']}_{result['circuit_id']}_{result['driver_id']}"
@@ -0,0 +1,207 @@
+"""
+Serveur HTTP local qui imite l'API Ergast à partir de `pilotes.json` et de données synthétiques déterministes
+(calendriers, constructeurs, circuits, résultats), avec la même pagination (`limit`, `offset`, `MRData.total`).
+
+    server = FixtureErgast(first_season=1950, rounds=20, drivers_per_race=20, latency=0.02)
+    base_url = server.start()   # à passer dans ERGAST_BASE_URL
+    ...
+    server.stop()
+"""
+import http.server
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import parse_qsl, urlparse
+
+PILOTES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pilotes.json")
+CIRCUIT_COUNT = 30
+CONSTRUCTOR_COUNT = 10
+
+ROUTES = [
+    (re.compile(r"^/circuits\.json$"), "circuits"),
+    (re.compile(r"^/(\d{4})\.json$"), "schedule"),
+    (re.compile(r"^/(\d{4})/drivers\.json$"), "drivers"),
+    (re.compile(r"^/(\d{4})/constructors\.json$"), "constructors"),
+    (re.compile(r"^/(\d{4})/results\.json$"), "results"),
+    (re.compile(r"^/(\d{4})/(\d+)/results\.json$"), "round_results"),
+]
+
+
+class FixtureErgast:
+    def __init__(self, first_season=1950, last_season=None, rounds=20, drivers_per_race=20,
+                 latency=0.0, default_limit=30, max_limit=1000):
+        self.first_season = first_season
+        self.last_season = last_season or date.today().year
+        self.rounds = rounds
+        self.drivers_per_race = drivers_per_race
+        self.latency = latency
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.server = None
+
+        with open(PILOTES_PATH, "r", encoding="utf-8") as f:
+            self.pilotes = json.load(f)
+
+    # 🏁 Données synthétiques
+    def circuit(self, index):
+        return {
+            "circuitId": f"circuit_{index}",
+            "url": f"http://en.wikipedia.org/wiki/Circuit_{index}",
+            "circuitName": f"Circuit {index}",
+            "Location": {"lat": f"{index * 1.5:.4f}", "long": f"{index * -2.25:.4f}", "locality": f"Ville {index}", "country": f"Pays {index % 12}"}
+        }
+
+    def constructor(self, index):
+        return {
+            "constructorId": f"team_{index}",
+            "url": f"http://en.wikipedia.org/wiki/Team_{index}",
+            "name": f"Team {index}",
+            "nationality": ["British", "Italian", "German", "French", "Austrian"][index % 5]
+        }
+
+    def driver(self, season, slot):
+        pilote = self.pilotes[(season * 7 + slot) % len(self.pilotes)]
+        driver = {
+            "driverId": pilote["driver_ref"],
+            "url": pilote["url"],
+            "givenName": pilote["first_name"],
+            "familyName": pilote["last_name"],
+            "dateOfBirth": pilote["dob"],
+            "nationality": pilote["nationality"]
+        }
+        if season >= 2014:
+            driver["permanentNumber"] = str(slot + 2)
+            driver["code"] = pilote["last_name"][:3].upper()
+        return driver
+
+    def race(self, season, round_number):
+        circuit = self.circuit((season + round_number) % CIRCUIT_COUNT)
+        return {
+            "season": str(season),
+            "round": str(round_number),
+            "url": f"http://en.wikipedia.org/wiki/{season}_Grand_Prix_{round_number}",
+            "raceName": f"Grand Prix {round_number}",
+            "Circuit": circuit,
+            "date": (date(season, 3, 1) + timedelta(days=7 * (round_number - 1))).isoformat(),
+            "time": "14:00:00Z"
+        }
+
+    def result(self, season, round_number, slot):
+        position = (slot + round_number) % self.drivers_per_race + 1
+        points = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+        return {
+            "number": str(slot + 2),
+            "position": str(position),
+            "positionText": str(position),
+            "points": str(points[position - 1] if position <= len(points) else 0),
+            "Driver": self.driver(season, slot),
+            "Constructor": self.constructor(slot % CONSTRUCTOR_COUNT),
+            "grid": str((slot + 2 * round_number) % self.drivers_per_race + 1),
+            "laps": "58",
+            "status": "Finished" if position <= 15 else "+1 Lap"
+        }
+
+    def schedule(self, season):
+        return [self.race(season, round_number) for round_number in range(1, self.rounds + 1)]
+
+    def raced(self, season):
+        today = date.today().isoformat()
+        return [race for race in self.schedule(season) if race["date"] <= today]
+
+    # 📄 Réponses paginées
+    def items(self, kind, groups):
+        if kind == "circuits":
+            return "CircuitTable", "Circuits", [self.circuit(index) for index in range(CIRCUIT_COUNT)], {}
+        season = int(groups[0])
+        if not self.first_season <= season <= self.last_season:
+            return None
+        if kind == "schedule":
+            return "RaceTable", "Races", self.schedule(season), {"season": str(season)}
+        if kind == "drivers":
+            return "DriverTable", "Drivers", [self.driver(season, slot) for slot in range(self.drivers_per_race)], {"season": str(season)}
+        if kind == "constructors":
+            return "ConstructorTable", "Constructors", [self.constructor(index) for index in range(CONSTRUCTOR_COUNT)], {"season": str(season)}
+        races = self.raced(season)
+        if kind == "round_results":
+            races = [race for race in races if race["round"] == groups[1]]
+        # Les résultats sont paginés par ligne de résultat, une course peut donc être coupée entre deux pages
+        rows = [(race, self.result(season, int(race["round"]), slot)) for race in races for slot in range(self.drivers_per_race)]
+        return "RaceTable", "Races", rows, {"season": str(season)}
+
+    def respond(self, path, query):
+        for pattern, kind in ROUTES:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return None
+        found = self.items(kind, match.groups())
+        if found is None:
+            return None
+        table_key, list_key, items, extra = found
+
+        limit = min(int(query.get("limit", self.default_limit)), self.max_limit)
+        offset = int(query.get("offset", 0))
+        page = items[offset:offset + limit]
+        if kind in ("results", "round_results"):
+            races = []
+            for race, result in page:
+                if races and races[-1]["round"] == race["round"]:
+                    races[-1]["Results"].append(result)
+                else:
+                    races.append({**race, "Results": [result]})
+            page = races
+
+        return {"MRData": {
+            "xmlns": "http://ergast.com/mrd/1.5",
+            "series": "f1",
+            "url": f"http://ergast.com/api/f1{path}",
+            "limit": str(limit),
+            "offset": str(offset),
+            "total": str(len(items)),
+            table_key: {**extra, list_key: page}
+        }}
+
+    # 🌐 Serveur
+    def start(self):
+        fixture = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with fixture.lock:
+                    fixture.requests += 1
+                if fixture.latency:
+                    time.sleep(fixture.latency)
+                url = urlparse(self.path)
+                data = fixture.respond(url.path, dict(parse_qsl(url.query)))
+                body = json.dumps(data).encode("utf-8") if data is not None else b""
+                self.send_response(200 if data is not None else 404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def reset_requests(self):
+        with self.lock:
+            count, self.requests = self.requests, 0
+        return count
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,178 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 📌 Paramètres d'écriture en masse (surchargeables via `.env`)
+MAX_BATCH_BYTES = int(os.getenv("BULK_MAX_BYTES", "2000000"))
+MAX_BATCH_ROWS = int(os.getenv("BULK_MAX_ROWS", "1000"))
+WRITE_WORKERS = int(os.getenv("BULK_WORKERS", "4"))
+MAX_RETRIES = int(os.getenv("BULK_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("BULK_BACKOFF", "0.5"))
+
+# Codes PostgREST / HTTP transitoires : on réessaie le même lot
+TRANSIENT_CODES = {"408", "429", "500", "502", "503", "504", "PGRST000", "PGRST001", "PGRST002", "PGRST003", "57014", "40001", "40P01"}
+
+
+def is_rejection(error):
+    """
+    Un lot est « rejeté » quand PostgreSQL refuse son contenu (contrainte, type invalide...) :
+    le renvoyer tel quel ne sert à rien, il faut isoler les lignes fautives.
+    Les erreurs réseau et les codes transitoires sont réessayés.
+    """
+    code = str(getattr(error, "code", "") or "")
+    return bool(code) and code not in TRANSIENT_CODES
+
+
+class BulkWriter:
+    """
+    Écrivain en masse vers une table Supabase :
+    - lots dimensionnés par taille de payload (octets) et nombre de lignes ;
+    - plusieurs lots envoyés en parallèle (nombre de lots en vol borné) ;
+    - retries avec backoff exponentiel sur les erreurs transitoires ;
+    - bissection d'un lot rejeté pour isoler les lignes fautives au lieu de perdre tout le lot.
+
+        with BulkWriter(supabase, "results", on_conflict="season, circuit_id, driver_id") as writer:
+            writer.write(rows)
+    """
+
+    def __init__(self, supabase, table, on_conflict=None, mode="upsert", max_bytes=MAX_BATCH_BYTES,
+                 max_rows=MAX_BATCH_ROWS, workers=WRITE_WORKERS, max_retries=MAX_RETRIES, verbose=True):
+        self.supabase = supabase
+        self.table = table
+        self.on_conflict = on_conflict
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.max_retries = max_retries
+        self.verbose = verbose
+
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.in_flight = threading.BoundedSemaphore(workers * 2)
+        self.futures = []
+        self.lock = threading.Lock()
+        self.buffer_lock = threading.Lock()
+
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.written = 0
+        self.requests = 0
+        self.retries = 0
+        self.rejected = []
+        self.failed = 0
+        self.start = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ✍️ Découpage en lots
+    def write(self, rows):
+        """ Ajoute des lignes (appelable depuis plusieurs threads) ; les lots pleins partent immédiatement en arrière-plan. """
+        with self.buffer_lock:
+            for row in rows:
+                size = len(json.dumps(row, ensure_ascii=False, default=str)) + 1
+                if self.buffer and (self.buffer_bytes + size > self.max_bytes or len(self.buffer) >= self.max_rows):
+                    self._flush()
+                self.buffer.append(row)
+                self.buffer_bytes += size
+
+    def flush(self):
+        with self.buffer_lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        batch, self.buffer, self.buffer_bytes = self.buffer, [], 0
+        self.in_flight.acquire()  # backpressure : au plus `workers * 2` lots en vol
+        future = self.executor.submit(self._send_and_release, batch)
+        self.futures.append(future)
+
+    def close(self):
+        """ Envoie le dernier lot, attend la fin des envois et affiche le bilan. """
+        self.flush()
+        for future in self.futures:
+            future.result()
+        self.futures = []
+        self.executor.shutdown(wait=True)
+        if self.verbose:
+            self.report()
+        return self.stats()
+
+    # 🚀 Envoi
+    def _send_and_release(self, batch):
+        try:
+            self._send(batch)
+        finally:
+            self.in_flight.release()
+
+    def _execute(self, batch):
+        query = self.supabase.table(self.table)
+        if self.mode == "insert":
+            query = query.insert(batch)
+        elif self.on_conflict:
+            query = query.upsert(batch, on_conflict=self.on_conflict)
+        else:
+            query = query.upsert(batch)
+        with self.lock:
+            self.requests += 1
+        return query.execute()
+
+    def _send(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._execute(batch)
+                with self.lock:
+                    self.written += len(batch)
+                return
+            except Exception as e:
+                if is_rejection(e):
+                    self._bisect(batch, e)
+                    return
+                if attempt == self.max_retries:
+                    print(f"❌ `{self.table}` : lot de {len(batch)} lignes abandonné après {self.max_retries} essais : {e}")
+                    with self.lock:
+                        self.failed += len(batch)
+                    return
+                with self.lock:
+                    self.retries += 1
+                time.sleep(BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE))
+
+    def _bisect(self, batch, error):
+        """ Coupe un lot rejeté en deux jusqu'à isoler les lignes invalides. """
+        if len(batch) == 1:
+            with self.lock:
+                self.rejected.append((batch[0], str(error)))
+            return
+        middle = len(batch) // 2
+        self._send(batch[:middle])
+        self._send(batch[middle:])
+
+    # 📊 Bilan
+    def stats(self):
+        elapsed = time.perf_counter() - self.start
+        return {
+            "table": self.table,
+            "written": self.written,
+            "rejected": len(self.rejected),
+            "failed": self.failed,
+            "requests": self.requests,
+            "retries": self.retries,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(self.written / elapsed, 1) if elapsed else 0.0
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(
+            f"📊 `{self.table}` : {stats['written']} lignes écrites en {stats['seconds']:.1f}s "
+            f"({stats['rows_per_second']:.0f} lignes/s, {stats['requests']} requêtes, {stats['retries']} retries), "
+            f"{stats['rejected']} rejetées, {stats['failed']} en échec."
+        )
+        for row, error in self.rejected[:5]:
+            print(f"   ⚠️ Ligne rejetée : {json.dumps(row, ensure_ascii=False, default=str)[:200]} -> {error}")
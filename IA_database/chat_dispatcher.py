@@ -0,0 +1,287 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import metrics
+
+# 📌 Paramètres du répartiteur de messages (surchargeables via `.env`)
+POLL_INTERVAL = float(os.getenv("CHAT_POLL_INTERVAL", "2"))
+WORKERS = int(os.getenv("CHAT_WORKERS", "4"))
+FETCH_LIMIT = int(os.getenv("CHAT_FETCH_LIMIT", "100"))
+STATS_INTERVAL = float(os.getenv("CHAT_STATS_INTERVAL", "60"))
+CURSOR_PATH = os.getenv("CHAT_CURSOR_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".chat_cursor.json"))
+
+STOP_WORDS = {"exit", "quit", "bye"}
+
+
+def parse_timestamp(value):
+    """ `created_at` Supabase (ISO 8601) -> datetime avec fuseau. """
+    try:
+        timestamp = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def percentile(values, ratio):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))]
+
+
+class ChatCursor:
+    """
+    Curseur persistant : `created_at` du dernier message dont tous les prédécesseurs sont traités,
+    et les ids déjà traités à cet instant exact (plusieurs messages peuvent partager le même `created_at`).
+    """
+
+    def __init__(self, path=CURSOR_PATH):
+        self.path = path
+        self.created_at = None
+        self.ids = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            self.created_at = saved.get("created_at")
+            self.ids = set(saved.get("ids", []))
+
+    def advance(self, message):
+        if message["created_at"] != self.created_at:
+            self.created_at, self.ids = message["created_at"], set()
+        self.ids.add(message["id"])
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created_at": self.created_at, "ids": sorted(self.ids, key=str)}, f)
+        os.replace(tmp_path, self.path)
+
+
+class ChatMetrics:
+    """
+    Profondeur de file, débit et latence par message (réception -> réponse enregistrée).
+    Les durées sont aussi transmises aux mesures du processus (`metrics.py`, étapes `chat.*`).
+    """
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.received = 0
+        self.answered = 0
+        self.failed = 0
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=1000)      # création du message -> réponse (s)
+        self.handle_times = deque(maxlen=1000)   # traitement seul (s)
+        self.stages = {}                         # étape (recherche, génération...) -> durées (s)
+
+    def record_stages(self, timings):
+        for stage, seconds in (timings or {}).items():
+            self.stages.setdefault(stage, deque(maxlen=1000)).append(seconds)
+            metrics.observe(f"chat.{stage}", seconds)
+
+    def record_message(self, seconds, latency=None, failed=False):
+        self.handle_times.append(seconds)
+        metrics.observe("chat.handle", seconds, error=failed)
+        if latency is not None:
+            self.latencies.append(latency)
+            metrics.observe("chat.latency", latency)
+
+    def stats(self):
+        elapsed = time.monotonic() - self.start
+        return {
+            "received": self.received,
+            "answered": self.answered,
+            "failed": self.failed,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "throughput_per_minute": round(60 * self.answered / elapsed, 2) if elapsed else 0.0,
+            "latency_p50": round(percentile(self.latencies, 0.5), 3),
+            "latency_p95": round(percentile(self.latencies, 0.95), 3),
+            "handle_p50": round(percentile(self.handle_times, 0.5), 3),
+            "handle_p95": round(percentile(self.handle_times, 0.95), 3),
+            "stages": {
+                stage: {"p50": round(percentile(values, 0.5), 3), "p95": round(percentile(values, 0.95), 3)}
+                for stage, values in self.stages.items()
+            }
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(
+            f"📊 Chat : {stats['answered']} réponses ({stats['throughput_per_minute']:.1f}/min), {stats['failed']} échecs, "
+            f"file {stats['queue_depth']}, en cours {stats['in_flight']}, "
+            f"latence p50 {stats['latency_p50']:.1f}s / p95 {stats['latency_p95']:.1f}s "
+            f"(traitement p50 {stats['handle_p50']:.1f}s / p95 {stats['handle_p95']:.1f}s)"
+        )
+        for stage, values in stats["stages"].items():
+            print(f"   ⏱️ {stage} : p50 {values['p50']:.2f}s / p95 {values['p95']:.2f}s")
+
+
+class ChatDispatcher:
+    """
+    Répartiteur des messages utilisateurs :
+    - récupère tous les messages `user` postérieurs au curseur (pas seulement le dernier) ;
+    - les répartit sur un pool de workers asynchrones ;
+    - une conversation n'est traitée que par un worker à la fois (ordre préservé dans chaque chat),
+      les conversations différentes sont traitées en parallèle.
+
+    `handle(message)` est synchrone (appels LLM / Supabase) et exécuté dans un thread ; il peut renvoyer
+    un dict `{étape: durée}` (recherche, génération...) agrégé dans les métriques.
+    """
+
+    def __init__(self, supabase, handle, workers=WORKERS, poll_interval=POLL_INTERVAL, cursor=None, on_report=None):
+        self.supabase = supabase
+        self.handle = handle
+        self.on_report = on_report
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.cursor = cursor or ChatCursor()
+        self.metrics = ChatMetrics()
+
+        self.chats = {}            # chat_id -> deque des messages en attente
+        self.ready = None          # asyncio.Queue des chat_id prêts à être traités
+        self.dispatched = deque()  # messages dans l'ordre de réception (pour faire avancer le curseur)
+        self.done = set()
+        self.seen = set()
+        self.stopping = False
+
+    # 📥 Récupération des messages
+    def initial_cursor(self):
+        """ Sans curseur enregistré : on repart de la dernière réponse du bot. """
+        response = self.supabase.table("message").select("created_at").eq("role", "assistant").order("created_at", desc=True).limit(1).execute()
+        return response.data[0]["created_at"] if response.data else None
+
+    def fetch_new_messages(self):
+        """ Messages `user` depuis le curseur (exécuté dans un thread ; le tri des déjà vus est fait par `unseen`). """
+        messages = []
+        while True:
+            query = self.supabase.table("message").select("*").eq("role", "user")
+            if self.cursor.created_at:
+                query = query.gte("created_at", self.cursor.created_at)
+            response = query.order("created_at").order("id").range(len(messages), len(messages) + FETCH_LIMIT - 1).execute()
+            page = response.data or []
+            messages.extend(page)
+            if len(page) < FETCH_LIMIT:
+                break
+        return messages
+
+    def unseen(self, messages):
+        """
+        Messages ni en cours, ni déjà traités. Exécuté dans la boucle d'événements, comme `complete` : `seen` et
+        le curseur ne changent pas pendant le tri. Un message terminé pendant la récupération a quitté `seen`
+        et le curseur a pu avancer au-delà de son `created_at` (ses ids sont alors oubliés) : il est écarté par la date.
+        """
+        cursor_time = parse_timestamp(self.cursor.created_at) if self.cursor.created_at else None
+        fresh = []
+        for message in messages:
+            if message["id"] in self.seen or message["id"] in self.cursor.ids:
+                continue
+            created_at = parse_timestamp(message.get("created_at"))
+            if cursor_time and created_at and created_at < cursor_time:
+                continue
+            fresh.append(message)
+        return fresh
+
+    def enqueue(self, message):
+        self.seen.add(message["id"])
+        self.dispatched.append(message)
+        self.metrics.received += 1
+        self.metrics.queue_depth += 1
+
+        pending = self.chats.get(message["chat_id"])
+        if pending is None:
+            # Conversation inactive : elle devient prête pour un worker
+            self.chats[message["chat_id"]] = deque([message])
+            self.ready.put_nowait(message["chat_id"])
+        else:
+            pending.append(message)
+
+    def complete(self, message):
+        """ Fait avancer le curseur jusqu'au premier message encore en attente. """
+        self.done.add(message["id"])
+        advanced = False
+        while self.dispatched and self.dispatched[0]["id"] in self.done:
+            first = self.dispatched.popleft()
+            self.done.discard(first["id"])
+            self.seen.discard(first["id"])
+            self.cursor.advance(first)
+            advanced = True
+        if advanced:
+            self.cursor.save()
+
+    # ⚙️ Workers
+    async def worker(self):
+        while True:
+            chat_id = await self.ready.get()
+            message = self.chats[chat_id][0]
+            self.metrics.queue_depth -= 1
+            self.metrics.in_flight += 1
+            start = time.monotonic()
+            latency, failed = None, False
+            try:
+                if message["content"].strip().lower() in STOP_WORDS:
+                    print("👋 Chatbot arrêté.")
+                    self.stopping = True
+                else:
+                    timings = await asyncio.to_thread(self.handle, message)
+                    self.metrics.record_stages(timings if isinstance(timings, dict) else None)
+                    self.metrics.answered += 1
+                    created_at = parse_timestamp(message.get("created_at"))
+                    if created_at:
+                        latency = (datetime.now(timezone.utc) - created_at).total_seconds()
+            except Exception as e:
+                self.metrics.failed += 1
+                failed = True
+                print(f"❌ Erreur lors du traitement du message {message['id']} (chat {chat_id}) : {e}")
+            finally:
+                self.metrics.record_message(time.monotonic() - start, latency, failed)
+                self.metrics.in_flight -= 1
+                self.complete(message)
+
+                pending = self.chats[chat_id]
+                pending.popleft()
+                if pending:
+                    self.ready.put_nowait(chat_id)
+                else:
+                    del self.chats[chat_id]
+                self.ready.task_done()
+
+    # 🔁 Boucle principale
+    async def run(self):
+        self.ready = asyncio.Queue()
+        if self.cursor.created_at is None:
+            self.cursor.created_at = await asyncio.to_thread(self.initial_cursor)
+
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        last_report = time.monotonic()
+        print(f"💬 Chatbot en attente de messages ({self.workers} workers)...")
+
+        try:
+            while not self.stopping:
+                try:
+                    messages = await asyncio.to_thread(self.fetch_new_messages)
+                    for message in self.unseen(messages):
+                        self.enqueue(message)
+                except Exception as e:
+                    print(f"⚠️ Erreur lors de la récupération des messages : {e}")
+
+                if time.monotonic() - last_report >= STATS_INTERVAL:
+                    self.report()
+                    last_report = time.monotonic()
+                await asyncio.sleep(self.poll_interval)
+
+            # Arrêt : on termine les messages déjà reçus
+            await self.ready.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            self.report()
+
+    def report(self):
+        self.metrics.report()
+        if self.on_report:
+            self.on_report()
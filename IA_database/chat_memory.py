@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+from embedding_engine import estimate_tokens
+
+# 📌 Mémoire des conversations (surchargeable via `.env`)
+#
+# Chaque tour, le prompt reprend le résumé glissant de la conversation (au plus `CHAT_SUMMARY_TOKENS`)
+# et les derniers échanges tels quels (au plus `CHAT_MEMORY_TOKENS`) : sa taille ne dépend pas de la longueur
+# de la conversation. Quand le budget est dépassé, les plus anciens échanges sont ajoutés au résumé (un appel LLM,
+# sur ces seuls échanges) jusqu'à redescendre à la moitié du budget : un résumé couvre ainsi plusieurs échanges.
+CHAT_MEMORY = os.getenv("CHAT_MEMORY", "1") != "0"
+MEMORY_CHATS = int(os.getenv("CHAT_MEMORY_CHATS", "256"))       # conversations gardées en mémoire (LRU)
+MEMORY_TOKENS = int(os.getenv("CHAT_MEMORY_TOKENS", "1000"))    # derniers échanges repris tels quels
+SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "250"))   # résumé glissant
+LOAD_LIMIT = int(os.getenv("CHAT_MEMORY_LOAD_LIMIT", "50"))     # messages relus au plus quand une conversation revient
+MEMORY_PATH = os.getenv("CHAT_MEMORY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".chat_memory.sqlite"))
+
+SUMMARY_PROMPT = (
+    "Tu tiens le résumé d'une conversation entre un utilisateur et un assistant spécialisé en Formule 1. "
+    "Intègre les nouveaux échanges au résumé actuel en conservant les pilotes, écuries, circuits, saisons "
+    "et chiffres mentionnés. Réponds uniquement par le nouveau résumé, en {words} mots au plus."
+)
+PROMPT_ROLES = {"user": "human", "assistant": "ai"}
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ChatState:
+    """ Mémoire d'une conversation : résumé glissant, derniers échanges et `created_at` du dernier message résumé. """
+
+    def __init__(self, summary="", until=None):
+        self.summary = summary
+        self.until = until
+        self.turns = deque()   # {"role", "content", "created_at", "tokens"}
+        self.tokens = 0
+
+    def append(self, role, content, created_at):
+        turn = {"role": role, "content": content, "created_at": created_at, "tokens": estimate_tokens(content)}
+        self.turns.append(turn)
+        self.tokens += turn["tokens"]
+
+
+class ChatMemory:
+    """
+    Mémoire par conversation, partagée par les workers du répartiteur :
+    - LRU de `max_chats` conversations ; une conversation absente (nouvelle ou évincée) est rechargée
+      au premier message depuis la table `message` (seulement les messages postérieurs au résumé) ;
+    - résumé glissant persistant (SQLite), mis à jour de façon incrémentale quand les derniers échanges
+      dépassent `max_tokens`.
+
+        history = memory.prompt(message)        # messages LangChain à placer avant la question
+        ...
+        memory.record(message, answer)
+
+    Le répartiteur ne traite qu'un message à la fois par conversation : seul l'accès au LRU et à SQLite est verrouillé.
+    """
+
+    def __init__(self, supabase, llm, path=MEMORY_PATH, max_chats=MEMORY_CHATS, max_tokens=MEMORY_TOKENS,
+                 summary_tokens=SUMMARY_TOKENS, load_limit=LOAD_LIMIT):
+        self.supabase = supabase
+        self.llm = llm
+        self.max_chats = max_chats
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.load_limit = load_limit
+        self.chats = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.summaries = 0
+        self.summary_seconds = 0.0
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS summaries (chat_id TEXT PRIMARY KEY, summary TEXT NOT NULL, until TEXT, updated REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    # 📥 Chargement paresseux
+    def state(self, message):
+        chat_id = str(message["chat_id"])
+        with self.lock:
+            state = self.chats.get(chat_id)
+            if state is not None:
+                self.chats.move_to_end(chat_id)
+                self.hits += 1
+                return state
+
+        state = self.load(message)
+        with self.lock:
+            self.chats[chat_id] = state
+            self.chats.move_to_end(chat_id)
+            while len(self.chats) > self.max_chats:
+                self.chats.popitem(last=False)
+        return state
+
+    def load(self, message):
+        """ Résumé enregistré, puis messages postérieurs à ce résumé et antérieurs à `message` (les plus récents). """
+        chat_id = str(message["chat_id"])
+        with self.lock:
+            self.loads += 1
+            row = self.connection.execute("SELECT summary, until FROM summaries WHERE chat_id = ?", (chat_id,)).fetchone()
+        state = ChatState(*row) if row else ChatState()
+
+        query = self.supabase.table("message").select("id, role, content, created_at").eq("chat_id", message["chat_id"])
+        if message.get("created_at"):
+            query = query.lt("created_at", message["created_at"])
+        if state.until:
+            query = query.gt("created_at", state.until)
+        rows = query.order("created_at", desc=True).limit(self.load_limit).execute().data or []
+        for row in reversed(rows):
+            if row["role"] in PROMPT_ROLES and row.get("content"):
+                state.append(row["role"], str(row["content"]), row["created_at"])
+        self.compact(chat_id, state)
+        return state
+
+    # 🧾 Prompt et mise à jour
+    def prompt(self, message):
+        """ Messages LangChain : résumé (s'il existe) puis derniers échanges, dans la limite des budgets. """
+        state = self.state(message)
+        messages = [("system", f"Résumé de la conversation jusqu'ici : {state.summary}")] if state.summary else []
+        messages += [(PROMPT_ROLES[turn["role"]], turn["content"]) for turn in state.turns]
+        return messages
+
+    def record(self, message, answer):
+        """ Ajoute l'échange ; renvoie la durée du résumé (s) si des échanges ont dû être résumés, sinon 0. """
+        state = self.state(message)
+        state.append("user", str(message["content"]), message.get("created_at") or now_iso())
+        state.append("assistant", answer, now_iso())
+        return self.compact(str(message["chat_id"]), state)
+
+    def compact(self, chat_id, state):
+        """ Au-delà de `max_tokens`, résume les plus anciens échanges jusqu'à redescendre à la moitié du budget. """
+        if state.tokens <= self.max_tokens:
+            return 0.0
+        overflow = []
+        while state.turns and state.tokens > self.max_tokens // 2:
+            turn = state.turns.popleft()
+            state.tokens -= turn["tokens"]
+            overflow.append(turn)
+
+        start = time.perf_counter()
+        state.summary = self.summarize(state.summary, overflow)
+        state.until = overflow[-1]["created_at"]
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.summaries += 1
+            self.summary_seconds += elapsed
+            self.connection.execute(
+                "INSERT OR REPLACE INTO summaries (chat_id, summary, until, updated) VALUES (?, ?, ?, ?)",
+                (chat_id, state.summary, state.until, time.time())
+            )
+            self.connection.commit()
+        return elapsed
+
+    def summarize(self, summary, turns):
+        exchanges = "\n".join(f"{'Utilisateur' if turn['role'] == 'user' else 'Assistant'} : {turn['content']}" for turn in turns)
+        response = self.llm.bind(max_tokens=self.summary_tokens).invoke([
+            ("system", SUMMARY_PROMPT.format(words=int(0.7 * self.summary_tokens))),
+            ("human", f"Résumé actuel : {summary or '(aucun)'}\n\nNouveaux échanges :\n{exchanges}")
+        ])
+        return response.content.strip()
+
+    def report(self):
+        average = 1000 * self.summary_seconds / self.summaries if self.summaries else 0
+        print(
+            f"🧠 Mémoire des conversations : {len(self.chats)}/{self.max_chats} en mémoire, {self.hits} hits, "
+            f"{self.loads} chargements, {self.summaries} résumés ({average:.0f} ms en moyenne)"
+        )
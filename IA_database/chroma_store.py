@@ -0,0 +1,230 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+
+# 📌 Collections ChromaDB versionnées (surchargeables via `.env`)
+#
+# `-reload` n'écrit jamais dans les collections servies : chaque reconstruction remplit des collections fantômes
+# `<nom>__v<version>`, les vérifie, puis les active en remplaçant atomiquement `active_collections.json`.
+# Le chatbot en cours voit la nouvelle version de données et rouvre ses collections entre deux questions :
+# la recherche ne s'interrompt jamais. Les versions plus anciennes que `CHROMA_KEEP_VERSIONS` sont supprimées.
+ACTIVE_FILE = "active_collections.json"
+VERSION_MARK = "__v"
+CHROMA_WRITE_BATCH = int(os.getenv("CHROMA_WRITE_BATCH", "1000"))    # enregistrements par `upsert` (au-delà, index HNSW surdimensionné)
+KEEP_VERSIONS = int(os.getenv("CHROMA_KEEP_VERSIONS", "1"))          # versions précédentes gardées pour les lecteurs en cours
+RENDER_WORKERS = int(os.getenv("RELOAD_RENDER_WORKERS", "0"))        # > 0 : gabarits rendus dans un pool de processus
+
+# Collections non versionnées des anciennes versions du chatbot, traitées comme la version la plus ancienne
+LEGACY_COLLECTIONS = ["summaries", "results", "drivers"]
+
+
+def clean_metadata(row):
+    """ ChromaDB n'accepte pas les `None` dans les métadonnées. """
+    return {k: (v if v is not None else "") for k, v in row.items()}
+
+
+def read_active(path):
+    """ `{"version": ..., "collections": {nom logique: collection ChromaDB}}`, vide avant la première activation. """
+    try:
+        with open(os.path.join(path, ACTIVE_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def active_collections(path):
+    return read_active(path).get("collections", {})
+
+
+def write_active(path, version, collections):
+    os.makedirs(path, exist_ok=True)
+    target = os.path.join(path, ACTIVE_FILE)
+    tmp_path = f"{target}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "collections": collections, "activated": time.time()}, f)
+    os.replace(tmp_path, target)
+
+
+def collection_names(client):
+    # `list_collections` renvoie des noms ou des objets `Collection` selon la version de chromadb
+    return [getattr(collection, "name", collection) for collection in client.list_collections()]
+
+
+# 🧩 Rendu des documents
+def render_page(job):
+    """ Exécuté dans un processus du pool : `(gabarit, lignes)` -> `[(métadonnées nettoyées, texte)]`. """
+    template, rows = job
+    return [(clean_metadata(row), template(row)) for row in rows]
+
+
+def rendered_pages(pages, template, workers=None):
+    """
+    Pages de lignes -> pages de `{"metadata", "text"}`. Avec `workers > 0` (`RELOAD_RENDER_WORKERS` par défaut),
+    le rendu des gabarits et le nettoyage des métadonnées sont faits dans un pool de processus (au plus `2 x workers` pages en vol).
+    """
+    workers = RENDER_WORKERS if workers is None else workers
+    if workers <= 0:
+        for page in pages:
+            yield [{"metadata": metadata, "text": text} for metadata, text in render_page((template, page))]
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for page in pages:
+            pending.append(executor.submit(render_page, (template, page)))
+            if len(pending) >= 2 * workers:
+                yield [{"metadata": metadata, "text": text} for metadata, text in pending.pop(0).result()]
+        for future in pending:
+            yield [{"metadata": metadata, "text": text} for metadata, text in future.result()]
+
+
+# ✍️ Écriture par gros lots
+class ChunkedWriter:
+    """
+    Accumule les enregistrements `(id, embedding, métadonnées)` et les écrit par `upsert` de `batch_size`
+    (un seul enregistrement par id). Utilisable depuis plusieurs threads ; `flush()` écrit le reste.
+    """
+
+    def __init__(self, collection, batch_size=CHROMA_WRITE_BATCH):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.buffer = {}
+        self.ids = set()
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, records):
+        with self.lock:
+            for record in records:
+                self.buffer[record[0]] = record
+                self.ids.add(record[0])
+            if len(self.buffer) < self.batch_size:
+                return
+            batch, self.buffer = self.buffer, {}
+        self._upsert(list(batch.values()))
+
+    def flush(self):
+        with self.lock:
+            batch, self.buffer = self.buffer, {}
+        if batch:
+            self._upsert(list(batch.values()))
+
+    def _upsert(self, records):
+        for start in range(0, len(records), self.batch_size):
+            chunk = records[start:start + self.batch_size]
+            with metrics.timer("chroma.write", items=len(chunk), collection=self.collection.name):
+                self.collection.upsert(
+                    ids=[record[0] for record in chunk],
+                    embeddings=[record[1] for record in chunk],
+                    metadatas=[record[2] for record in chunk]
+                )
+            with self.lock:
+                self.writes += 1
+
+
+# 🔁 Reconstruction dans des collections fantômes
+class ShadowCollections:
+    """
+    Reconstruction sans interruption des collections ChromaDB `names` :
+
+        with ShadowCollections(client, CHROMA_DB_PATH, ["summaries"]) as shadow:
+            write = shadow.writer("summaries")
+            ...                                  # écritures dans `summaries__v<version>`, invisibles du chatbot
+        # sortie normale : vérification, activation atomique, suppression des anciennes versions
+        # exception : collections fantômes supprimées, les collections servies restent intactes
+
+    `before_activate(version)` est appelé juste avant l'activation (index lexical : jamais plus ancien que les collections
+    servies), `on_activate(version)` juste après (version des données...).
+    """
+
+    def __init__(self, client, path, names, batch_size=None, keep_versions=KEEP_VERSIONS, before_activate=None, on_activate=None):
+        self.client = client
+        self.path = path
+        self.batch_size = min(batch_size or CHROMA_WRITE_BATCH, client.get_max_batch_size())
+        self.keep_versions = keep_versions
+        self.before_activate = before_activate
+        self.on_activate = on_activate
+        self.version = f"{time.strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:6]}"
+        self.names = {name: f"{name}{VERSION_MARK}{self.version}" for name in names}
+        self.collections = {}
+        self.writers = {}
+
+    def __enter__(self):
+        for name, physical in self.names.items():
+            self.collections[name] = self.client.create_collection(name=physical)
+        print(f"🧱 Collections fantômes créées : {', '.join(self.names.values())}")
+        return self
+
+    def writer(self, name):
+        if name not in self.writers:
+            self.writers[name] = ChunkedWriter(self.collections[name], self.batch_size)
+        return self.writers[name]
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            try:
+                self.verify()
+            except Exception:
+                self.drop()
+                raise
+            self.activate()
+            self.collect_garbage()
+        else:
+            print("❌ Reconstruction interrompue : collections fantômes supprimées, la version servie est conservée.")
+            self.drop()
+        return False
+
+    def verify(self):
+        """ Chaque collection fantôme contient exactement les ids écrits (et au moins un). """
+        for name, collection in self.collections.items():
+            writer = self.writers.get(name)
+            if writer:
+                writer.flush()
+            expected = len(writer.ids) if writer else 0
+            count = collection.count()
+            if not expected or count != expected:
+                raise RuntimeError(f"❌ Collection `{self.names[name]}` incomplète : {count} documents pour {expected} écrits.")
+            if not collection.get(ids=[next(iter(writer.ids))], include=["embeddings"])["ids"]:
+                raise RuntimeError(f"❌ Collection `{self.names[name]}` illisible.")
+        print(f"✅ Collections fantômes vérifiées : {', '.join(f'{self.names[name]} ({len(self.writers[name].ids)})' for name in self.names)}")
+
+    def activate(self):
+        previous = read_active(self.path).get("version")
+        if self.before_activate:
+            self.before_activate(self.version)
+        write_active(self.path, self.version, self.names)
+        if self.on_activate:
+            self.on_activate(self.version)
+        print(f"🔀 Version {self.version} activée (précédente : {previous or 'collections non versionnées'}).")
+
+    def drop(self):
+        for physical in self.names.values():
+            try:
+                self.client.delete_collection(name=physical)
+            except Exception as e:
+                print(f"⚠️ Suppression de `{physical}` impossible : {e}")
+
+    def collect_garbage(self):
+        """
+        Supprime les versions plus anciennes que les `keep_versions` précédentes (collections non versionnées comprises),
+        ainsi que les anciennes collections non versionnées qui ne sont plus reconstruites.
+        """
+        existing = collection_names(self.client)
+        active = set(self.names.values())
+        obsolete = []
+        for name in self.names:
+            versions = sorted((physical for physical in existing if physical.startswith(f"{name}{VERSION_MARK}")), reverse=True)
+            previous = [physical for physical in versions if physical not in active]
+            if name in LEGACY_COLLECTIONS and name in existing:
+                previous.append(name)
+            obsolete += previous[self.keep_versions:]
+        # Collections non versionnées sans équivalent reconstruit (`results`, `drivers`) : plus jamais servies
+        obsolete += [name for name in LEGACY_COLLECTIONS if name not in self.names and name in existing]
+        for physical in obsolete:
+            self.client.delete_collection(name=physical)
+            print(f"🧹 Ancienne collection `{physical}` supprimée.")
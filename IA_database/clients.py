@@ -0,0 +1,82 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from metrics import instrument_supabase
+
+# 📌 Clients partagés par les scripts, créés à la première utilisation
+#
+# Aucun script ne se connecte ni n'importe langchain / chromadb / supabase au chargement : chaque client est
+# construit (et sa bibliothèque importée) au premier appel de sa fabrique, puis réutilisé par tout le processus.
+# `create_client` et `OpenAIEmbeddings` sont résolus à l'appel : un benchmark peut les remplacer par des stand-ins.
+# Les requêtes Supabase sont mesurées (`metrics.py`, étapes `supabase.read` / `supabase.write`).
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o-mini")
+
+_clients = {}
+_lock = threading.RLock()
+
+
+def require_env(*names):
+    """ Valeurs des variables d'environnement (fichier `.env` compris) ; `ValueError` si l'une manque. """
+    load_dotenv()
+    values = [os.getenv(name) for name in names]
+    missing = [name for name, value in zip(names, values) if not value]
+    if missing:
+        raise ValueError(f"❌ Vérifiez que {', '.join(missing)} sont bien définis dans votre fichier .env")
+    return values
+
+
+def shared(key, factory):
+    """ Client `key` du processus, construit une seule fois par `factory()` (même depuis plusieurs threads). """
+    with _lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+
+def get_supabase():
+    def create():
+        from supabase import create_client
+        url, key = require_env("NEXT_PUBLIC_SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_ANON_KEY")
+        return instrument_supabase(create_client(url, key))
+    return shared("supabase", create)
+
+
+def get_embeddings_model():
+    def create():
+        from langchain_openai.embeddings import OpenAIEmbeddings
+        api_key, = require_env("OPENAI_API_KEY")
+        return OpenAIEmbeddings(openai_api_key=api_key)
+    return shared("embeddings", create)
+
+
+def get_chat_llm(model=CHAT_MODEL, temperature=0):
+    def create():
+        from langchain_openai import ChatOpenAI
+        api_key, = require_env("OPENAI_API_KEY")
+        return ChatOpenAI(temperature=temperature, model=model, openai_api_key=api_key)
+    return shared(("llm", model, temperature), create)
+
+
+def get_chromadb_client(path):
+    def create():
+        import chromadb
+        return chromadb.PersistentClient(path=path)
+    return shared(("chromadb", path), create)
+
+
+def get_reference_index():
+    """ Index mémoire des pilotes, courses, circuits et constructeurs (chargé depuis Supabase au premier appel). """
+    def create():
+        from reference_index import ReferenceIndex
+        return ReferenceIndex(get_supabase())
+    return shared("reference_index", create)
+
+
+def get_ingestion_state():
+    """ État d'ingestion (saisons et manches déjà chargées), partagé par les fonctions d'un script d'ingestion. """
+    def create():
+        from ingestion_state import IngestionState
+        return IngestionState(get_supabase())
+    return shared("ingestion_state", create)
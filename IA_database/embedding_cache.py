@@ -0,0 +1,93 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+# 📌 Cache local persistant des embeddings (SQLite, vecteurs stockés en blobs float32)
+CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".embedding_cache.sqlite"))
+
+
+def cache_key(model_name, template, text):
+    """ Clé de contenu : empreinte de (modèle, version du gabarit, texte rendu). """
+    return hashlib.sha256(f"{model_name}\x00{template}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def model_name(embeddings_model):
+    return getattr(embeddings_model, "model", None) or type(embeddings_model).__name__
+
+
+class EmbeddingCache:
+    """ Cache `clé -> vecteur float32`, partagé entre threads. """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.pruned = set()   # (gabarit, version) déjà nettoyés par ce processus
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, template TEXT NOT NULL, version TEXT NOT NULL, vector BLOB NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get_many(self, keys):
+        """ Renvoie `{clé: vecteur}` pour les clés présentes dans le cache. """
+        found = {}
+        keys = list(keys)
+        with self.lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self.connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries):
+        """ `entries` : itérable de `(clé, gabarit, version, vecteur)`. """
+        rows = [
+            (key, template, version, np.asarray(vector, dtype=np.float32).tobytes())
+            for key, template, version, vector in entries
+        ]
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self.connection.commit()
+
+    def prune(self, template, version):
+        """ Supprime les vecteurs produits par une ancienne version d'un gabarit (une seule fois par version et par processus). """
+        with self.lock:
+            if (template, version) in self.pruned:
+                return
+            self.pruned.add((template, version))
+            deleted = self.connection.execute(
+                "DELETE FROM embeddings WHERE template = ? AND version != ?", (template, version)
+            ).rowcount
+            self.connection.commit()
+        if deleted:
+            print(f"🧹 Cache embeddings : {deleted} vecteurs obsolètes supprimés pour `{template}`.")
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        print(f"🗄️ Cache embeddings : {self.hits} hits, {self.misses} misses, taux de hit {rate:.0f}%")
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """ Cache partagé du processus (désactivable avec `EMBED_CACHE=0`). """
+    global _default_cache
+    if os.getenv("EMBED_CACHE", "1") == "0":
+        return None
+    if _default_cache is None:
+        _default_cache = EmbeddingCache()
+    return _default_cache
@@ -0,0 +1,171 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import metrics
+from embedding_cache import cache_key, get_default_cache, model_name
+from templates import template_version
+
+# 📌 Paramètres des lots d'embeddings (surchargeables via `.env`)
+BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "50000"))
+BATCH_MAX_ITEMS = int(os.getenv("EMBED_BATCH_ITEMS", "512"))
+MAX_CONCURRENT_BATCHES = int(os.getenv("EMBED_CONCURRENCY", "4"))
+TOKENS_PER_MINUTE = int(os.getenv("EMBED_TPM", "1000000"))
+
+_encoding = None
+
+
+def token_encoding():
+    """ Encodage tiktoken chargé au premier comptage (il peut être téléchargé), `False` si indisponible. """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding
+
+
+def estimate_tokens(text):
+    """ Nombre de tokens d'un texte (tiktoken si disponible, sinon ~4 caractères par token). """
+    encoding = token_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+class TokenBudget:
+    """ Seau à jetons partagé : au plus `tokens_per_minute` tokens envoyés par minute. """
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.available = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens):
+        if self.capacity <= 0:
+            return
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+                wait = (tokens - self.available) / self.rate
+            time.sleep(wait)
+
+
+token_budget = TokenBudget(TOKENS_PER_MINUTE)
+
+
+def make_batches(token_counts, max_tokens=BATCH_MAX_TOKENS, max_items=BATCH_MAX_ITEMS):
+    """ Regroupe des indices en lots respectant un plafond de tokens et de textes. """
+    batch, batch_tokens = [], 0
+    for index, tokens in enumerate(token_counts):
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(index)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def embed_texts(embeddings_model, texts, template=None, cache=None, max_workers=MAX_CONCURRENT_BATCHES, budget=None, verbose=True):
+    """
+    Calcule les embeddings de `texts` via `embed_documents`, par lots et en parallèle.
+
+    Les textes identiques ne sont envoyés qu'une fois et ceux déjà présents dans le cache
+    (même modèle, même version de `template`, même texte) ne sont pas renvoyés à l'API.
+    Les vecteurs sont renvoyés dans l'ordre des textes d'entrée. `cache=False` désactive le cache.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    budget = budget or token_budget
+    cache = get_default_cache() if cache is None else cache or None
+
+    vectors = {}
+    unique_texts = list(dict.fromkeys(texts))
+
+    if cache is not None:
+        template_name = template.__name__ if template else "raw"
+        version = template_version(template) if template else "0"
+        if template:
+            # Un seul `DELETE` par version de gabarit, pas un par lot d'un chargement en flux
+            cache.prune(template_name, version)
+        keys = {text: cache_key(model_name(embeddings_model), version, text) for text in unique_texts}
+        cached = cache.get_many(keys.values())
+        vectors = {text: cached[key] for text, key in keys.items() if key in cached}
+        unique_texts = [text for text in unique_texts if text not in vectors]
+
+    if not unique_texts:
+        if verbose:
+            print(f"🗄️ {len(texts)} textes servis depuis le cache d'embeddings.")
+        return [vectors[text] for text in texts]
+
+    token_counts = [estimate_tokens(text) for text in unique_texts]
+    batches = list(make_batches(token_counts))
+
+    def run_batch(batch):
+        budget.acquire(sum(token_counts[i] for i in batch))
+        with metrics.timer("embedding.batch", items=len(batch)):
+            return embeddings_model.embed_documents([unique_texts[i] for i in batch])
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+        batch_vectors = list(executor.map(run_batch, batches))
+
+    for batch, embedded in zip(batches, batch_vectors):
+        for i, vector in zip(batch, embedded):
+            vectors[unique_texts[i]] = vector
+
+    if cache is not None:
+        cache.put_many((keys[text], template_name, version, vectors[text]) for text in unique_texts)
+
+    if verbose:
+        print(f"🧮 {len(texts)} textes : {len(unique_texts)} embeddés en {len(batches)} lots, {len(texts) - len(unique_texts)} réutilisés.")
+    return [vectors[text] for text in texts]
+
+
+class FakeEmbeddings:
+    """
+    Embedder local déterministe (même texte -> même vecteur), sans appel réseau.
+    `latency` simule le temps d'un aller-retour API par appel.
+    """
+
+    def __init__(self, dimensions=1536, latency=0.0):
+        self.model = f"fake-{dimensions}"
+        self.dimensions = dimensions
+        self.latency = latency
+        self.calls = 0
+        self.texts = 0
+        self.lock = threading.Lock()
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _call(self, texts):
+        with self.lock:
+            self.calls += 1
+            self.texts += len(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_documents(self, texts):
+        return self._call(list(texts))
+
+    def embed_query(self, text):
+        return self._call([text])[0]
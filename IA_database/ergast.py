@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# 📌 Configuration de l'accès à l'API Ergast (surchargeable via `.env`)
+ERGAST_BASE_URL = os.getenv("ERGAST_BASE_URL", "http://ergast.com/api/f1").rstrip("/")
+MAX_WORKERS = int(os.getenv("ERGAST_MAX_WORKERS", "8"))
+REQUESTS_PER_SECOND = float(os.getenv("ERGAST_RPS", "4"))
+MAX_RETRIES = int(os.getenv("ERGAST_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("ERGAST_BACKOFF", "0.5"))
+TIMEOUT = float(os.getenv("ERGAST_TIMEOUT", "30"))
+PAGE_LIMIT = int(os.getenv("ERGAST_PAGE_LIMIT", "1000"))  # taille de page maximale acceptée par l'API
+
+# 📌 Cache disque des réponses : saisons passées conservées à vie, saison en cours avec TTL
+CACHE_DIR = os.getenv("ERGAST_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ergast_cache"))
+CACHE_TTL = int(os.getenv("ERGAST_CACHE_TTL", "3600"))
+OFFLINE = os.getenv("ERGAST_OFFLINE", "0") == "1"
+
+# Codes HTTP considérés comme transitoires (on réessaie)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """ Limiteur partagé entre tous les threads : au plus `rate` requêtes par seconde. """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+rate_limiter = RateLimiter(REQUESTS_PER_SECOND)
+
+# 📌 Session unique : les connexions keep-alive sont réutilisées par tous les workers
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS))
+session.mount("https://", HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS))
+
+
+def build_url(path):
+    """ Construit l'URL complète à partir d'un chemin relatif (`2021/drivers.json`). """
+    if path.startswith("http://") or path.startswith("https://"):
+        return path
+    return f"{ERGAST_BASE_URL}/{path.lstrip('/')}"
+
+
+# 🗄️ Cache disque
+cache_stats = {"hits": 0, "misses": 0, "stale": 0, "offline_misses": 0}
+cache_stats_lock = threading.Lock()
+SEASON_IN_PATH = re.compile(r"/((?:19|20)\d{2})(?:/|\.json)")
+
+
+def set_offline(offline=True):
+    """ Mode hors-ligne : les réponses ne sont servies que depuis le cache. """
+    global OFFLINE
+    OFFLINE = offline
+
+
+def count(stat):
+    with cache_stats_lock:
+        cache_stats[stat] += 1
+    metrics.count("ergast.cache", result=stat)
+
+
+def cache_key(url, params=None):
+    """ Clé de cache : empreinte SHA-256 de l'URL complète (paramètres triés). """
+    if params:
+        url = f"{url}?{urlencode(sorted(params.items()))}"
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def cache_path(key):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json")
+
+
+def cache_ttl(url, fetched_at):
+    """
+    Durée de validité d'une réponse : `None` (à vie) si la saison était déjà terminée
+    au moment du téléchargement, `CACHE_TTL` sinon (saison en cours, listes globales).
+    """
+    match = SEASON_IN_PATH.search(url[len(ERGAST_BASE_URL):] if url.startswith(ERGAST_BASE_URL) else url)
+    if match and int(match.group(1)) < datetime.fromtimestamp(fetched_at).year:
+        return None
+    return CACHE_TTL
+
+
+def read_cache(url, params=None):
+    """ Renvoie `(data, frais)` depuis le cache, ou `(None, False)` si absent. """
+    try:
+        with open(cache_path(cache_key(url, params)), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None, False
+
+    ttl = cache_ttl(url, entry["fetched_at"])
+    fresh = ttl is None or time.time() - entry["fetched_at"] < ttl
+    return entry["data"], fresh
+
+
+def write_cache(url, params, data):
+    """ Écriture atomique (fichier temporaire puis `os.replace`). """
+    path = cache_path(cache_key(url, params))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"url": url, "params": params, "fetched_at": time.time(), "data": data}, f)
+    os.replace(tmp_path, path)
+
+
+def report_cache_stats():
+    """ Affiche le bilan du cache en fin de script. """
+    total = cache_stats["hits"] + cache_stats["misses"]
+    rate = 100 * cache_stats["hits"] / total if total else 0
+    print(
+        f"🗄️ Cache Ergast : {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+        f"(dont {cache_stats['stale']} expirés, {cache_stats['offline_misses']} hors-ligne), taux de hit {rate:.0f}%"
+    )
+
+
+def get_json(path, params=None):
+    """ GET avec cache disque, limité en débit, avec retries et backoff exponentiel. Renvoie le JSON ou `None`. """
+    url = build_url(path)
+
+    cached, fresh = read_cache(url, params)
+    if cached is not None and (fresh or OFFLINE):
+        count("hits")
+        return cached
+
+    count("misses")
+    if cached is not None:
+        count("stale")
+
+    if OFFLINE:
+        count("offline_misses")
+        print(f"📴 Hors-ligne : {url} absent du cache")
+        return None
+
+    data = download_json(url, params)
+    if data is not None:
+        write_cache(url, params, data)
+    return data
+
+
+def download_json(url, params=None):
+    """ Requête réseau limitée en débit, avec retries et backoff exponentiel. """
+    for attempt in range(MAX_RETRIES + 1):
+        rate_limiter.wait()
+        start = time.perf_counter()
+        try:
+            response = session.get(url, params=params, timeout=TIMEOUT)
+        except requests.RequestException as e:
+            metrics.observe("ergast.fetch", time.perf_counter() - start, error=True)
+            error = str(e)
+        else:
+            metrics.observe("ergast.fetch", time.perf_counter() - start, error=response.status_code != 200)
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code not in RETRY_STATUSES:
+                print(f"❌ Erreur {response.status_code} pour {url}")
+                return None
+            error = f"HTTP {response.status_code}"
+
+            # Respecter `Retry-After` si l'API le fournit
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit() and attempt < MAX_RETRIES:
+                time.sleep(int(retry_after))
+                continue
+
+        if attempt < MAX_RETRIES:
+            delay = BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE)
+            print(f"⚠️ {error} pour {url}, nouvel essai dans {delay:.1f}s ({attempt + 1}/{MAX_RETRIES})")
+            time.sleep(delay)
+
+    print(f"❌ Abandon après {MAX_RETRIES} essais : {url}")
+    return None
+
+
+# Vrai dans les threads d'un `map_parallel` : un appel imbriqué (pages d'une saison déjà téléchargée en parallèle) reste séquentiel
+in_worker = threading.local()
+
+
+def map_parallel(func, items, max_workers=None):
+    """
+    Applique `func` sur `items` en parallèle (pool borné) et renvoie les résultats dans l'ordre.
+    Appelé depuis un worker (`fetch_seasons` -> `get_pages`), il s'exécute séquentiellement dans ce worker :
+    au plus `MAX_WORKERS` requêtes en vol, autant que de connexions dans le pool de la session.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if getattr(in_worker, "active", False):
+        return [func(item) for item in items]
+
+    def run(item):
+        in_worker.active = True
+        try:
+            return func(item)
+        finally:
+            in_worker.active = False
+
+    workers = min(max_workers or MAX_WORKERS, len(items))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, items))
+
+
+def fetch_all(paths):
+    """ Télécharge plusieurs chemins Ergast en parallèle, résultats dans l'ordre des chemins. """
+    return map_parallel(get_json, paths)
+
+
+def season_path(year, endpoint=""):
+    """ `season_path(2021, "drivers")` -> `2021/drivers.json`, `season_path(2021)` -> `2021.json`. """
+    return f"{year}/{endpoint}.json" if endpoint else f"{year}.json"
+
+
+def get_pages(path, params=None, page_size=PAGE_LIMIT):
+    """
+    Télécharge toutes les pages d'un endpoint paginé :
+    la première page donne `MRData.total` et la taille de page réellement appliquée par l'API,
+    les pages restantes sont alors demandées en parallèle (séquentiellement dans un worker de `map_parallel`). Renvoie les pages dans l'ordre,
+    ou `None` si l'une d'elles manque (les pages déjà obtenues restent en cache : une nouvelle
+    exécution reprend là où celle-ci s'est arrêtée).
+    """
+    params = dict(params or {})
+    first = get_json(path, {**params, "limit": page_size, "offset": 0})
+    if not first:
+        return None
+
+    total = int(first['MRData']['total'])
+    limit = int(first['MRData']['limit']) or page_size
+    offsets = list(range(limit, total, limit))
+    pages = [first] + map_parallel(lambda offset: get_json(path, {**params, "limit": limit, "offset": offset}), offsets)
+
+    missing = [offset for offset, page in zip([0] + offsets, pages) if not page]
+    if missing:
+        print(f"❌ {path} : {len(missing)}/{len(pages)} pages manquantes (offsets {missing[:5]}), relancer pour reprendre.")
+        return None
+    return pages
+
+
+def merge_pages(pages):
+    """
+    Fusionne des pages Ergast en une seule réponse de même forme (`MRData.<X>Table.<liste>`).
+    Un élément coupé entre deux pages (même saison et même manche) est recollé.
+    """
+    mrdata = pages[0]['MRData']
+    table_key = next(key for key in mrdata if key.endswith("Table"))
+    list_key = next(key for key, value in mrdata[table_key].items() if isinstance(value, list))
+
+    items = []
+    for page in pages:
+        for item in page['MRData'][table_key][list_key]:
+            previous = items[-1] if items else None
+            if previous and "round" in item and (previous.get("season"), previous.get("round")) == (item.get("season"), item.get("round")):
+                for key, value in item.items():
+                    if isinstance(value, list):
+                        previous[key] = previous.get(key, []) + value
+                continue
+            items.append(dict(item))
+
+    table = {**mrdata[table_key], list_key: items}
+    return {'MRData': {**mrdata, 'limit': mrdata['total'], 'offset': "0", table_key: table}}
+
+
+def get_all_json(path, params=None, page_size=PAGE_LIMIT):
+    """ Comme `get_json`, mais avec toutes les pages de l'endpoint fusionnées. """
+    pages = get_pages(path, params, page_size)
+    return merge_pages(pages) if pages else None
+
+
+def fetch_seasons(years, endpoint=""):
+    """ Télécharge un endpoint (toutes ses pages) pour chaque saison en parallèle. Renvoie une liste `(year, data)`. """
+    years = list(years)
+    return list(zip(years, map_parallel(get_all_json, [season_path(year, endpoint) for year in years])))
@@ -0,0 +1,100 @@
+import hashlib
+import json
+from datetime import date, datetime, timezone
+
+from reference_index import fetch_all_rows
+
+# 📌 Table Supabase de suivi de l'ingestion :
+#
+#   create table ingestion_state (
+#       dataset      text        not null,   -- "drivers", "constructors", "races", "results"...
+#       season       integer     not null,
+#       round        integer     not null default 0,  -- 0 = saison entière
+#       content_hash text,
+#       loaded_at    timestamptz not null default now(),
+#       primary key (dataset, season, round)
+#   );
+#
+# Une unité (dataset, saison, manche) déjà chargée avec la même empreinte n'est ni
+# retéléchargée (saisons passées) ni réécrite (saison en cours inchangée).
+
+STATE_TABLE = "ingestion_state"
+SEASON = 0
+
+
+def content_hash(payload):
+    """ Empreinte stable d'un contenu JSON (clés triées). """
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def current_season():
+    return date.today().year
+
+
+class IngestionState:
+    """ Vue mémoire de `ingestion_state`, chargée une fois et mise à jour à chaque unité chargée. """
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self.units = {
+            (row["dataset"], row["season"], row["round"]): (row["content_hash"], row["loaded_at"])
+            for row in fetch_all_rows(supabase, STATE_TABLE, "dataset, season, round, content_hash, loaded_at")
+        }
+        print(f"📍 État d'ingestion : {len(self.units)} unités déjà chargées.")
+
+    def has(self, dataset, season, round_number=SEASON):
+        return (dataset, season, round_number) in self.units
+
+    def is_complete(self, dataset, season):
+        """ Saison chargée après sa fin : elle ne changera plus. """
+        unit = self.units.get((dataset, season, SEASON))
+        return unit is not None and int(unit[1][:4]) > season
+
+    def has_dataset(self, dataset):
+        return any(unit[0] == dataset for unit in self.units)
+
+    def loaded_rounds(self, dataset, season):
+        return {unit[2] for unit in self.units if unit[0] == dataset and unit[1] == season and unit[2] != SEASON}
+
+    def is_unchanged(self, dataset, season, round_number, digest):
+        unit = self.units.get((dataset, season, round_number))
+        return unit is not None and unit[0] == digest
+
+    def mark(self, dataset, season, round_number=SEASON, digest=None):
+        """ Enregistre une unité comme chargée (en base et en mémoire). """
+        self.mark_many(dataset, [(season, round_number, digest)])
+
+    def mark_many(self, dataset, units):
+        rows = [
+            {
+                "dataset": dataset,
+                "season": season,
+                "round": round_number,
+                "content_hash": digest,
+                "loaded_at": datetime.now(timezone.utc).isoformat()
+            }
+            for season, round_number, digest in units
+        ]
+        if not rows:
+            return
+        self.supabase.table(STATE_TABLE).upsert(rows, on_conflict="dataset, season, round").execute()
+        for row in rows:
+            self.units[(dataset, row["season"], row["round"])] = (row["content_hash"], row["loaded_at"])
+
+    def bootstrap(self, dataset, load_seasons):
+        """
+        Première exécution : marque comme chargées les saisons passées déjà présentes en base
+        (`load_seasons()` n'est appelé que si le dataset n'a encore aucun état), pour ne pas
+        tout retélécharger lors de la migration vers l'état d'ingestion.
+        """
+        if self.has_dataset(dataset):
+            return
+        past = sorted(season for season in load_seasons() if season < current_season())
+        if past:
+            print(f"📍 Initialisation de l'état `{dataset}` avec {len(past)} saisons déjà en base.")
+            self.mark_many(dataset, [(season, SEASON, None) for season in past])
+
+    def seasons_to_fetch(self, dataset, first_season, last_season=None):
+        """ Saisons non complètes. La saison en cours est donc toujours revérifiée. """
+        last_season = last_season or current_season()
+        return [season for season in range(first_season, last_season + 1) if not self.is_complete(dataset, season)]
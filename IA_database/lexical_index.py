@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from query_analyzer import FILTER_FIELDS, normalize
+from retrieval import RETRIEVAL_K
+
+# 📌 Recherche lexicale BM25 (surchargeable via `.env`)
+#
+#   lexical_index.npz   vocabulaire, postings CSR (documents + fréquences), longueur des documents,
+#                       ids / collections et champs filtrables de chaque document
+#
+# Les identifiants exacts (`max_verstappen`, `red_bull_ring`...) sont normalisés comme les questions
+# (`query_analyzer.normalize`) : « max_verstappen » et « Max Verstappen » donnent les mêmes termes.
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") != "0"
+LEXICAL_INDEX_FILE = "lexical_index.npz"
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+FUSION_DEPTH = int(os.getenv("FUSION_DEPTH", "5"))   # candidats par liste = k x FUSION_DEPTH
+
+FIELDS = sorted({field for fields in FILTER_FIELDS.values() for field in fields.values()} | {"level"})
+
+
+def tokenize(text):
+    return normalize(text).split()
+
+
+class LexicalIndexBuilder:
+    """
+    Construit l'index pendant le remplissage du magasin vectoriel (mêmes textes que les embeddings).
+    `add` est thread-safe : il peut être appelé depuis les workers d'écriture du pipeline.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.vocabulary = {}
+        self.documents = []   # (collection, id, {terme: fréquence}, longueur, champs)
+
+    def add(self, collection, doc_id, text, metadata=None):
+        tokens = tokenize(text)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        fields = {field: "" if (metadata or {}).get(field) is None else str(metadata[field]) for field in FIELDS}
+        with self.lock:
+            terms = {self.vocabulary.setdefault(token, len(self.vocabulary)): count for token, count in counts.items()}
+            self.documents.append((collection, str(doc_id), terms, len(tokens), fields))
+
+    def save(self, directory):
+        """ Postings triés par terme (format CSR), écrits atomiquement dans `directory/lexical_index.npz`. """
+        start = time.perf_counter()
+        terms = np.fromiter((term for _, _, doc_terms, _, _ in self.documents for term in doc_terms), dtype=np.int64)
+        docs = np.fromiter((doc for doc, (_, _, doc_terms, _, _) in enumerate(self.documents) for _ in doc_terms), dtype=np.int32)
+        frequencies = np.fromiter((count for _, _, doc_terms, _, _ in self.documents for count in doc_terms.values()), dtype=np.uint16)
+        order = np.argsort(terms, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=len(self.vocabulary)))]).astype(np.int64)
+
+        vocabulary = np.array(sorted(self.vocabulary, key=self.vocabulary.get), dtype=str)
+        collections = sorted({collection for collection, _, _, _, _ in self.documents})
+        arrays = {
+            "vocabulary": vocabulary,
+            "offsets": offsets,
+            "postings": docs[order],
+            "frequencies": frequencies[order],
+            "lengths": np.array([length for _, _, _, length, _ in self.documents], dtype=np.int32),
+            "ids": np.array([doc_id for _, doc_id, _, _, _ in self.documents], dtype=str),
+            "collection_names": np.array(collections, dtype=str),
+            "collections": np.array([collections.index(collection) for collection, _, _, _, _ in self.documents], dtype=np.int16),
+        }
+        for field in FIELDS:
+            arrays[f"field_{field}"] = np.array([fields[field] for _, _, _, _, fields in self.documents], dtype=str)
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, LEXICAL_INDEX_FILE)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        print(
+            f"✅ Index lexical : {len(self.documents)} documents, {len(self.vocabulary)} termes, "
+            f"{os.path.getsize(path) / 1e6:.1f} Mo écrits en {time.perf_counter() - start:.1f}s."
+        )
+
+
+class LexicalIndex:
+    """ Index BM25 chargé depuis le disque : un score = accumulation vectorisée sur les postings des termes de la requête. """
+
+    def __init__(self, arrays, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {term: i for i, term in enumerate(arrays["vocabulary"].tolist())}
+        self.offsets = arrays["offsets"]
+        self.postings = arrays["postings"]
+        self.frequencies = arrays["frequencies"].astype(np.float32)
+        self.lengths = arrays["lengths"].astype(np.float32)
+        self.ids = arrays["ids"].tolist()
+        self.collection_names = arrays["collection_names"].tolist()
+        self.collections = arrays["collections"]
+        self.fields = {field: arrays[f"field_{field}"] for field in FIELDS if f"field_{field}" in arrays}
+        self.average_length = float(self.lengths.mean()) if len(self.lengths) else 0.0
+
+    @classmethod
+    def load(cls, directory):
+        """ Index de `directory`, ou `None` s'il n'a pas encore été construit. """
+        path = os.path.join(directory, LEXICAL_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        start = time.perf_counter()
+        with np.load(path) as arrays:
+            index = cls({name: arrays[name] for name in arrays.files})
+        print(f"📂 Index lexical chargé : {len(index)} documents, {len(index.vocabulary)} termes en {1000 * (time.perf_counter() - start):.0f} ms.")
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def mask(self, filters):
+        """ Documents compatibles avec `{collection: [{champ: [valeurs]}]}` (même sémantique que `VectorIndex.candidates`). """
+        if not filters:
+            return None
+        allowed = np.zeros(len(self), dtype=bool)
+        for collection_id, name in enumerate(self.collection_names):
+            in_collection = self.collections == collection_id
+            for conditions in filters.get(name) or [{}]:
+                selected = in_collection.copy()
+                for field, values in conditions.items():
+                    if field in self.fields:
+                        selected &= np.isin(self.fields[field], [str(value) for value in values])
+                allowed |= selected
+        return allowed
+
+    def search(self, query, k=RETRIEVAL_K, filters=None):
+        """ `[(score BM25, collection, id)]` des `k` meilleurs documents. """
+        scores = np.zeros(len(self), dtype=np.float32)
+        for token in set(tokenize(query)):
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            docs, frequencies = self.postings[start:end], self.frequencies[start:end]
+            idf = np.log(1.0 + (len(self) - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self.lengths[docs] / self.average_length)
+            scores[docs] += idf * frequencies * (self.k1 + 1.0) / (frequencies + norm)
+
+        allowed = self.mask(filters)
+        if allowed is not None:
+            scores[~allowed] = 0.0
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(float(scores[doc]), self.collection_names[self.collections[doc]], self.ids[doc]) for doc in hits]
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=RRF_K):
+    """ Listes ordonnées de clés -> `{clé: score RRF}` (somme de 1 / (rrf_k + rang)). """
+    fused = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    return fused
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Recherche hybride : liste vectorielle (`VectorRetriever` ou `NumpyRetriever`) et liste BM25 (`LexicalIndex`)
+    fusionnées par rang réciproque. Sans index lexical, se comporte comme le retriever vectoriel seul.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vector_retriever: object
+    lexical: object = None
+    k: int = RETRIEVAL_K
+
+    def embed_query(self, question):
+        return self.vector_retriever.embed_query(question)
+
+    def search(self, vector, k=None, filters=None, question=None):
+        """ `[(score RRF, Document)]` par score décroissant (distance vectorielle sans index lexical). """
+        k = k or self.k
+        if self.lexical is None or not question:
+            return self.vector_retriever.search(vector, k, filters=filters)
+
+        depth = k * FUSION_DEPTH
+        vector_hits = self.vector_retriever.search(vector, depth, filters=filters)
+        lexical_hits = self.lexical.search(question, depth, filters)
+        if filters and not lexical_hits:
+            lexical_hits = self.lexical.search(question, depth)
+
+        documents = {(document.metadata["collection"], str(document.metadata["id"])): document for _, document in vector_hits}
+        fused = reciprocal_rank_fusion([
+            [(document.metadata["collection"], str(document.metadata["id"])) for _, document in vector_hits],
+            [(collection, doc_id) for _, collection, doc_id in lexical_hits],
+        ])
+        best = sorted(fused, key=fused.get, reverse=True)[:k]
+
+        # Documents trouvés seulement par BM25 : relus depuis le magasin vectoriel
+        missing = {}
+        for collection, doc_id in best:
+            if (collection, doc_id) not in documents:
+                missing.setdefault(collection, []).append(doc_id)
+        for collection, ids in missing.items():
+            for document in self.vector_retriever.documents(collection, ids):
+                documents[(collection, str(document.metadata["id"]))] = document
+        return [(fused[key], documents[key]) for key in best if key in documents]
+
+    def retrieve(self, question, k=None):
+        return [document for _, document in self.search(self.embed_query(question), k, question=question)]
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.retrieve(query)
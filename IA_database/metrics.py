@@ -0,0 +1,337 @@
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 📌 Mesures par étape (surchargeables via `.env`)
+#
+# Chaque étape (requête Ergast, lecture / écriture Supabase, lot d'embeddings, recherche, génération...)
+# alimente un histogramme de durées, un compteur d'éléments traités (lignes, textes) et un compteur d'erreurs.
+# Une mesure coûte un `perf_counter` et un verrou (quelques µs) : les mesures peuvent rester actives en production.
+METRICS = os.getenv("METRICS", "1") != "0"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))              # > 0 : endpoint Prometheus `http://...:PORT/metrics`
+METRICS_JSONL = os.getenv("METRICS_JSONL", "")                  # fichier JSON-lines : un instantané cumulatif par intervalle
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "60"))   # secondes entre deux instantanés JSON-lines
+METRICS_PREFIX = "f1bot"
+
+# Bornes (s) des histogrammes : de la milliseconde (cache, SQLite) à la minute (backfill, génération longue)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+WRITE_OPERATIONS = {"insert", "upsert", "update", "delete"}
+
+
+class Histogram:
+    """ Durées d'une étape : comptes par tranche (`BUCKETS`, plus une tranche au-delà), somme, éléments et erreurs. """
+
+    __slots__ = ("buckets", "count", "seconds", "items", "errors")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.items = 0
+        self.errors = 0
+
+    def quantile(self, ratio):
+        """ Estimation par interpolation linéaire dans la tranche qui contient le quantile. """
+        if not self.count:
+            return 0.0
+        rank = ratio * self.count
+        seen = 0
+        for i, bucket in enumerate(self.buckets):
+            if bucket and seen + bucket >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket
+            seen += bucket
+        return BUCKETS[-1]
+
+
+class Metrics:
+    """
+    Registre des mesures d'un processus, partagé par tous les threads :
+
+        with metrics.timer("embedding.batch", items=len(batch)):
+            embeddings_model.embed_documents(batch)
+
+        metrics.observe("chat.generation", seconds)
+        metrics.count("ergast.cache", result="hit")
+
+    Les étapes sont identifiées par leur nom et leurs labels (`table="results"`...).
+    """
+
+    def __init__(self, enabled=METRICS):
+        self.enabled = enabled
+        self.start = time.time()
+        self.lock = threading.Lock()
+        self.histograms = {}   # (étape, labels) -> Histogram
+        self.counters = {}     # (nom, labels) -> valeur
+
+    def observe(self, stage, seconds, items=0, error=False, **labels):
+        if not self.enabled:
+            return
+        key = (stage, tuple(sorted(labels.items())))
+        bucket = bisect_left(BUCKETS, seconds)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.buckets[bucket] += 1
+            histogram.count += 1
+            histogram.seconds += seconds
+            histogram.items += items
+            histogram.errors += bool(error)
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def timer(self, stage, items=0, **labels):
+        return Timer(self, stage, items, labels)
+
+    # 📤 Export
+    def snapshot(self):
+        """ Valeurs cumulées depuis le démarrage du processus (une ligne JSON-lines). """
+        with self.lock:
+            histograms = [(key, histogram.count, histogram.seconds, histogram.items, histogram.errors,
+                           histogram.quantile(0.5), histogram.quantile(0.95))
+                          for key, histogram in self.histograms.items()]
+            counters = list(self.counters.items())
+        return {
+            "time": time.time(),
+            "uptime": round(time.time() - self.start, 3),
+            "stages": [
+                {
+                    "stage": stage, **dict(labels), "count": count, "seconds": round(seconds, 6), "items": items,
+                    "errors": errors, "p50": round(p50, 6), "p95": round(p95, 6),
+                    "items_per_second": round(items / seconds, 1) if seconds else 0.0
+                }
+                for (stage, labels), count, seconds, items, errors, p50, p95 in histograms
+            ],
+            "counters": [{"name": name, **dict(labels), "value": value} for (name, labels), value in counters]
+        }
+
+    def prometheus(self):
+        """ Format texte d'exposition Prometheus (histogrammes cumulatifs, compteurs `_total`). """
+        with self.lock:
+            histograms = [(key, list(histogram.buckets), histogram.count, histogram.seconds, histogram.items, histogram.errors)
+                          for key, histogram in sorted(self.histograms.items())]
+            counters = sorted(self.counters.items())
+
+        name = f"{METRICS_PREFIX}_stage_seconds"
+        lines = [f"# HELP {name} Durée de chaque étape (s).", f"# TYPE {name} histogram"]
+        for (stage, labels), buckets, count, seconds, _, _ in histograms:
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(f"{name}_bucket{format_labels(stage, labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_bucket{format_labels(stage, labels, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{format_labels(stage, labels)} {seconds:.6f}")
+            lines.append(f"{name}_count{format_labels(stage, labels)} {count}")
+
+        for suffix, index, help_text in (("items", 4, "Éléments traités (lignes, textes)."), ("errors", 5, "Appels en erreur.")):
+            name = f"{METRICS_PREFIX}_stage_{suffix}_total"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f"{name}{format_labels(values[0][0], values[0][1])} {values[index]}" for values in histograms]
+
+        typed = set()
+        for (counter, labels), value in counters:
+            name = f"{METRICS_PREFIX}_{counter.replace('.', '_')}_total"
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{format_labels(None, labels)} {value}")
+        lines.append(f"{METRICS_PREFIX}_uptime_seconds {time.time() - self.start:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_jsonl(self, path):
+        line = json.dumps(self.snapshot(), ensure_ascii=False)
+        with self.lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def report(self):
+        """ Bilan par étape : appels, p50 / p95, temps cumulé, éléments/s et erreurs. """
+        stages = sorted(self.snapshot()["stages"], key=lambda stage: -stage["seconds"])
+        if not stages:
+            return
+        print("⏱️ Étapes (temps cumulé, toutes exécutions parallèles comprises) :")
+        for stage in stages:
+            labels = ", ".join(f"{key}={value}" for key, value in stage.items() if key not in STAGE_FIELDS)
+            throughput = f", {stage['items_per_second']:.0f} él./s" if stage["items"] else ""
+            print(
+                f"   {stage['stage']}{f' ({labels})' if labels else ''} : {stage['count']} appels, "
+                f"p50 {1000 * stage['p50']:.0f} ms / p95 {1000 * stage['p95']:.0f} ms, {stage['seconds']:.1f}s cumulées"
+                f"{throughput}, {stage['errors']} erreurs"
+            )
+
+
+STAGE_FIELDS = {"stage", "count", "seconds", "items", "errors", "p50", "p95", "items_per_second"}
+
+
+class Timer:
+    """ Mesure un bloc `with` ; `timer.items` peut être renseigné dans le bloc. Une exception compte comme erreur. """
+
+    __slots__ = ("metrics", "stage", "items", "labels", "start")
+
+    def __init__(self, metrics, stage, items, labels):
+        self.metrics = metrics
+        self.stage = stage
+        self.items = items
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start, self.items, exc_type is not None, **self.labels)
+
+
+def format_labels(stage, labels, **extra):
+    pairs = ([("stage", stage)] if stage is not None else []) + list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+# 🗄️ Requêtes Supabase mesurées
+class InstrumentedQuery:
+    """
+    Enveloppe une requête supabase-py (`select`, `eq`, `order`... renvoient une requête enveloppée) :
+    `execute()` est mesuré comme `supabase.read` ou `supabase.write`, avec la table en label et les lignes en éléments.
+    """
+
+    __slots__ = ("_query", "_metrics", "_table", "_stage", "_rows")
+
+    def __init__(self, query, metrics, table, stage="supabase.read", rows=None):
+        self._query = query
+        self._metrics = metrics
+        self._table = table
+        self._stage = stage
+        self._rows = rows
+
+    def __getattr__(self, name):
+        attribute = getattr(self._query, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            if name == "execute":
+                return self._execute(attribute, args, kwargs)
+            result = attribute(*args, **kwargs)
+            if not hasattr(result, "execute"):
+                return result
+            stage, rows = self._stage, self._rows
+            if name in WRITE_OPERATIONS:
+                stage = "supabase.write"
+                payload = args[0] if args else None
+                rows = len(payload) if isinstance(payload, list) else (1 if isinstance(payload, dict) and name != "update" else None)
+            return InstrumentedQuery(result, self._metrics, self._table, stage, rows)
+        return call
+
+    def _execute(self, execute, args, kwargs):
+        with self._metrics.timer(self._stage, table=self._table) as timer:
+            response = execute(*args, **kwargs)
+            data = getattr(response, "data", None)
+            timer.items = self._rows if self._rows is not None else (len(data) if isinstance(data, list) else 0)
+        return response
+
+
+class InstrumentedSupabase:
+    """ Client Supabase dont les requêtes `table(...)` sont mesurées ; le reste du client est inchangé. """
+
+    def __init__(self, client, metrics):
+        self._client = client
+        self._metrics = metrics
+
+    def table(self, name):
+        return InstrumentedQuery(self._client.table(name), self._metrics, name)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+# 📌 Registre du processus et exports
+_default_metrics = Metrics()
+_exporters = {}
+
+
+def get_default_metrics():
+    return _default_metrics
+
+
+def timer(stage, items=0, **labels):
+    return _default_metrics.timer(stage, items, **labels)
+
+
+def observe(stage, seconds, items=0, error=False, **labels):
+    _default_metrics.observe(stage, seconds, items, error, **labels)
+
+
+def count(name, value=1, **labels):
+    _default_metrics.count(name, value, **labels)
+
+
+def report():
+    _default_metrics.report()
+
+
+def instrument_supabase(client, metrics=None):
+    metrics = metrics or _default_metrics
+    return InstrumentedSupabase(client, metrics) if metrics.enabled else client
+
+
+def start_exporters(port=METRICS_PORT, path=METRICS_JSONL, interval=METRICS_INTERVAL, metrics=None):
+    """
+    Démarre les exports configurés (une seule fois par processus) : endpoint Prometheus sur `port`,
+    et/ou un instantané JSON-lines ajouté à `path` toutes les `interval` secondes et à la sortie du processus.
+    """
+    metrics = metrics or _default_metrics
+    if not metrics.enabled:
+        return
+    if port and "prometheus" not in _exporters:
+        _exporters["prometheus"] = serve_prometheus(port, metrics)
+        print(f"📈 Mesures Prometheus exposées sur http://localhost:{port}/metrics")
+    if path and "jsonl" not in _exporters:
+        stop = threading.Event()
+
+        def flush_periodically():
+            while not stop.wait(interval):
+                metrics.write_jsonl(path)
+
+        def flush_on_exit():
+            stop.set()
+            metrics.write_jsonl(path)
+
+        _exporters["jsonl"] = threading.Thread(target=flush_periodically, name="metrics-jsonl", daemon=True)
+        _exporters["jsonl"].start()
+        atexit.register(flush_on_exit)
+        print(f"📈 Mesures ajoutées à `{path}` toutes les {interval:g}s")
+
+
+def serve_prometheus(port, metrics):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-prometheus", daemon=True).start()
+    return server
@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from embedding_engine import BATCH_MAX_ITEMS, MAX_CONCURRENT_BATCHES, embed_texts
+
+# 📌 Pipeline en flux : lecture paginée -> rendu des gabarits -> embeddings par lots -> upsert par lots.
+# Chaque étage ne garde qu'un nombre borné d'éléments en vol : la mémoire reste constante
+# quelle que soit la taille de la table, et les premières lignes sont écrites immédiatement.
+
+QUEUE_DEPTH = int(os.getenv("PIPELINE_QUEUE_DEPTH", "2"))
+WRITE_WORKERS = int(os.getenv("PIPELINE_WRITE_WORKERS", "2"))
+
+_DONE = object()
+
+
+def prefetch(iterable, depth=QUEUE_DEPTH):
+    """ Consomme `iterable` dans un thread dédié, au plus `depth` éléments d'avance (backpressure). """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def stage(func, items, workers=1, max_pending=None):
+    """ Applique `func` à chaque élément dans un pool borné, résultats dans l'ordre d'entrée. """
+    max_pending = max_pending or workers * QUEUE_DEPTH
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def rebatch(pages, size):
+    """ Redécoupe un flux de pages en lots de `size` lignes. """
+    batch = []
+    for page in pages:
+        for row in page:
+            batch.append(row)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def embed_and_write(embeddings_model, pages, template, to_record, write, render=None, batch_size=BATCH_MAX_ITEMS, label="lignes"):
+    """
+    Calcule et écrit les embeddings d'un flux de pages de lignes.
+
+    - `template` : gabarit de texte (clé du cache d'embeddings), `render` s'il faut l'appeler autrement ;
+    - `to_record(row, vector)` : construit l'enregistrement à écrire ;
+    - `write(records)` : écrit un lot (upsert Supabase, ajout ChromaDB...).
+    Renvoie le nombre d'enregistrements écrits.
+    """
+    render = render or template
+    start = time.perf_counter()
+    first_write = None
+    written = 0
+
+    def embed_batch(rows):
+        vectors = embed_texts(embeddings_model, [render(row) for row in rows], template=template, verbose=False)
+        return [to_record(row, vector) for row, vector in zip(rows, vectors)]
+
+    def write_batch(records):
+        write(records)
+        return len(records)
+
+    batches = rebatch(prefetch(pages), batch_size)
+    embedded = stage(embed_batch, batches, workers=MAX_CONCURRENT_BATCHES)
+    for count in stage(write_batch, embedded, workers=WRITE_WORKERS):
+        written += count
+        if first_write is None:
+            first_write = time.perf_counter() - start
+            print(f"⏱️ Premières {label} écrites après {first_write:.1f}s.")
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {written} {label} embeddées et écrites en {elapsed:.1f}s ({written / elapsed if elapsed else 0:.0f}/s).")
+    return written
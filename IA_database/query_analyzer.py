@@ -0,0 +1,136 @@
+import re
+import unicodedata
+
+# 📌 Champs de métadonnées filtrables par collection, pour chaque type d'entité
+FILTER_FIELDS = {
+    "summaries": {"season": "season", "driver": "driver_id", "circuit": "circuit_id"},
+    "results": {"season": "season", "driver": "driver_id", "circuit": "circuit_id", "constructor": "constructor_id"},
+    "drivers": {"season": "season", "driver": "driver_ref"},
+}
+# Résumés : champs filtrables par niveau (une carrière n'a pas de saison, une course n'a pas de pilote).
+# Chaque niveau n'est filtré que sur ses propres champs ; seuls les niveaux qui couvrent le plus d'entités citées sont gardés :
+# « Verstappen à Monza en 2019 » -> sa saison 2019 et la course (pas toutes les courses de 2019, ni sa carrière),
+# « Verstappen à Monza » -> ses saisons, sa carrière et les éditions de Monza.
+LEVEL_FILTER_FIELDS = {
+    "summaries": {
+        "driver_season": {"season": "season", "driver": "driver_id"},
+        "race": {"season": "season", "circuit": "circuit_id"},
+        "career": {"driver": "driver_id"},
+    },
+}
+
+SEASON_PATTERN = re.compile(r"\b(19[5-9]\d|20\d\d)\b")
+MAX_NGRAM = 4
+
+# Mots trop courants pour identifier une entité à eux seuls
+STOP_WORDS = {
+    "de", "du", "des", "la", "le", "les", "et", "en", "au", "aux", "a", "the", "of", "and",
+    "grand", "prix", "circuit", "international", "autodromo", "autodrome", "racing", "team",
+    "f1", "formula", "formule", "one", "park", "street", "city", "national", "ring",
+}
+
+
+def normalize(text):
+    """ Minuscules, sans accents, ponctuation remplacée par des espaces. """
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def ngrams(tokens, max_size=MAX_NGRAM):
+    for size in range(max_size, 0, -1):
+        for start in range(len(tokens) - size + 1):
+            yield start, size, " ".join(tokens[start:start + size])
+
+
+class QueryAnalyzer:
+    """
+    Extrait d'une question les saisons, pilotes, circuits et constructeurs connus, par recherche
+    de n-grammes dans des dictionnaires d'alias construits une fois depuis les données de référence.
+
+        analyzer.analyze("Résultats de Hamilton à Silverstone en 2019")
+        -> {"season": {2019}, "driver": {"hamilton"}, "circuit": {"silverstone"}, "constructor": set()}
+    """
+
+    def __init__(self, drivers=None, circuits=None, constructors=None):
+        self.aliases = {}  # alias normalisé -> {(type, id)}
+        self.words = {}    # mot distinctif d'un nom de circuit -> {(type, id)}, utilisé seulement sans alias exact
+        for driver_ref, driver in (drivers or {}).items():
+            self.add("driver", driver_ref, driver_ref.replace("_", " "))
+            self.add("driver", driver_ref, driver.get("last_name"))
+            self.add("driver", driver_ref, f"{driver.get('first_name', '')} {driver.get('last_name', '')}")
+        for circuit_id, circuit in (circuits or {}).items():
+            self.add("circuit", circuit_id, circuit_id.replace("_", " "))
+            self.add("circuit", circuit_id, circuit.get("circuit_name"), distinctive_words=True)
+        for constructor_ref, constructor in (constructors or {}).items():
+            self.add("constructor", constructor_ref, constructor_ref.replace("_", " "))
+            self.add("constructor", constructor_ref, constructor.get("name"))
+
+    @classmethod
+    def from_reference_index(cls, reference_index):
+        return cls(reference_index.drivers, reference_index.circuits, reference_index.constructors)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """ Mêmes alias depuis l'instantané statistique local (`StatsSnapshot`), sans lecture Supabase. """
+        circuits = {circuit_id: {"circuit_name": name} for circuit_id, name in snapshot.circuit_names.items()}
+        constructors = {constructor_ref: {"name": name} for constructor_ref, name in snapshot.constructor_names.items()}
+        return cls(snapshot.driver_profiles, circuits, constructors)
+
+    def add(self, kind, entity_id, alias, distinctive_words=False):
+        alias = normalize(alias or "")
+        if not alias or alias in STOP_WORDS or len(alias) < 3:
+            return
+        self.aliases.setdefault(alias, set()).add((kind, entity_id))
+        if distinctive_words:
+            # « Silverstone Circuit » -> « silverstone », « Autodromo Nazionale di Monza » -> « monza »...
+            for word in alias.split():
+                if len(word) >= 4 and word not in STOP_WORDS:
+                    self.words.setdefault(word, set()).add((kind, entity_id))
+
+    def analyze(self, question):
+        entities = {"season": {int(year) for year in SEASON_PATTERN.findall(question)}, "driver": set(), "circuit": set(), "constructor": set()}
+
+        tokens = normalize(question).split()
+        used = [False] * len(tokens)
+        # Les n-grammes les plus longs d'abord : « max verstappen » avant « verstappen »
+        for start, size, gram in ngrams(tokens):
+            # « ferrari » désigne l'écurie, pas l'« Autodromo Enzo e Dino Ferrari »
+            matches = self.aliases.get(gram) or self.words.get(gram)
+            if any(used[start:start + size]) or not matches:
+                continue
+            for kind, entity_id in matches:
+                entities[kind].add(entity_id)
+            used[start:start + size] = [True] * size
+        return entities
+
+    def filters(self, question, entities=None):
+        """
+        Conditions `{collection: [{champ: [valeurs]}]}` applicables à chaque collection (vide si aucune entité) :
+        un document est gardé s'il satisfait l'une des alternatives (une par niveau de résumé, `level` compris).
+        """
+        entities = entities or self.analyze(question)
+        conditions = {}
+        for collection, fields in FILTER_FIELDS.items():
+            levels = {
+                level: {field: sorted(entities[kind]) for kind, field in level_fields.items() if entities[kind]}
+                for level, level_fields in LEVEL_FILTER_FIELDS.get(collection, {None: fields}).items()
+            }
+            coverage = max(len(where) for where in levels.values())
+            if coverage:
+                conditions[collection] = [
+                    {"level": [level], **where} if level else where
+                    for level, where in levels.items() if len(where) == coverage
+                ]
+        return conditions
+
+
+def chroma_where(alternatives):
+    """ `[{champ: [valeurs]}]` (alternatives d'une collection, voir `QueryAnalyzer.filters`) -> filtre `where` ChromaDB. """
+    conjunctions = []
+    for conditions in alternatives or []:
+        clauses = [{field: {"$in": values}} for field, values in conditions.items()]
+        if clauses:
+            conjunctions.append(clauses[0] if len(clauses) == 1 else {"$and": clauses})
+    if not conjunctions:
+        return None
+    return conjunctions[0] if len(conjunctions) == 1 else {"$or": conjunctions}
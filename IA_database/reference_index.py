@@ -0,0 +1,129 @@
+# 📌 Colonnes conservées en mémoire (on ne garde jamais les embeddings)
+DRIVER_COLUMNS = ("driver_ref", "season", "first_name", "last_name")
+CIRCUIT_COLUMNS = ("circuit_id", "circuit_name")
+CONSTRUCTOR_COLUMNS = ("constructor_ref", "name")
+RACE_COLUMNS = ("id", "season", "round", "name", "circuit_id")
+
+
+def project(row, columns):
+    return {column: row[column] for column in columns if column in row}
+
+
+def iter_pages(supabase, table_name, columns="*", page_size=1000, order_by=None):
+    """
+    Parcourt une table Supabase page par page (générateur, mémoire bornée à une page).
+    `order_by` (colonne ou tuple de colonnes formant une clé) garantit un ordre stable entre les pages.
+    """
+    offset = 0
+
+    while True:
+        query = supabase.table(table_name).select(columns)
+        for column in ((order_by,) if isinstance(order_by, str) else order_by or ()):
+            query = query.order(column)
+        response = query.range(offset, offset + page_size - 1).execute()
+        page = response.data or []
+        if page:
+            yield page
+
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+
+def fetch_all_rows(supabase, table_name, columns="*", page_size=1000):
+    """ Récupère toutes les lignes d'une table Supabase avec pagination (évite la troncature silencieuse). """
+    return [row for page in iter_pages(supabase, table_name, columns, page_size) for row in page]
+
+
+class ReferenceIndex:
+    """
+    Index mémoire des tables de référence (pilotes, circuits, constructeurs, courses).
+
+    Chaque table est chargée une seule fois (à la première utilisation), indexée par sa clé
+    naturelle, puis tenue à jour au fil des insertions : les recherches se font en O(1)
+    sans aller-retour Supabase.
+    """
+
+    def __init__(self, supabase, page_size=1000):
+        self.supabase = supabase
+        self.page_size = page_size
+        self._drivers = None          # driver_ref -> ligne
+        self._driver_seasons = None   # {(driver_ref, season)}
+        self._circuits = None         # circuit_id -> ligne
+        self._constructors = None     # constructor_ref -> ligne
+        self._races = None            # (season, round) -> ligne
+
+    def _load(self, table_name, columns):
+        rows = fetch_all_rows(self.supabase, table_name, ", ".join(columns), self.page_size)
+        print(f"📚 Index de référence : {len(rows)} lignes chargées depuis `{table_name}`.")
+        return rows
+
+    # 🏎️ Pilotes
+    @property
+    def drivers(self):
+        if self._drivers is None:
+            self._drivers = {}
+            self._driver_seasons = set()
+            self.add_drivers(self._load("drivers", DRIVER_COLUMNS))
+        return self._drivers
+
+    @property
+    def driver_seasons(self):
+        self.drivers
+        return self._driver_seasons
+
+    def add_drivers(self, rows):
+        drivers = self.drivers
+        for row in rows:
+            drivers[row["driver_ref"]] = {**drivers.get(row["driver_ref"], {}), **project(row, DRIVER_COLUMNS)}
+            if row.get("season") is not None:
+                self._driver_seasons.add((row["driver_ref"], row["season"]))
+
+    def has_driver(self, driver_ref):
+        return driver_ref in self.drivers
+
+    def driver_name(self, driver_ref):
+        """ Nom complet du pilote, ou sa référence s'il est inconnu. """
+        driver = self.drivers.get(driver_ref)
+        if not driver or not driver.get("first_name"):
+            return driver_ref
+        return f"{driver['first_name']} {driver.get('last_name') or ''}".strip()
+
+    # 🏁 Circuits
+    @property
+    def circuits(self):
+        if self._circuits is None:
+            self._circuits = {row["circuit_id"]: row for row in self._load("circuits", CIRCUIT_COLUMNS)}
+        return self._circuits
+
+    def add_circuits(self, rows):
+        for row in rows:
+            self.circuits[row["circuit_id"]] = project(row, CIRCUIT_COLUMNS)
+
+    # 🔧 Constructeurs
+    @property
+    def constructors(self):
+        if self._constructors is None:
+            self._constructors = {row["constructor_ref"]: row for row in self._load("constructors", CONSTRUCTOR_COLUMNS)}
+        return self._constructors
+
+    def add_constructors(self, rows):
+        for row in rows:
+            self.constructors[row["constructor_ref"]] = project(row, CONSTRUCTOR_COLUMNS)
+
+    # 📅 Courses
+    @property
+    def races(self):
+        if self._races is None:
+            self._races = {
+                (row["season"], row["round"]): row
+                for row in self._load("races", RACE_COLUMNS)
+            }
+        return self._races
+
+    def add_races(self, rows):
+        for row in rows:
+            self.races[(row["season"], row["round"])] = project(row, RACE_COLUMNS)
+
+    def race(self, season, round_number):
+        return self.races.get((season, round_number))
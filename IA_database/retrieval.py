@@ -0,0 +1,76 @@
+import os
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from query_analyzer import chroma_where
+
+# 📌 Nombre de documents fournis au LLM par question
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "4"))
+
+
+class VectorRetriever(BaseRetriever):
+    """
+    Recherche vectorielle sur les collections ChromaDB du chatbot, ouvertes une seule fois par version des données.
+    `collection_names` associe à chaque nom logique (`summaries`) la collection servie (`summaries__v<version>`,
+    voir `chroma_store.py`) ; sans correspondance, la collection non versionnée du même nom est utilisée.
+
+    La question est embeddée une seule fois ; le même vecteur interroge chaque collection et les
+    `k` plus proches voisins toutes collections confondues sont renvoyés comme `Document`.
+    Le texte de chaque document est reconstruit depuis ses métadonnées avec le gabarit de sa collection
+    (`renderers`), le même que celui utilisé pour calculer son embedding.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    collections: dict
+    embeddings_model: object
+    renderers: dict
+    k: int = RETRIEVAL_K
+
+    def __init__(self, chromadb_client, embeddings_model, renderers, k=RETRIEVAL_K, collection_names=None):
+        collection_names = collection_names or {}
+        super().__init__(
+            collections={name: chromadb_client.get_or_create_collection(name=collection_names.get(name, name)) for name in renderers},
+            embeddings_model=embeddings_model,
+            renderers=renderers,
+            k=k
+        )
+
+    def embed_query(self, question):
+        return self.embeddings_model.embed_query(question)
+
+    def search(self, vector, k=None, filters=None):
+        """
+        Recherche par vecteur : `[(distance, Document)]` triés du plus proche au plus lointain.
+        `filters` (`{collection: {champ: [valeurs]}}`, voir `QueryAnalyzer.filters`) restreint chaque collection
+        à sa tranche ; si aucun document ne correspond, la recherche est refaite sans filtre.
+        """
+        k = k or self.k
+        hits = []
+        for name, collection in self.collections.items():
+            where = chroma_where((filters or {}).get(name))
+            response = collection.query(query_embeddings=[vector], n_results=k, where=where, include=["metadatas", "distances"])
+            for doc_id, metadata, distance in zip(response["ids"][0], response["metadatas"][0], response["distances"][0]):
+                document = Document(page_content=self.renderers[name](metadata), metadata={**metadata, "id": doc_id, "collection": name})
+                hits.append((distance, document))
+        if filters and not hits:
+            return self.search(vector, k)
+        hits.sort(key=lambda hit: hit[0])
+        return hits[:k]
+
+    def documents(self, name, ids):
+        """ Documents de la collection `name` par id (résultats de la recherche lexicale). """
+        response = self.collections[name].get(ids=list(ids), include=["metadatas"])
+        return [
+            Document(page_content=self.renderers[name](metadata), metadata={**metadata, "id": doc_id, "collection": name})
+            for doc_id, metadata in zip(response["ids"], response["metadatas"])
+        ]
+
+    def retrieve(self, question, k=None):
+        """ Une seule recherche par question. """
+        return [document for _, document in self.search(self.embed_query(question), k)]
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.retrieve(query)
@@ -0,0 +1,235 @@
+import os
+import pickle
+import re
+import time
+
+import pandas as pd
+
+from query_analyzer import normalize
+from reference_index import CIRCUIT_COLUMNS, CONSTRUCTOR_COLUMNS, DRIVER_COLUMNS, iter_pages
+
+# 📌 Instantané local des tables (colonnes pandas) et agrégats précalculés, pour les questions statistiques
+STATS_SNAPSHOT_PATH = os.getenv("STATS_SNAPSHOT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".stats_snapshot.pkl"))
+STATS_TOP = int(os.getenv("STATS_TOP", "5"))
+
+RESULT_COLUMNS = ("season", "circuit_id", "driver_id", "constructor_id", "grid", "position", "points", "status")
+DRIVER_PROFILE_COLUMNS = DRIVER_COLUMNS + ("dob", "nationality")
+METRIC_COLUMNS = ["wins", "podiums", "poles", "dnfs", "points", "races"]
+
+# « Finished », « +1 Lap », « +3 Laps » : course terminée ; tout autre statut est un abandon
+FINISHED_PATTERN = re.compile(r"^(Finished|\+\d+ Laps?)$")
+
+# 📌 Intentions reconnues : indicateur demandé (sur la question normalisée, sans accents), libellés singulier / pluriel.
+# L'ordre compte : « combien de points a-t-il gagnés » porte sur les points ; « gagné » seul n'est pas une victoire
+# (« qui a gagné le championnat »), seulement « gagné des courses / des grands prix ».
+METRICS = [
+    ("points", re.compile(r"\bpoints?\b"), ("point", "points")),
+    ("wins", re.compile(r"\b(victoires?|vainqueurs?|wins?)\b|\b(gagne|remporte)\w*\s+(le plus de\s+|des\s+|de\s+)?(courses?|grands? prix|gp)\b"
+                        r"|\b(courses?|grands? prix|gp)\s+(gagne|remporte)\w*"), ("victoire", "victoires")),
+    ("podiums", re.compile(r"\bpodiums?\b"), ("podium", "podiums")),
+    ("poles", re.compile(r"\bpoles?\b"), ("pole position", "pole positions")),
+    ("dnfs", re.compile(r"\b(abandons?|abandonne\w*|dnfs?)\b"), ("abandon", "abandons")),
+]
+# Demande explicite d'un décompte ou d'un classement : sans elle, la question suit le chemin RAG
+COUNT_PATTERN = re.compile(r"\b(combien|nombre)\b")
+RANKING_PATTERN = re.compile(r"\b(classement|le plus|la plus|les plus)\b")
+# Questions que les agrégats ne savent pas traiter : causes (« pourquoi a-t-il abandonné ») et championnats
+# (le champion n'est pas forcément celui qui a le plus de victoires)
+OUT_OF_SCOPE_PATTERN = re.compile(r"\b(pourquoi|comment|cause|raison|champion\w*|titres?)\b")
+CONSTRUCTOR_PATTERN = re.compile(r"\b(ecuries?|constructeurs?|equipes?|teams?|constructors?)\b")
+
+
+class StatsSnapshot:
+    """
+    Tables `results`, `drivers`, `circuits` et `constructors` en colonnes pandas, plus les agrégats
+    par pilote et par écurie (au total et par saison) calculés une fois au chargement.
+
+    L'instantané est enregistré localement (`STATS_SNAPSHOT_PATH`) : les démarrages suivants ne relisent
+    pas Supabase. `-reload` le reconstruit.
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.results = prepare_results(tables["results"])
+        self.driver_profiles = {row["driver_ref"]: row for row in tables["drivers"].to_dict("records")}
+        self.driver_names = {
+            driver_ref: f"{row.get('first_name') or ''} {row.get('last_name') or ''}".strip() or driver_ref
+            for driver_ref, row in self.driver_profiles.items()
+        }
+        self.circuit_names = {row["circuit_id"]: row.get("circuit_name") or row["circuit_id"] for row in tables["circuits"].to_dict("records")}
+        self.constructor_names = {row["constructor_ref"]: row.get("name") or row["constructor_ref"] for row in tables["constructors"].to_dict("records")}
+
+        # 📊 Agrégats précalculés : entité -> indicateurs, et (saison, entité) -> indicateurs
+        self.aggregates = {}
+        for kind, column in (("driver", "driver_id"), ("constructor", "constructor_id")):
+            self.aggregates[kind] = aggregate(self.results, [column])
+            self.aggregates[(kind, "season")] = aggregate(self.results, ["season", column])
+
+    @classmethod
+    def fetch(cls, supabase):
+        """ Lit les quatre tables depuis Supabase (pagination, colonnes utiles uniquement). """
+        start = time.perf_counter()
+        tables = {}
+        for name, columns, order_by in (
+            ("results", RESULT_COLUMNS, ("season", "circuit_id", "driver_id")),
+            ("drivers", DRIVER_PROFILE_COLUMNS, ("driver_ref", "season")),
+            ("circuits", CIRCUIT_COLUMNS, "circuit_id"),
+            ("constructors", CONSTRUCTOR_COLUMNS, "constructor_ref"),
+        ):
+            rows = [row for page in iter_pages(supabase, name, ", ".join(columns), order_by=order_by) for row in page]
+            tables[name] = pd.DataFrame(rows, columns=list(columns))
+        print(f"📊 Instantané statistique : {len(tables['results'])} résultats lus depuis Supabase en {time.perf_counter() - start:.1f}s.")
+        return cls(tables)
+
+    @classmethod
+    def load(cls, path=STATS_SNAPSHOT_PATH):
+        with open(path, "rb") as f:
+            return cls(pickle.load(f))
+
+    def save(self, path=STATS_SNAPSHOT_PATH):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self.tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def get(cls, supabase, path=STATS_SNAPSHOT_PATH, refresh=False):
+        """ Instantané local s'il existe (sauf `refresh`), sinon lu depuis Supabase puis enregistré. """
+        if not refresh and os.path.exists(path):
+            try:
+                return cls.load(path)
+            except Exception as e:
+                print(f"⚠️ Instantané statistique illisible, reconstruction : {e}")
+        snapshot = cls.fetch(supabase)
+        snapshot.save(path)
+        return snapshot
+
+
+def prepare_results(results):
+    """ Colonnes typées (catégories pour les identifiants) et indicateurs par ligne. """
+    results = results.copy()
+    for column in ("circuit_id", "driver_id", "constructor_id", "status"):
+        results[column] = results[column].astype("category")
+    results["season"] = pd.to_numeric(results["season"], errors="coerce").astype("Int64")
+    position = pd.to_numeric(results["position"], errors="coerce")
+    grid = pd.to_numeric(results["grid"], errors="coerce")
+    results["points"] = pd.to_numeric(results["points"], errors="coerce").fillna(0.0)
+    results["position_number"] = position
+    results["wins"] = (position == 1).astype("int32")
+    results["podiums"] = (position <= 3).astype("int32")
+    results["poles"] = (grid == 1).astype("int32")
+    results["dnfs"] = (~results["status"].astype(str).str.match(FINISHED_PATTERN)).astype("int32")
+    results["races"] = 1
+    return results
+
+
+def aggregate(results, keys):
+    return results.groupby(keys, observed=True)[METRIC_COLUMNS].sum()
+
+
+class StatsEngine:
+    """
+    Réponses directes aux questions statistiques (victoires, podiums, poles, abandons, points),
+    calculées sur l'instantané sans recherche vectorielle ni LLM :
+
+        « Combien de victoires pour Hamilton en 2019 ? »      -> valeur par pilote
+        « Quelle écurie a le plus d'abandons en 2021 ? »       -> classement
+        « Combien de points Leclerc à Monza ? »                -> filtre circuit calculé à la volée
+
+    Il faut un indicateur et une demande explicite de décompte (« combien ») ou de classement (« le plus de »,
+    « classement ») ; un décompte doit aussi citer un pilote ou une écurie reconnus.
+    `answer()` renvoie `None` pour toute autre question (causes, championnats...), qui suit alors le chemin RAG habituel.
+    """
+
+    def __init__(self, snapshot, top=STATS_TOP):
+        self.snapshot = snapshot
+        self.top = top
+
+    def metric(self, question):
+        text = normalize(question)
+        for metric, pattern, label in METRICS:
+            if pattern.search(text):
+                return metric, label
+        return None, None
+
+    def table(self, kind, seasons, circuits):
+        """ Indicateurs par entité : agrégat précalculé, ou calcul à la volée si un circuit est demandé. """
+        column = f"{kind}_id"
+        if circuits:
+            results = self.snapshot.results
+            selected = results[results["circuit_id"].isin(circuits)]
+            if seasons:
+                selected = selected[selected["season"].isin(seasons)]
+            return aggregate(selected, [column])
+        if seasons:
+            by_season = self.snapshot.aggregates[(kind, "season")]
+            return by_season[by_season.index.get_level_values("season").isin(seasons)].groupby(level=column, observed=True).sum()
+        return self.snapshot.aggregates[kind]
+
+    def name(self, kind, entity_id):
+        names = self.snapshot.driver_names if kind == "driver" else self.snapshot.constructor_names
+        return names.get(entity_id, entity_id)
+
+    def scope(self, seasons, circuits):
+        parts = []
+        if circuits:
+            parts.append("à " + ", ".join(self.snapshot.circuit_names.get(circuit, circuit) for circuit in sorted(circuits)))
+        if seasons:
+            parts.append("en " + ", ".join(str(season) for season in sorted(seasons)))
+        return " ".join(parts) if parts else "sur toutes les saisons"
+
+    def answer(self, question, entities):
+        """ `entities` : résultat de `QueryAnalyzer.analyze(question)`. """
+        text = normalize(question)
+        metric, label = self.metric(question)
+        if metric is None or OUT_OF_SCOPE_PATTERN.search(text):
+            return None
+        ranking_asked = bool(RANKING_PATTERN.search(text))
+        if not ranking_asked and not COUNT_PATTERN.search(text):
+            return None
+
+        seasons, circuits = sorted(entities["season"]), sorted(entities["circuit"])
+        if not ranking_asked and not (entities["driver"] or entities["constructor"]):
+            # « Combien de points rapporte une victoire ? », pilote non reconnu : rien à compter, surtout pas un classement
+            return None
+        if entities["constructor"] and not entities["driver"]:
+            kind, subjects = "constructor", sorted(entities["constructor"])
+        elif entities["driver"]:
+            kind, subjects = "driver", sorted(entities["driver"])
+        else:
+            kind = "constructor" if CONSTRUCTOR_PATTERN.search(normalize(question)) else "driver"
+            subjects = None
+
+        table = self.table(kind, seasons, circuits)
+        if table.empty:
+            return None
+        values = table[metric]
+        scope = self.scope(seasons, circuits)
+
+        if subjects:
+            # 🎯 Valeur pour les pilotes / écuries cités
+            lines = [
+                f"{self.name(kind, subject)} : {count(values.get(subject, 0), label)} "
+                f"({count(table['races'].get(subject, 0), ('départ', 'départs'))})"
+                for subject in subjects
+            ]
+            return f"📊 {label[1].capitalize()} {scope} :\n" + "\n".join(f"- {line}" for line in lines)
+
+        # 🏆 Classement
+        ranking = values[values > 0].sort_values(ascending=False, kind="stable").head(self.top)
+        if ranking.empty:
+            return None
+        title = "Écuries" if kind == "constructor" else "Pilotes"
+        lines = [f"{rank}. {self.name(kind, entity_id)} : {format_value(value)}" for rank, (entity_id, value) in enumerate(ranking.items(), start=1)]
+        article = "d'" if label[1][0] in "aeiouy" else "de "
+        return f"🏆 {title} avec le plus {article}{label[1]} {scope} :\n" + "\n".join(lines)
+
+
+def format_value(value):
+    value = float(value)
+    return f"{value:g}" if value != int(value) else str(int(value))
+
+
+def count(value, label):
+    """ `(3, ("victoire", "victoires"))` -> « 3 victoires ». """
+    return f"{format_value(value)} {label[0] if abs(float(value)) <= 1 else label[1]}"
@@ -0,0 +1,107 @@
+import os
+import time
+
+# 📌 Réponses diffusées pendant la génération (surchargeables via `.env`)
+#
+# La ligne `message` de l'assistant est insérée dès le premier token puis mise à jour par blocs :
+# une mise à jour part quand `STREAM_CHUNK_TOKENS` nouveaux tokens sont arrivés ET que `STREAM_WRITE_INTERVAL`
+# secondes se sont écoulées depuis l'écriture précédente (au plus 1 / STREAM_WRITE_INTERVAL écritures par seconde).
+STREAM_RESPONSES = os.getenv("CHAT_STREAMING", "0") == "1"
+STREAM_CHUNK_TOKENS = int(os.getenv("STREAM_CHUNK_TOKENS", "16"))
+STREAM_WRITE_INTERVAL = float(os.getenv("STREAM_WRITE_INTERVAL", "0.5"))
+STREAM_COMPLETE_COLUMN = os.getenv("STREAM_COMPLETE_COLUMN", "complete")
+STREAM_ERROR_TEXT = "⚠️ Réponse interrompue : une erreur est survenue pendant la génération."
+
+
+class StreamingMessage:
+    """
+    Réponse de l'assistant écrite dans la table `message` au fil de la génération :
+    - insertion au premier token (`complete = false`), pour un affichage immédiat côté web ;
+    - mises à jour regroupées (tokens et délai minimum entre deux écritures) ;
+    - `close` écrit le texte final avec `complete = true` (ou l'insère d'un coup si rien n'a été diffusé) ;
+    - `abort` termine une ligne déjà insérée quand la génération échoue (texte reçu + message d'erreur, `complete = true`).
+
+        stream = StreamingMessage(supabase, chat_id)
+        for token in tokens:
+            stream.write(token)
+        stream.close()           # `stream.abort()` si la génération lève une exception
+
+    Une mise à jour intermédiaire en échec est ignorée (la suivante porte tout le texte) ; l'insertion
+    et l'écriture finale lèvent l'exception.
+    """
+
+    def __init__(self, supabase, chat_id, chunk_tokens=STREAM_CHUNK_TOKENS, write_interval=STREAM_WRITE_INTERVAL,
+                 table="message", complete_column=STREAM_COMPLETE_COLUMN):
+        self.supabase = supabase
+        self.chat_id = chat_id
+        self.chunk_tokens = chunk_tokens
+        self.write_interval = write_interval
+        self.table = table
+        self.complete_column = complete_column
+
+        self.id = None
+        self.parts = []
+        self.pending = 0
+        self.start = time.perf_counter()
+        self.last_write = None
+        self.first_write = None   # secondes entre la création du flux et l'insertion de la ligne
+        self.writes = 0
+        self.tokens = 0
+        self.errors = 0
+
+    @property
+    def content(self):
+        return "".join(self.parts)
+
+    def write(self, token):
+        if not token:
+            return
+        self.parts.append(token)
+        self.tokens += 1
+        self.pending += 1
+        if self.id is None:
+            self._insert(complete=False)
+        elif self.pending >= self.chunk_tokens and time.perf_counter() - self.last_write >= self.write_interval:
+            try:
+                self._update(complete=False)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Mise à jour de la réponse diffusée ignorée (chat {self.chat_id}) : {e}")
+
+    def close(self, content=None):
+        """ Écrit le texte final (`content` s'il est fourni, sinon les tokens reçus) et marque la ligne complète. """
+        if content is not None:
+            self.parts = [content]
+        if self.id is None:
+            self._insert(complete=True)
+        else:
+            self._update(complete=True)
+        return self.content
+
+    def abort(self, error_text=STREAM_ERROR_TEXT):
+        """ Génération en échec : la ligne déjà insérée est terminée avec `error_text`, pour que le client n'attende pas. """
+        if self.id is None:
+            return
+        self.parts.append(f"\n\n{error_text}" if self.parts else error_text)
+        try:
+            self._update(complete=True)
+        except Exception as e:
+            print(f"⚠️ Réponse interrompue non terminée (chat {self.chat_id}, message {self.id}) : {e}")
+
+    def _insert(self, complete):
+        row = {"chat_id": self.chat_id, "role": "assistant", "content": self.content, self.complete_column: complete}
+        response = self.supabase.table(self.table).insert(row).execute()
+        self.id = response.data[0]["id"]
+        self._written()
+
+    def _update(self, complete):
+        values = {"content": self.content, self.complete_column: complete}
+        self.supabase.table(self.table).update(values).eq("id", self.id).execute()
+        self._written()
+
+    def _written(self):
+        self.last_write = time.perf_counter()
+        if self.first_write is None:
+            self.first_write = self.last_write - self.start
+        self.writes += 1
+        self.pending = 0
@@ -0,0 +1,165 @@
+import os
+
+from embedding_engine import estimate_tokens
+from stats_engine import METRIC_COLUMNS, format_value
+from templates import career_summary_text, driver_season_summary_text, race_recap_text
+
+# 📌 Documents de résumé : une saison d'un pilote, une course, une carrière.
+# Ils remplacent les lignes brutes (un résultat, un pilote-saison) comme couche principale de la recherche :
+# beaucoup moins de vecteurs, chacun portant plus d'information. Les lignes brutes restent accessibles
+# en détail (`drilldown_rows`) depuis l'instantané local, sans embedding.
+DRILLDOWN_ROWS = int(os.getenv("DRILLDOWN_ROWS", "10"))
+# Budget (tokens estimés) du contexte envoyé au LLM : résumés trouvés et lignes de détail compris.
+# Un résumé fait 60 à 90 tokens : le défaut garde les `RETRIEVAL_K` résumés et `DRILLDOWN_ROWS` lignes, et ne coupe
+# que les contextes anormalement longs (voir `benchmarks/bench_summaries.py`)
+CONTEXT_TOKENS = int(os.getenv("CONTEXT_TOKENS", "800"))
+
+SUMMARY_TEMPLATES = {
+    "driver_season": driver_season_summary_text,
+    "race": race_recap_text,
+    "career": career_summary_text,
+}
+
+
+def summary_text(summary):
+    return SUMMARY_TEMPLATES[summary["level"]](summary)
+
+
+def counts(row):
+    """ Indicateurs agrégés -> entiers / points lisibles (métadonnées ChromaDB et JSON). """
+    values = {column: int(row[column]) for column in METRIC_COLUMNS if column != "points"}
+    values["points"] = format_value(row["points"])
+    return values
+
+
+def position_label(position):
+    return f"P{int(position)}" if position == position else "non classé"
+
+
+def build_summaries(snapshot):
+    """ Instantané (`StatsSnapshot`) -> `{niveau: [résumé]}` ; chaque résumé porte `id`, `level` et ses métadonnées filtrables. """
+    drivers, circuits, constructors = snapshot.driver_names, snapshot.circuit_names, snapshot.constructor_names
+    results = snapshot.results.assign(
+        driver=lambda df: df["driver_id"].astype(str),
+        circuit=lambda df: df["circuit_id"].astype(str),
+        constructor=lambda df: df["constructor_id"].astype(str).map(lambda ref: constructors.get(ref, ref)),
+    )
+    results["label"] = results["driver"].map(lambda ref: drivers.get(ref, ref)) + " (" + results["constructor"] + ")"
+    ranked = results.sort_values(["position_number", "season"], na_position="last", kind="stable")
+
+    def constructors_by(keys):
+        pairs = results[keys + ["constructor"]].drop_duplicates().sort_values("constructor")
+        return pairs.groupby(keys, observed=True)["constructor"].agg(", ".join).rename("constructors")
+
+    # 🏎️ Saison d'un pilote (agrégats joints en une table, puis une ligne -> un résumé)
+    totals = results.groupby(["season", "driver"])[METRIC_COLUMNS].sum()
+    seasons = totals.join([
+        totals["points"].groupby(level="season").rank(ascending=False, method="min").rename("championship_rank"),
+        ranked.drop_duplicates(["season", "driver"]).set_index(["season", "driver"])[["position_number", "circuit"]],
+        constructors_by(["season", "driver"]),
+    ])
+    driver_seasons = [
+        {
+            "id": f"driver_season_{season}_{driver_id}",
+            "level": "driver_season",
+            "season": int(season),
+            "driver_id": driver_id,
+            "driver_name": drivers.get(driver_id, driver_id),
+            "constructors": row["constructors"],
+            **counts(row),
+            "championship_rank": int(row["championship_rank"]),
+            "best_position": position_label(row["position_number"]),
+            "best_circuit": circuits.get(row["circuit"], row["circuit"]),
+        }
+        for (season, driver_id), row in zip(seasons.index, seasons.to_dict("records"))
+    ]
+
+    # 🏁 Course
+    race_keys = ["season", "circuit"]
+    classified = ranked[ranked["position_number"].notna()]
+    race_table = results.groupby(race_keys).agg(starters=("races", "sum"), dnfs=("dnfs", "sum")).join([
+        classified[classified["position_number"] == 1].drop_duplicates(race_keys).set_index(race_keys)["label"].rename("winner"),
+        classified.groupby(race_keys).head(3).groupby(race_keys)["label"].agg(", ".join).rename("podium"),
+        results[results["poles"] == 1].drop_duplicates(race_keys).set_index(race_keys)["label"].rename("pole"),
+    ])
+    races = [
+        {
+            "id": f"race_{season}_{circuit_id}",
+            "level": "race",
+            "season": int(season),
+            "circuit_id": circuit_id,
+            "circuit_name": circuits.get(circuit_id, circuit_id),
+            "winner": row["winner"] if isinstance(row["winner"], str) else "inconnu",
+            "podium": row["podium"] if isinstance(row["podium"], str) else "inconnu",
+            "pole": row["pole"] if isinstance(row["pole"], str) else "inconnue",
+            "starters": int(row["starters"]),
+            "finishers": int(row["starters"] - row["dnfs"]),
+            "dnfs": int(row["dnfs"]),
+        }
+        for (season, circuit_id), row in zip(race_table.index, race_table.to_dict("records"))
+    ]
+
+    # 📈 Carrière
+    best_seasons = totals["points"].reset_index().sort_values(["points", "season"], ascending=[False, True], kind="stable").drop_duplicates("driver")
+    career_table = results.groupby("driver")[METRIC_COLUMNS].sum().join([
+        results.groupby("driver")["season"].agg(["nunique", "min", "max"]),
+        best_seasons.set_index("driver").rename(columns={"season": "best_season", "points": "best_season_points"}),
+        constructors_by(["driver"]),
+    ])
+    careers = []
+    for driver_id, row in zip(career_table.index, career_table.to_dict("records")):
+        profile = snapshot.driver_profiles.get(driver_id, {})
+        careers.append({
+            "id": f"career_{driver_id}",
+            "level": "career",
+            "driver_id": driver_id,
+            "driver_name": drivers.get(driver_id, driver_id),
+            "nationality": profile.get("nationality") or "nationalité inconnue",
+            "dob": profile.get("dob") or "date inconnue",
+            "seasons": int(row["nunique"]),
+            "first_season": int(row["min"]),
+            "last_season": int(row["max"]),
+            "constructors": row["constructors"],
+            **counts(row),
+            "best_season": int(row["best_season"]),
+            "best_season_points": format_value(row["best_season_points"]),
+        })
+
+    return {"driver_season": driver_seasons, "race": races, "career": careers}
+
+
+def drilldown_rows(results, entities, limit=DRILLDOWN_ROWS):
+    """
+    Lignes brutes de résultats pour une question précise (un pilote ou un circuit, et au moins une autre entité),
+    lues dans l'instantané : au plus `limit` lignes, vide pour une question trop large.
+    """
+    if not (entities["driver"] or entities["circuit"]) or sum(bool(values) for values in entities.values()) < 2:
+        return []
+    mask = results["season"].notna()
+    for kind, column in (("season", "season"), ("driver", "driver_id"), ("circuit", "circuit_id"), ("constructor", "constructor_id")):
+        if entities[kind]:
+            mask &= results[column].isin(entities[kind])
+    selected = results[mask].sort_values(["season", "position_number"], na_position="last", kind="stable").head(limit)
+    return [
+        {column: (value.item() if hasattr(value, "item") else value) for column, value in row.items()}
+        for row in selected[["season", "circuit_id", "driver_id", "constructor_id", "grid", "position", "points", "status"]].to_dict("records")
+    ]
+
+
+def budgeted_context(documents, details, budget=CONTEXT_TOKENS):
+    """
+    Contexte du LLM borné à `budget` tokens : le premier document trouvé (toujours gardé), puis les lignes
+    de détail (réponse exacte d'une question précise), puis les documents suivants, tant qu'il reste de la place.
+    """
+    kept, used = [], 0
+    for kind, text in [("document", text) for text in documents[:1]] + [("detail", line) for line in details] + [("document", text) for text in documents[1:]]:
+        tokens = estimate_tokens(text)
+        if kept and used + tokens > budget:
+            continue
+        kept.append((kind, text))
+        used += tokens
+    context = "\n\n".join(text for kind, text in kept if kind == "document")
+    rows = [text for kind, text in kept if kind == "detail"]
+    if rows:
+        context += "\n\nDétail des résultats :\n" + "\n".join(rows)
+    return context
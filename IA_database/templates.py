@@ -0,0 +1,114 @@
+import hashlib
+import inspect
+
+# 📌 Gabarits de texte utilisés pour les embeddings.
+# La version d'un gabarit est l'empreinte de son code source : modifier une f-string
+# invalide uniquement les embeddings en cache produits par ce gabarit.
+
+
+def template_version(template):
+    return hashlib.sha256(inspect.getsource(template).encode("utf-8")).hexdigest()[:12]
+
+
+# 🏁 Courses
+def race_text(race):
+    return f"Grand Prix {race['name']} - Saison {race['season']}, Manche {race['round']} sur le circuit {race['circuit_id']}."
+
+
+def race_summary_text(race):
+    return f"Grand Prix : {race['name']} - {race['date']} sur le circuit {race['circuit_id']}."
+
+
+# 🏎️ Pilotes
+def driver_season_text(driver):
+    return f"Pilote {driver['first_name']} {driver['last_name']} ({driver['nationality']}), saison {driver['season']}."
+
+
+def driver_detail_text(driver):
+    return (
+        f"Pilote {driver['first_name']} {driver['last_name']} ({driver['nationality']}), "
+        f"né le {driver['dob']}. "
+        f"Numéro: {driver.get('number') or 'N/A'}, Code: {driver.get('code') or 'N/A'}. "
+        f"Saison {driver['season']}. En savoir plus : {driver['url']}"
+    )
+
+
+def driver_profile_text(driver):
+    return (
+        f"Pilote {driver['first_name']} {driver['last_name']} ({driver['nationality']}). "
+        f"Né le {driver['dob']}. "
+        f"Plus d'informations : {driver['url']}."
+    )
+
+
+def driver_short_text(driver):
+    return f"Pilote : {driver['first_name']} {driver['last_name']} ({driver['nationality']})."
+
+
+# 📊 Résultats
+def race_result_text(result):
+    return (
+        f"Résultats F1 - Saison {result['season']}. "
+        f"Grand Prix {result['round']}, ID de la course: {result['race_id']}. "
+        f"Pilote: {result['driver_id']}, écurie: {result['constructor']}. "
+        f"Départ: {result['grid']}, Position finale: {result['position']}, "
+        f"Points marqués: {result['points']}, Statut: {result['status']}."
+    )
+
+
+def result_text(result):
+    constructor = result["constructor_id"] if result.get("constructor_id") is not None else "Unknown"
+    return (
+        f"Résultat de la saison {result['season']}. "
+        f"Circuit: {result['circuit_id']}. "
+        f"Pilote: {result['driver_id']}. "
+        f"Écurie: {constructor}. "
+        f"Position sur la grille: {result.get('grid', 'N/A')}. "
+        f"Position finale: {result.get('position', 'N/A')}. "
+        f"Points marqués: {result.get('points', 0)}. "
+        f"Statut de la course: {result.get('status', 'N/A')}."
+    )
+
+
+def result_with_driver_text(result, driver_name):
+    return (
+        f"Saison {result['season']} - Circuit {result['circuit_id']}: "
+        f"Pilote {driver_name}, Écurie {result['constructor_id']}, "
+        f"Position sur la grille: {result['grid']}, Position finale: {result['position']}, "
+        f"Points marqués: {result['points']}, Statut: {result['status']}."
+    )
+
+
+def result_short_text(result):
+    return f"Résultat : {result['driver_id']} a terminé {result['position']} avec {result['points']} points."
+
+
+# 📚 Résumés (documents agrégés, couche principale de la recherche)
+def driver_season_summary_text(summary):
+    return (
+        f"Saison {summary['season']} de {summary['driver_name']} ({summary['constructors']}) : "
+        f"{summary['races']} courses, {summary['wins']} victoires, {summary['podiums']} podiums, "
+        f"{summary['poles']} pole positions, {summary['points']} points, {summary['dnfs']} abandons. "
+        f"Classement au championnat : {summary['championship_rank']}e. "
+        f"Meilleur résultat : {summary['best_position']} à {summary['best_circuit']}."
+    )
+
+
+def race_recap_text(summary):
+    return (
+        f"Course {summary['circuit_name']} ({summary['circuit_id']}), saison {summary['season']} : "
+        f"vainqueur {summary['winner']}, podium : {summary['podium']}. "
+        f"Pole position : {summary['pole']}. "
+        f"{summary['finishers']} pilotes classés sur {summary['starters']} partants, {summary['dnfs']} abandons."
+    )
+
+
+def career_summary_text(summary):
+    return (
+        f"Carrière de {summary['driver_name']} ({summary['nationality']}, né le {summary['dob']}) : "
+        f"{summary['seasons']} saisons de {summary['first_season']} à {summary['last_season']}, "
+        f"{summary['races']} courses avec {summary['constructors']}. "
+        f"{summary['wins']} victoires, {summary['podiums']} podiums, {summary['poles']} pole positions, "
+        f"{summary['points']} points, {summary['dnfs']} abandons. "
+        f"Meilleure saison : {summary['best_season']} ({summary['best_season_points']} points)."
+    )
@@ -0,0 +1,161 @@
+import base64
+import json
+import os
+import time
+
+import numpy as np
+
+# 📌 Format de stockage des embeddings (surchargeable via `.env`)
+#
+#   json     "[0.0123, -0.0456, ...]"          ~20 octets / dimension (format historique, compatible pgvector)
+#   float32  "f32:<base64>"                     ~5,3 octets / dimension, sans perte
+#   float16  "f16:<base64>"                     ~2,7 octets / dimension
+#   int8     "i8:<base64 échelle + int8>"       ~1,3 octet / dimension (quantification symétrique par vecteur)
+#
+# Les préfixes rendent chaque valeur auto-descriptive : la lecture accepte tous les formats à la fois,
+# une table peut donc être migrée progressivement.
+EMBEDDING_ENCODING = os.getenv("EMBEDDING_ENCODING", "json")
+ENCODINGS = ("json", "float32", "float16", "int8")
+PREFIXES = {"float32": "f32:", "float16": "f16:", "int8": "i8:"}
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+def check_encoding(encoding):
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Encodage d'embeddings inconnu `{encoding}` (attendu : {', '.join(ENCODINGS)})")
+    return encoding
+
+
+# 🔢 Quantification (vectorisée sur toute la matrice)
+def quantize(matrix, encoding):
+    """ Matrice float -> `(tableau encodé, échelles par ligne ou None)`. """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if encoding == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return matrix.astype(DTYPES[encoding]), None
+
+
+def dequantize(array, scales=None):
+    matrix = np.asarray(array, dtype=np.float32)
+    return matrix * scales[:, None] if scales is not None else matrix
+
+
+# 🗄️ Colonnes texte (Supabase)
+def encode_vectors(vectors, encoding=EMBEDDING_ENCODING):
+    """ Lot de vecteurs -> valeurs à écrire dans une colonne `embedding`. """
+    check_encoding(encoding)
+    vectors = list(vectors)
+    if not vectors:
+        return []
+    if encoding == "json":
+        return [json.dumps(vector if isinstance(vector, list) else np.asarray(vector).tolist()) for vector in vectors]
+    array, scales = quantize(np.vstack(vectors), encoding)
+    prefix = PREFIXES[encoding]
+    if scales is None:
+        return [prefix + base64.b64encode(row.tobytes()).decode("ascii") for row in array]
+    return [prefix + base64.b64encode(scale.tobytes() + row.tobytes()).decode("ascii") for scale, row in zip(scales, array)]
+
+
+def encode_vector(vector, encoding=EMBEDDING_ENCODING):
+    return encode_vectors([vector], encoding)[0]
+
+
+def decode_vector(value):
+    """ Valeur lue en base (n'importe quel format ci-dessus, ou liste) -> vecteur float32, `None` si absente. """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        if value.startswith("i8:"):
+            raw = base64.b64decode(value[3:])
+            return np.frombuffer(raw[4:], dtype=np.int8).astype(np.float32) * np.frombuffer(raw[:4], dtype=np.float32)[0]
+        for encoding, prefix in PREFIXES.items():
+            if value.startswith(prefix):
+                return np.frombuffer(base64.b64decode(value[len(prefix):]), dtype=DTYPES[encoding]).astype(np.float32)
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def decode_vectors(values):
+    """ Lot de valeurs de même format -> matrice float32 (un seul `frombuffer` pour les formats binaires). """
+    values = list(values)
+    if not values:
+        return np.empty((0, 0), dtype=np.float32)
+    first = values[0] if isinstance(values[0], str) else ""
+    for encoding, prefix in PREFIXES.items():
+        if first.startswith(prefix) and all(isinstance(value, str) and value.startswith(prefix) for value in values):
+            raw = b"".join(base64.b64decode(value[len(prefix):]) for value in values)
+            if encoding == "int8":
+                rows = np.frombuffer(raw, dtype=np.uint8).reshape(len(values), -1)
+                scales = rows[:, :4].copy().view(np.float32)[:, 0]
+                return dequantize(rows[:, 4:].view(np.int8), scales)
+            return np.frombuffer(raw, dtype=DTYPES[encoding]).reshape(len(values), -1).astype(np.float32)
+    return np.vstack([decode_vector(value) for value in values])
+
+
+# 📉 Réduction de dimension (PCA non centrée : préserve au mieux les produits scalaires)
+def fit_pca(sample, dimensions):
+    """ Échantillon (n x d) -> base de projection (d x `dimensions`). """
+    sample = np.asarray(sample, dtype=np.float32)
+    _, _, components = np.linalg.svd(sample, full_matrices=False)
+    return np.ascontiguousarray(components[:dimensions].T)
+
+
+def project(matrix, components):
+    projected = np.asarray(matrix, dtype=np.float32) @ components
+    norms = np.linalg.norm(projected, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return projected / norms
+
+
+# 🎯 Coût en rappel de chaque réglage
+def bytes_per_vector(encoding, dimensions, text=False):
+    """ Octets par vecteur : en mémoire / sur disque, ou dans une colonne texte (`text=True`, base64). """
+    if encoding == "json":
+        return 20 * dimensions
+    size = dimensions * np.dtype(DTYPES[encoding]).itemsize + (4 if encoding == "int8" else 0)
+    return 4 * -(-size // 3) + len(PREFIXES[encoding]) if text else size
+
+
+def recall_report(vectors, queries=None, k=10, settings=None, sample_size=5000, seed=0):
+    """
+    Rappel@k de chaque réglage `(encodage, dimensions PCA ou 0)` par rapport à la recherche exacte en float32.
+    Sans `queries`, des vecteurs de la matrice (légèrement bruités) servent de requêtes.
+    Renvoie une liste de dicts `{encoding, dimensions, recall, bytes, seconds}`.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    rng = np.random.default_rng(seed)
+    if queries is None:
+        picked = vectors[rng.choice(len(vectors), min(200, len(vectors)), replace=False)]
+        queries = picked + rng.normal(0, 0.02, picked.shape).astype(np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    k = min(k, len(vectors))
+
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :k]
+    settings = settings or [(encoding, 0) for encoding in ("float32", "float16", "int8")]
+    report = []
+    for encoding, dimensions in settings:
+        start = time.perf_counter()
+        matrix, query_matrix = vectors, queries
+        if dimensions:
+            components = fit_pca(vectors[rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False)], dimensions)
+            matrix, query_matrix = project(vectors, components), project(queries, components)
+        stored, scales = quantize(matrix, "float32" if encoding == "json" else encoding)
+        found = np.argsort(-(query_matrix @ dequantize(stored, scales).T), axis=1)[:, :k]
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(truth, found)])
+        report.append({
+            "encoding": encoding,
+            "dimensions": dimensions or vectors.shape[1],
+            "recall": float(recall),
+            "bytes": bytes_per_vector(encoding, dimensions or vectors.shape[1]),
+            "seconds": time.perf_counter() - start,
+        })
+    return report
+
+
+def print_recall_report(report, k=10):
+    for row in report:
+        print(f"   {row['encoding']:<8} {row['dimensions']:>5} dim  {row['bytes']:>6} octets/vecteur  rappel@{k} {100 * row['recall']:5.1f}%")
@@ -0,0 +1,360 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from retrieval import RETRIEVAL_K
+from vector_codec import DTYPES, check_encoding, decode_vector, dequantize, fit_pca, print_recall_report, project, quantize, recall_report
+
+# 📌 Index vectoriel NumPy en mémoire partagée (alternative à ChromaDB)
+#
+#   vector_index/
+#       active_index.json   version servie (remplacé atomiquement à chaque reconstruction)
+#       v<version>/
+#           vectors.npy     matrice contiguë (N x d) float32, float16 ou int8, vecteurs normalisés, ouverte en mmap
+#           scales.npy      échelles par ligne (int8 uniquement)
+#           components.npy  base PCA appliquée aux vecteurs et aux requêtes (optionnel)
+#           centroids.npy   centroïdes IVF (optionnel)
+#           index.json      ids, collections et métadonnées de chaque ligne (+ bornes des listes IVF)
+#       lexical_index.npz, data_version.txt   (communs à toutes les versions)
+#
+# Comme `active_collections.json` pour ChromaDB : le répertoire servi n'est jamais déplacé ni supprimé pendant
+# une reconstruction, les `VECTOR_INDEX_KEEP_VERSIONS` versions précédentes restent lisibles par les lecteurs en cours.
+ACTIVE_FILE = "active_index.json"
+INDEX_FILES = ["vectors.npy", "scales.npy", "components.npy", "centroids.npy", "index.json"]
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "vector_index"))
+IVF_LISTS = int(os.getenv("VECTOR_INDEX_IVF_LISTS", "0"))   # 0 = recherche exacte
+NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+INDEX_ENCODING = os.getenv("VECTOR_INDEX_ENCODING", "float32")   # float32, float16 ou int8
+INDEX_PCA = int(os.getenv("VECTOR_INDEX_PCA", "0"))              # 0 = dimensions d'origine
+KEEP_VERSIONS = int(os.getenv("VECTOR_INDEX_KEEP_VERSIONS", "1"))
+CHUNK_ROWS = 8192
+
+
+def active_index_dir(path):
+    """ Répertoire de la version servie (`active_index.json`), ou `path` lui-même pour un index d'avant le versionnage. """
+    try:
+        with open(os.path.join(path, ACTIVE_FILE), "r", encoding="utf-8") as f:
+            return os.path.join(path, json.load(f)["directory"])
+    except (OSError, ValueError, KeyError):
+        return path
+
+
+def activate_index(path, directory):
+    """ Bascule atomique des lecteurs vers `path/directory` (fichier pointeur écrit à côté puis renommé). """
+    target = os.path.join(path, ACTIVE_FILE)
+    tmp_path = f"{target}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"directory": directory, "activated": time.time()}, f)
+    os.replace(tmp_path, target)
+
+
+def collect_garbage(path, keep_versions=KEEP_VERSIONS):
+    """ Supprime les versions plus anciennes que les `keep_versions` précédentes, et les fichiers d'un index non versionné. """
+    active = os.path.basename(active_index_dir(path))
+    versions = sorted((name for name in os.listdir(path) if name.startswith("v") and os.path.isdir(os.path.join(path, name))), reverse=True)
+    for name in [name for name in versions if name != active][keep_versions:]:
+        shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+        print(f"🧹 Ancienne version de l'index `{name}` supprimée.")
+    for name in INDEX_FILES:
+        if os.path.exists(os.path.join(path, name)):
+            os.remove(os.path.join(path, name))
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k):
+    """ Indices des `k` meilleurs scores de chaque ligne (argpartition puis tri des seuls `k` retenus). """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def kmeans(vectors, lists, iterations=10, sample_size=20000, seed=0):
+    """ k-means sphérique (produit scalaire) sur un échantillon : renvoie les centroïdes normalisés. """
+    rng = np.random.default_rng(seed)
+    sample = vectors[np.sort(rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False))]
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for cluster in range(lists):
+            members = sample[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        centroids = normalize_rows(centroids)
+    return centroids
+
+
+def build_index(sources, path=VECTOR_INDEX_PATH, ivf_lists=IVF_LISTS, encoding=INDEX_ENCODING, pca_dimensions=INDEX_PCA,
+                before_activate=None):
+    """
+    Construit l'index à partir de `sources` : itérable de `(collection, pages, id_of)`,
+    où `pages` produit des pages de lignes contenant une colonne `embedding` (tout format de `vector_codec`).
+    Les vecteurs sont écrits au fil de l'eau (mémoire bornée) dans une nouvelle version, activée en une fois.
+    `encoding` / `pca_dimensions` compressent la matrice ; leur coût en rappel@10 est affiché.
+    `before_activate()` est appelé juste avant l'activation (index lexical écrit avant que les lecteurs ne basculent).
+    """
+    if check_encoding(encoding) == "json":
+        raise ValueError("L'index local stocke une matrice : encodage float32, float16 ou int8.")
+    start = time.perf_counter()
+    os.makedirs(path, exist_ok=True)
+    build_dir = tempfile.mkdtemp(prefix=".build_", dir=path)
+    raw_path = os.path.join(build_dir, "vectors.raw")
+
+    ids, collections, metadata = [], [], []
+    dimensions = None
+    with open(raw_path, "wb") as raw:
+        for collection, pages, id_of in sources:
+            for page in pages:
+                vectors = []
+                for row in page:
+                    vector = decode_vector(row.pop("embedding", None))
+                    if vector is None:
+                        continue
+                    dimensions = dimensions or len(vector)
+                    vectors.append(vector)
+                    ids.append(id_of(row))
+                    collections.append(collection)
+                    metadata.append(row)
+                if vectors:
+                    raw.write(normalize_rows(np.vstack(vectors)).astype(np.float32).tobytes())
+
+    count = len(ids)
+    if not count:
+        shutil.rmtree(build_dir)
+        raise ValueError("Aucun document à indexer : aucun résumé produit (`summaries.py`) ; chargez les résultats (`Request02.py`), puis relancez `python chatbot.py -reload`.")
+
+    vectors = np.memmap(raw_path, dtype=np.float32, mode="r", shape=(count, dimensions))
+    rng = np.random.default_rng(0)
+    sample = vectors[np.sort(rng.choice(count, min(20000, count), replace=False))]
+
+    # 📉 PCA : base apprise sur un échantillon, appliquée à chaque bloc (et plus tard aux requêtes)
+    components = None
+    stored_dimensions = dimensions
+    if 0 < pca_dimensions < dimensions:
+        components = fit_pca(sample, pca_dimensions)
+        stored_dimensions = pca_dimensions
+        np.save(os.path.join(build_dir, "components.npy"), components)
+
+    def transform(block):
+        return project(block, components) if components is not None else np.asarray(block)
+
+    order = np.arange(count)
+    offsets = None
+    ivf_lists = min(ivf_lists, count)
+    if ivf_lists > 1:
+        # 📌 IVF : les vecteurs de chaque liste sont rangés de façon contiguë
+        centroids = kmeans(transform(sample), ivf_lists)
+        assignments = np.concatenate([
+            np.argmax(transform(vectors[i:i + CHUNK_ROWS]) @ centroids.T, axis=1) for i in range(0, count, CHUNK_ROWS)
+        ])
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=ivf_lists))]).tolist()
+        np.save(os.path.join(build_dir, "centroids.npy"), centroids.astype(np.float32))
+
+    matrix = np.lib.format.open_memmap(os.path.join(build_dir, "vectors.npy"), mode="w+", dtype=DTYPES[encoding], shape=(count, stored_dimensions))
+    scales = np.empty(count, dtype=np.float32) if encoding == "int8" else None
+    for i in range(0, count, CHUNK_ROWS):
+        block, block_scales = quantize(transform(vectors[order[i:i + CHUNK_ROWS]]), encoding)
+        matrix[i:i + CHUNK_ROWS] = block
+        if scales is not None:
+            scales[i:i + CHUNK_ROWS] = block_scales
+    matrix.flush()
+    if scales is not None:
+        np.save(os.path.join(build_dir, "scales.npy"), scales)
+    del matrix, vectors
+    os.remove(raw_path)
+
+    if encoding != "float32" or components is not None:
+        print(f"🎯 Coût de la compression (rappel@10 par rapport au float32 sur {len(sample)} vecteurs) :")
+        print_recall_report(recall_report(sample, settings=[(encoding, stored_dimensions if components is not None else 0)]))
+
+    names = sorted(set(collections))
+    with open(os.path.join(build_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "count": count,
+            "dimensions": stored_dimensions,
+            "source_dimensions": dimensions,
+            "encoding": encoding,
+            "offsets": offsets,
+            "collection_names": names,
+            "collections": [names.index(collections[i]) for i in order],
+            "ids": [ids[i] for i in order],
+            "metadata": [metadata[i] for i in order]
+        }, f, ensure_ascii=False, default=str)
+
+    # 🔁 Activation de la nouvelle version : l'ancienne reste en place (les lecteurs déjà ouverts gardent leur mmap)
+    version = f"v{time.strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:6]}"
+    os.replace(build_dir, os.path.join(path, version))
+    if before_activate:
+        before_activate()
+    activate_index(path, version)
+    collect_garbage(path)
+
+    print(
+        f"✅ Index vectoriel : {count} vecteurs ({stored_dimensions} dimensions {encoding}{f', {ivf_lists} listes IVF' if offsets else ''}) "
+        f"construit en {time.perf_counter() - start:.1f}s."
+    )
+    return count
+
+
+class VectorIndex:
+    """ Index chargé en mmap : ouverture quasi instantanée, recherche top-k par produit matriciel. """
+
+    def __init__(self, path=VECTOR_INDEX_PATH, nprobe=NPROBE):
+        start = time.perf_counter()
+        self.path = path
+        self.directory = active_index_dir(path)
+        with open(os.path.join(self.directory, "index.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.nprobe = nprobe
+        self.ids = meta["ids"]
+        self.metadata = meta["metadata"]
+        self.collection_names = meta["collection_names"]
+        self.collections = np.asarray(meta["collections"], dtype=np.int16)
+        self.offsets = meta["offsets"]
+        self.encoding = meta.get("encoding", "float32")
+        self.vectors = np.load(os.path.join(self.directory, "vectors.npy"), mmap_mode="r")
+        self.scales = np.load(os.path.join(self.directory, "scales.npy")) if self.encoding == "int8" else None
+        components = os.path.join(self.directory, "components.npy")
+        self.components = np.load(components) if os.path.exists(components) else None
+        self.centroids = np.load(os.path.join(self.directory, "centroids.npy")) if self.offsets else None
+        self.inverted = {}  # champ -> {valeur: positions}, construit à la première utilisation
+        self.by_id = None   # id -> position, construit à la première utilisation
+        print(f"📂 Index vectoriel chargé : {len(self.ids)} vecteurs en {1000 * (time.perf_counter() - start):.0f} ms.")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, field, values):
+        """ Positions des lignes dont la métadonnée `field` vaut l'une des `values` (index inversé). """
+        if field not in self.inverted:
+            inverted = {}
+            for position, metadata in enumerate(self.metadata):
+                if field in metadata:
+                    inverted.setdefault(metadata[field], []).append(position)
+            self.inverted[field] = {value: np.asarray(found, dtype=np.int64) for value, found in inverted.items()}
+        found = [self.inverted[field][value] for value in values if value in self.inverted[field]]
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def candidates(self, filters):
+        """
+        `{collection: [{champ: [valeurs]}]}` -> positions candidates (union des alternatives de chaque collection,
+        collection entière si elle n'a pas de condition). `None` sans filtre.
+        """
+        if not filters:
+            return None
+        parts = []
+        for collection_id, name in enumerate(self.collection_names):
+            in_collection = np.flatnonzero(self.collections == collection_id)
+            alternatives = filters.get(name)
+            if not alternatives:
+                parts.append(in_collection)
+                continue
+            for conditions in alternatives:
+                selected = in_collection
+                for field, values in conditions.items():
+                    selected = np.intersect1d(selected, self.positions(field, values), assume_unique=True)
+                parts.append(selected)
+        return np.unique(np.concatenate(parts))
+
+    def search(self, queries, k=RETRIEVAL_K, candidates=None):
+        """
+        Recherche par lot : `queries` (q x d) -> pour chaque requête, liste `[(score cosinus, position)]`.
+        Exact : un seul produit matriciel sur toute la matrice. IVF : uniquement les `nprobe` listes les plus proches.
+        `candidates` (positions, voir `candidates()`) : seule cette tranche est parcourue.
+        """
+        queries = normalize_rows(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        if self.components is not None:
+            queries = project(queries, self.components)
+        if candidates is not None:
+            scores = self.scores(queries, candidates)
+            best = top_k(scores, k)
+            return [[(float(scores[q, i]), int(candidates[i])) for i in best[q]] for q in range(len(queries))]
+        if self.centroids is None:
+            scores = self.scores(queries)
+            best = top_k(scores, k)
+            return [[(float(scores[q, i]), int(i)) for i in best[q]] for q in range(len(queries))]
+
+        results = []
+        probes = top_k(queries @ self.centroids.T, self.nprobe)
+        for query, lists in zip(queries, probes):
+            positions = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in sorted(lists)])
+            scores = self.scores(query[None, :], positions)[0]
+            best = top_k(scores[None, :], k)[0]
+            results.append([(float(scores[i]), int(positions[i])) for i in best])
+        return results
+
+    def scores(self, queries, positions=None):
+        """ Produits scalaires requêtes x lignes (toutes, ou `positions`) ; float16 / int8 décodés par blocs. """
+        if positions is not None:
+            return queries @ dequantize(self.vectors[positions], self.scales[positions] if self.scales is not None else None).T
+        if self.encoding == "float32":
+            return queries @ self.vectors.T
+        scores = np.empty((len(queries), len(self.vectors)), dtype=np.float32)
+        for i in range(0, len(self.vectors), CHUNK_ROWS):
+            block = dequantize(self.vectors[i:i + CHUNK_ROWS], self.scales[i:i + CHUNK_ROWS] if self.scales is not None else None)
+            scores[:, i:i + CHUNK_ROWS] = queries @ block.T
+        return scores
+
+    def collection(self, position):
+        return self.collection_names[self.collections[position]]
+
+    def position(self, doc_id):
+        if self.by_id is None:
+            self.by_id = {str(value): position for position, value in enumerate(self.ids)}
+        return self.by_id.get(str(doc_id))
+
+
+class NumpyRetriever(BaseRetriever):
+    """
+    Retriever LangChain sur `VectorIndex`. Même interface que `VectorRetriever` (ChromaDB) :
+    `search(vecteur)` -> `[(distance, Document)]`, `retrieve(question)` -> `[Document]`.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: VectorIndex
+    embeddings_model: object
+    renderers: dict
+    k: int = RETRIEVAL_K
+
+    def embed_query(self, question):
+        return self.embeddings_model.embed_query(question)
+
+    def document(self, position):
+        name = self.index.collection(position)
+        metadata = self.index.metadata[position]
+        return Document(page_content=self.renderers[name](metadata), metadata={**metadata, "id": self.index.ids[position], "collection": name})
+
+    def search(self, vector, k=None, filters=None):
+        """ `filters` : voir `QueryAnalyzer.filters` ; sans document correspondant, recherche sans filtre. """
+        candidates = self.index.candidates(filters)
+        hits = self.index.search(vector, k or self.k, candidates)[0]
+        if candidates is not None and not hits:
+            hits = self.index.search(vector, k or self.k)[0]
+        return [(1.0 - score, self.document(position)) for score, position in hits]
+
+    def documents(self, name, ids):
+        positions = [self.index.position(doc_id) for doc_id in ids]
+        return [self.document(position) for position in positions if position is not None and self.index.collection(position) == name]
+
+    def retrieve(self, question, k=None):
+        return [document for _, document in self.search(self.embed_query(question), k)]
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.retrieve(query)
@@ -1,91 +1,77 @@
 import os
-import requests
-import numpy as np
-import pandas as pd
-from supabase import create_client
-from dotenv import load_dotenv
-from langchain_openai.embeddings import OpenAIEmbeddings
+import sys
+import argparse
 
-# 📌 Charger les variables d'environnement depuis `.env`
-load_dotenv()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "IA_database"))
+import metrics
+from bulk_writer import BulkWriter
+from clients import get_embeddings_model, get_supabase, require_env
+from pipeline import embed_and_write
+from reference_index import iter_pages
+from templates import driver_short_text, race_summary_text, result_short_text
 
-# 📌 Récupérer les variables Supabase
-SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# 📌 Clients Supabase / OpenAI : créés au lancement du script (`clients.py`), pas à l'import
 
-# 📌 Connexion à Supabase via l'API
-supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-embeddings_model = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+# 📌 Sources à embedder : (table, type, colonne identifiant, ordre de lecture, gabarit, identifiants répétés)
+EMBEDDING_SOURCES = [
+    ("races", "race", "id", ("id",), race_summary_text, False),
+    ("drivers", "driver", "driver_ref", ("driver_ref", "season"), driver_short_text, True),
+    ("results", "result", "id", ("id",), result_short_text, False),
+]
 
-# 📌 Vérifier la connexion
-print("✅ Connexion à Supabase API réussie !")
 
-# 📌 Fonction pour récupérer et stocker les embeddings
-def save_embeddings_to_supabase():
-    """Crée et stocke les embeddings pour les courses, pilotes et résultats."""
-    
-    print("🔄 Récupération des données pour embeddings...")
+def distinct_pages(pages, id_column):
+    """ Une seule ligne par identifiant : `drivers` a une ligne par pilote et par saison, mais un seul embedding par pilote
+    (deux fois le même `id` dans un upsert est refusé par Postgres). Les pages étant triées par identifiant, les doublons
+    se suivent : seul le précédent est gardé en mémoire. """
+    previous = None
+    for page in pages:
+        rows = []
+        for row in page:
+            if row[id_column] != previous:
+                rows.append(row)
+                previous = row[id_column]
+        if rows:
+            yield rows
 
-    # Récupération des courses, pilotes et résultats
-    races = supabase.table("races").select("*").execute().data
-    drivers = supabase.table("drivers").select("*").execute().data
-    results = supabase.table("results").select("*").execute().data
 
-    embedded_data = []
+# 📌 Fonction pour récupérer et stocker les embeddings
+def save_embeddings_to_supabase():
+    """Crée et stocke les embeddings pour les courses, pilotes et résultats, en flux (mémoire constante)."""
 
-    # 🔹 Embeddings pour les courses
-    for race in races:
-        text = f"Grand Prix : {race['name']} - {race['date']} sur le circuit {race['circuit_id']}."
-        vector = embeddings_model.embed_query(text)
-        embedded_data.append({
-            "id": race["id"],
-            "type": "race",
-            "text": text,
-            "embedding": vector
-        })
+    for table, data_type, id_column, order_by, template, repeated_ids in EMBEDDING_SOURCES:
+        print(f"🔄 Embeddings pour `{table}`...")
+        pages = iter_pages(get_supabase(), table, order_by=order_by)
+        with BulkWriter(get_supabase(), "embeddings") as writer:
+            embed_and_write(
+                get_embeddings_model(),
+                distinct_pages(pages, id_column) if repeated_ids else pages,
+                template=template,
+                to_record=lambda row, vector, data_type=data_type, id_column=id_column, template=template: {
+                    "id": row[id_column],
+                    "type": data_type,
+                    "text": template(row),
+                    "embedding": vector
+                },
+                write=writer.write,
+                label=f"embeddings `{data_type}`"
+            )
 
-    # 🔹 Embeddings pour les pilotes
-    for driver in drivers:
-        text = f"Pilote : {driver['first_name']} {driver['last_name']} ({driver['nationality']})."
-        vector = embeddings_model.embed_query(text)
-        embedded_data.append({
-            "id": driver["driver_ref"],
-            "type": "driver",
-            "text": text,
-            "embedding": vector
-        })
+    print("✅ Tous les embeddings sont stockés avec succès !")
 
-    # 🔹 Embeddings pour les résultats
-    for result in results:
-        text = f"Résultat : {result['driver_id']} a terminé {result['position']} avec {result['points']} points."
-        vector = embeddings_model.embed_query(text)
-        embedded_data.append({
-            "id": result["id"],
-            "type": "result",
-            "text": text,
-            "embedding": vector
-        })
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embeddings des courses, pilotes et résultats stockés dans Supabase")
+    parser.parse_args(argv)
 
-    print(f"✅ {len(embedded_data)} embeddings générés.")
+    require_env("NEXT_PUBLIC_SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_ANON_KEY", "OPENAI_API_KEY")
+    metrics.start_exporters()
+    get_supabase()
+    print("✅ Connexion à Supabase API réussie !")
 
-    # 🔄 Insérer les embeddings dans Supabase
-    print("🚀 Insertion des embeddings dans Supabase...")
-    for data in embedded_data:
-        response = supabase.table("embeddings").upsert({
-            "id": data["id"],
-            "type": data["type"],
-            "text": data["text"],
-            "embedding": data["embedding"]
-        }).execute()
-        
-        if response.data:
-            print(f"✅ Embedding inséré pour {data['type']} - {data['id']}")
-        else:
-            print(f"⚠️ Problème d'insertion pour {data['id']}")
+    save_embeddings_to_supabase()
+    metrics.report()
+    print("🚀 Script terminé avec succès sur Supabase API !")
 
-    print("✅ Tous les embeddings sont stockés avec succès !")
 
-# 📌 Exécuter les fonctions
-save_embeddings_to_supabase()
-print("🚀 Script terminé avec succès sur Supabase API !")
+if __name__ == "__main__":
+    main()